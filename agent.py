@@ -2,13 +2,18 @@ import os
 import requests
 import json
 import time
+import shutil
 import subprocess
+import tempfile
 import threading
 import sys
 import asyncio
+import contextlib
 import nest_asyncio  # Add nest_asyncio for nested event loops
 from typing import Dict, List, Any, Optional, Union
 import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 
 # Apply nest_asyncio to allow nested event loops
@@ -38,6 +43,7 @@ except ImportError as e:
 try:
     from mcp import ClientSession, StdioServerParameters, types
     from mcp.client.stdio import stdio_client
+    from mcp.client.streamable_http import streamablehttp_client
     ASYNC_MCP_AVAILABLE = True
     print("✅ Async MCP client libraries found and imported successfully")
 except ImportError as e:
@@ -54,8 +60,40 @@ except ImportError:
     FOLD_SERVER_IMPORTABLE = False
     print("❌ fold_server module cannot be imported directly")
 
+from fold_queue import FoldQueue, connect_broker, mean_plddt, DONE
+from mutagenesis import MutagenesisEngine, find_hotspots
+from staples import staple_candidates
+from prescreen import PreScreen, parse_constraints
+from pareto import format_front, rank_candidates
+from scoring import predict_binding_score
+from surrogate import SurrogateModel, combine_predictions, select_ucb
+from structure_cluster import select_diverse
+from similarity_index import SimilarityIndex
+from fold_scheduler import FoldScheduler, MAX_FOLD_LENGTH
+from profiling import PROFILE_ENV, SessionProfiler, resolve_mode
+from retrieval import DigestIndex, estimate_tokens
+from artifact_store import ArtifactStore, BoundedHistory, DEFAULT_CACHE_BYTES, DEFAULT_HISTORY_CHARS, is_handle
+from structure_features import featurize
+from sequence_parsing import (
+    PROPOSE_SEQUENCES_TOOL, StreamingSequenceParser, extract_sequences, sequences_from_tool_input
+)
+
 load_dotenv()  # Add this line after the imports
 
+# Fold timeouts scale with sequence length: base + per-residue, capped
+FOLD_TIMEOUT_BASE = 15.0
+FOLD_TIMEOUT_PER_RESIDUE = 0.15
+FOLD_TIMEOUT_MAX = 120.0
+# Fetching a stored structure is a file read on the server, not a fold
+STRUCTURE_FETCH_TIMEOUT = 30.0
+
+# Hedging: launch a backup backend once the current one exceeds this delay
+HEDGE_DEFAULT_DELAY = 8.0
+HEDGE_MIN_SAMPLES = 5
+
+# Confidence attached to a structure depending on which backend produced it
+BACKEND_CONFIDENCE = {"mcp": 0.9, "llm": 0.85, "direct": 0.8}
+
 # ANSI color codes for colored terminal output
 class Colors:
     RED = '\033[91m'
@@ -74,7 +112,39 @@ class ProteinDesignAgent:
         esmfold_mcp_path: Optional[str] = "fold_server.py",
         llm_api_key: Optional[str] = os.environ.get("ANTHROPIC_API_KEY"),
         llm_api_url: str = "https://api.anthropic.com/v1/messages",
-        verbose: bool = True
+        verbose: bool = True,
+        fold_queue_url: Optional[str] = None,
+        fold_queue_timeout: float = 600.0,
+        hedge_folds: bool = True,
+        hedge_percentile: float = 90.0,
+        allow_llm_fold: bool = False,
+        max_iterations: int = 1,
+        folds_per_iteration: int = 1,
+        local_candidates: int = 0,
+        hotspot_positions: Optional[List[int]] = None,
+        prescreen_keep_fraction: Optional[float] = None,
+        surrogate_beta: Optional[float] = 2.0,
+        surrogate_min_observations: int = 8,
+        surrogate_weights: Optional[Dict[str, float]] = None,
+        stream_llm: bool = False,
+        fold_concurrency: int = 4,
+        fold_server_url: Optional[str] = os.environ.get("FOLD_SERVER_URL"),
+        structure_tm_threshold: Optional[float] = None,
+        similarity_index_path: Optional[str] = None,
+        near_duplicate_similarity: Optional[float] = None,
+        provisional_similarity: Optional[float] = None,
+        max_fold_length: int = MAX_FOLD_LENGTH,
+        split_long_sequences: bool = False,
+        profile: Optional[str] = os.environ.get(PROFILE_ENV),
+        interactive: bool = True,
+        artifact_dir: Optional[str] = None,
+        history_budget_chars: int = DEFAULT_HISTORY_CHARS,
+        artifact_cache_bytes: int = DEFAULT_CACHE_BYTES,
+        literature_token_budget: Optional[int] = None,
+        staple_candidates: int = 0,
+        max_staples: int = 2,
+        pareto_front_size: int = 8,
+        refine_with_llm: bool = True
     ):
         """
         Initialize the protein design agent.
@@ -84,16 +154,150 @@ class ProteinDesignAgent:
             llm_api_key: API key for the LLM service (Claude)
             llm_api_url: URL for the LLM API
             verbose: Whether to print detailed logs
+            fold_queue_url: Broker URL ("sqlite:///path" or "tcp://host:port") to farm
+                folds out to fold_queue workers instead of a local fold_server subprocess
+            fold_queue_timeout: Seconds to wait for queued folds before falling back
+            hedge_folds: Launch a backup fold backend when the preferred one is slow
+            hedge_percentile: Latency percentile of the preferred backend after which
+                the backup is launched
+            allow_llm_fold: Allow the Claude-mediated fold path (costs an LLM round trip)
+            max_iterations: Number of design iterations in run
+            folds_per_iteration: Candidates folded and scored per iteration
+            local_candidates: Variants of the current best sequence generated locally
+                (no LLM call) and added to each iteration's candidate pool
+            hotspot_positions: 0-based positions local mutagenesis must never change;
+                defaults to the p53-like Phe/Trp/Leu motif when one is present
+            prescreen_keep_fraction: Fraction of candidates kept by the sequence-level
+                pre-screen before folding (None disables the pre-screen)
+            surrogate_beta: Exploration weight of the UCB policy that picks which
+                candidates to fold from surrogate predictions (None disables it)
+            surrogate_min_observations: Observations a surrogate needs before it is
+                trusted to choose candidates
+            surrogate_weights: Weight of each surrogate ("binding", "plddt") in the
+                combined UCB objective; defaults to equal weights
+            stream_llm: Stream the planning response and start folding each candidate
+                as soon as it appears in the token stream
+            fold_concurrency: Folds run in parallel while streaming
+            fold_server_url: URL of a shared fold_server running with
+                --transport streamable-http (e.g. "http://host:8000/mcp"); when set,
+                MCP folds go there instead of to a private stdio subprocess
+            structure_tm_threshold: TM-like score above which two folded candidates
+                count as the same structure; only the most confident member of each
+                cluster is scored (None disables structural deduplication)
+            similarity_index_path: SQLite file that persists the MinHash index of
+                folded sequences and their structures across sessions (None = memory only)
+            near_duplicate_similarity: Candidates whose estimated k-mer similarity to an
+                already-folded sequence reaches this value are dropped (None disables)
+            provisional_similarity: Fast mode: a candidate with a folded neighbour at
+                least this similar gets the neighbour's structure as a provisional
+                result while its exact fold runs in the background (None disables)
+            max_fold_length: Longest sequence the fold backends accept; longer ones are
+                rejected without spending a request
+            split_long_sequences: Fold over-long sequences as consecutive windows and
+                stitch the segments instead of rejecting them
+            profile: Profile each run: "cprofile" (deterministic) or "sample" (low-overhead
+                stack sampling); child fold servers and asyncio tasks are profiled too and
+                results land in $AGENT_PROFILE_DIR/<session_id>/ (None disables)
+            interactive: Pause for confirmation before each iteration; batch runs
+                set this to False
+            artifact_dir: Bounded-memory mode: directory where structures and old
+                conversation turns are written; results then carry PDB handles instead
+                of PDB text (None keeps everything in memory)
+            history_budget_chars: Conversation history kept in memory in bounded-memory
+                mode; older turns are spilled to the artifact store
+            artifact_cache_bytes: Artifact bytes cached in memory for repeated reads
+            literature_token_budget: Tokens of cached paper digests from the local
+                research corpus packed into the planning prompt (None disables)
+            staple_candidates: Best-scoring i,i+4 / i,i+7 staple placements on the current
+                best helix added to each iteration's pool (folded as Ala proxies)
+            max_staples: Most staples per placement
+            pareto_front_size: Members of the Pareto front (binding, pLDDT, length and
+                helicity deviation, pre-screen descriptors) reported each iteration,
+                used as recombination partners and shown to the LLM
+            refine_with_llm: Ask the LLM for new candidates at the start of every
+                iteration after the first, with the current Pareto front in the prompt
+                (False keeps the front out of the LLM's view until the final analysis)
         """
         self.esmfold_mcp_path = esmfold_mcp_path
+        self.fold_server_url = fold_server_url
         self.llm_api_key = llm_api_key
         self.llm_api_url = llm_api_url
         self.verbose = verbose
         self.session_id = str(uuid.uuid4())
         
-        # Initialize MCP client
-        self.mcp_client = None
-        self.mcp_server_process = None
+        # Initialize distributed fold queue
+        self.fold_queue = FoldQueue(connect_broker(fold_queue_url)) if fold_queue_url else None
+        self.fold_queue_timeout = fold_queue_timeout
+        
+        # Hedged fold settings and observed per-backend latencies
+        self.hedge_folds = hedge_folds
+        self.hedge_percentile = hedge_percentile
+        self.allow_llm_fold = allow_llm_fold
+        self.fold_latencies = defaultdict(lambda: deque(maxlen=200))
+        # Feature records from the fold server's fold_and_featurize, by sequence
+        self.fold_features: Dict[str, Dict[str, Any]] = {}
+        self._server_structures: Optional[ArtifactStore] = None
+        self._owns_server_structures = False
+        self._server_structures_lock = threading.Lock()
+        
+        # Per-length latency history drives fold timeouts and batch order
+        self.fold_scheduler = FoldScheduler(
+            max_length=max_fold_length,
+            base_timeout=FOLD_TIMEOUT_BASE,
+            per_residue_timeout=FOLD_TIMEOUT_PER_RESIDUE,
+            max_timeout=FOLD_TIMEOUT_MAX
+        )
+        self.split_long_sequences = split_long_sequences
+        
+        # Design loop settings
+        self.max_iterations = max_iterations
+        self.interactive = interactive
+        self.folds_per_iteration = folds_per_iteration
+        self.local_candidates = local_candidates
+        self.hotspot_positions = hotspot_positions
+        self.staple_candidates = staple_candidates
+        self.max_staples = max_staples
+        self.staple_placements: Dict[str, Dict[str, Any]] = {}
+        self.pareto_front_size = pareto_front_size
+        self.refine_with_llm = refine_with_llm
+        self.prescreen_keep_fraction = prescreen_keep_fraction
+        
+        # Surrogate models: binding trained on every binding prediction, plddt on every fold
+        self.surrogate_beta = surrogate_beta
+        self.surrogate_min_observations = surrogate_min_observations
+        self.surrogate_weights = surrogate_weights or {"binding": 1.0, "plddt": 1.0}
+        self.surrogates = {"binding": SurrogateModel(), "plddt": SurrogateModel()}
+        self._surrogate_lock = threading.Lock()
+        
+        # Streaming planning: structures folded while the LLM was still generating
+        self.stream_llm = stream_llm
+        self.fold_concurrency = fold_concurrency
+        self.prefolded: Dict[str, Dict[str, Any]] = {}
+        
+        # Structural diversity: CA coordinates of every representative kept so far
+        self.structure_tm_threshold = structure_tm_threshold
+        self.representative_coords = []
+        
+        # Bounded-memory mode: large artifacts live on disk and are referenced by handle
+        self.artifacts = ArtifactStore(artifact_dir, artifact_cache_bytes) if artifact_dir else None
+        self.history_budget_chars = history_budget_chars
+        if self.artifacts and not similarity_index_path:
+            similarity_index_path = os.path.join(self.artifacts.root, "similarity.db")
+        
+        # Near-duplicate detection and provisional structures from folded neighbours
+        self.similarity_index = SimilarityIndex(similarity_index_path)
+        self.near_duplicate_similarity = near_duplicate_similarity
+        self.provisional_similarity = provisional_similarity
+        self._exact_fold_executor = None
+        self.pending_exact_folds: Dict[str, Any] = {}
+        
+        # On-demand profiling of whole sessions
+        self.profile = resolve_mode(profile)
+        self.profiler: Optional[SessionProfiler] = None
+        
+        # Literature digests for the planning prompt, loaded on first use
+        self.literature_token_budget = literature_token_budget
+        self.digest_index: Optional[DigestIndex] = None
         
         # Initialize Anthropic client
         if ANTHROPIC_CLIENT_AVAILABLE and self.llm_api_key:
@@ -106,7 +310,7 @@ class ProteinDesignAgent:
         self.available_tools = []
         
         # Initialize conversation history
-        self.conversation_history = []
+        self.conversation_history = self._new_history()
         
         # Initialize basic session info
         self.current_iteration = 0
@@ -121,6 +325,56 @@ class ProteinDesignAgent:
             else:
                 print(f"[ProteinDesignAgent] {message}")
                 
+    def _new_history(self) -> List[Dict[str, Any]]:
+        """Empty conversation history, capped and spilled to disk in bounded-memory mode."""
+        if self.artifacts is None:
+            return []
+        return BoundedHistory(self.artifacts.transcript_path(self.session_id), self.history_budget_chars)
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop for the current thread, created on first use in worker threads."""
+        try:
+            return asyncio.get_event_loop()
+        except RuntimeError:
+            loop = asyncio.new_event_loop()
+            nest_asyncio.apply(loop)
+            asyncio.set_event_loop(loop)
+            if self.profiler:
+                self.profiler.instrument_loop(loop)
+            return loop
+
+    @contextlib.asynccontextmanager
+    async def _open_fold_server(self):
+        """
+        Open the MCP streams to the fold server: the shared HTTP server when
+        fold_server_url is set, otherwise a private stdio subprocess.
+
+        Yields:
+            (read, write) streams for a ClientSession
+        """
+        if self.fold_server_url:
+            async with streamablehttp_client(self.fold_server_url) as (read, write, _):
+                yield read, write
+        else:
+            env = os.environ.copy()
+            # The private server stores structures where this session can read them without a round trip
+            env["FOLD_STRUCTURE_DIR"] = self._private_structures().root
+            server_params = StdioServerParameters(
+                command=sys.executable,
+                args=[self.esmfold_mcp_path],
+                env=env,
+            )
+            async with stdio_client(server_params) as (read, write):
+                yield read, write
+
+    async def _list_fold_tools(self, timeout: float = 10.0) -> List[str]:
+        """Names of the tools offered by the fold server."""
+        async with self._open_fold_server() as (read, write):
+            async with ClientSession(read, write) as session:
+                await asyncio.wait_for(session.initialize(), timeout=timeout)
+                response = await asyncio.wait_for(session.list_tools(), timeout=timeout)
+                return [tool.name for tool in response.tools]
+
     async def connect_to_server_and_run(self):
         """
         DEPRECATED: This method is kept for backward compatibility but should not be used.
@@ -184,16 +438,8 @@ class ProteinDesignAgent:
         try:
             # Create fresh connection to get tools
             self.log("Creating fresh connection to get available tools", Colors.BLUE)
-            python_path = sys.executable
-            
-            server_params = StdioServerParameters(
-                command=python_path,
-                args=[self.esmfold_mcp_path],
-                env=os.environ.copy(),
-            )
-            
             available_tools = []
-            async with stdio_client(server_params) as (read, write):
+            async with self._open_fold_server() as (read, write):
                 async with ClientSession(read, write) as session:
                     await asyncio.wait_for(session.initialize(), timeout=10.0)
                     response = await asyncio.wait_for(session.list_tools(), timeout=10.0)
@@ -213,7 +459,8 @@ class ProteinDesignAgent:
         # Create response
         self.log(f"Sending query to Claude with tools: {[t['name'] for t in available_tools]}", Colors.BLUE)
         
-        response = self.anthropic.messages.create(
+        response = await asyncio.to_thread(
+            self.anthropic.messages.create,
             max_tokens=2024,
             model="claude-3-sonnet-20240229",
             tools=available_tools,
@@ -246,7 +493,7 @@ class ProteinDesignAgent:
                     # Call the tool through a fresh MCP connection for each tool call
                     try:
                         # If this is fold_sequence, use our fresh connection method
-                        if tool_name == "fold_sequence":
+                        if tool_name in ("fold_sequence", "fold_and_featurize"):
                             sequence_to_fold = tool_args.get("sequence", "")
                             self.log(f"Folding sequence via Claude: {sequence_to_fold[:10]}...", Colors.BLUE)
                             
@@ -254,15 +501,22 @@ class ProteinDesignAgent:
                             sequence_to_fold = self.validate_and_clean_sequence(sequence_to_fold)
                             
                             # Use fresh connection to fold
-                            loop = asyncio.get_event_loop()
-                            pdb_text = loop.run_until_complete(
-                                self.fold_with_fresh_connection(sequence_to_fold)
-                            )
+                            pdb_text = await self.fold_with_fresh_connection(sequence_to_fold)
                             
                             if pdb_text:
                                 pdb_result = pdb_text
                                 self.log("Successfully received PDB from fold_sequence", Colors.GREEN)
                                 tool_result = pdb_text
+                                features = self.fold_features.get(sequence_to_fold)
+                                if features:
+                                    # Claude gets the compact feature record and handle, not the PDB
+                                    tool_result = json.dumps(features)
+                                elif self.artifacts:
+                                    # Keep the PDB out of the message list; Claude gets a summary and a handle
+                                    plddt = mean_plddt(pdb_text)
+                                    tool_result = (f"Folded {len(sequence_to_fold)} residues"
+                                                   f"{f' (mean pLDDT {plddt:.2f})' if plddt is not None else ''}; "
+                                                   f"structure stored as {self.artifacts.put(pdb_text)}")
                             else:
                                 tool_result = "Error: Failed to fold sequence"
                         else:
@@ -283,7 +537,8 @@ class ProteinDesignAgent:
                         })
                         
                         # Get next response
-                        response = self.anthropic.messages.create(
+                        response = await asyncio.to_thread(
+                            self.anthropic.messages.create,
                             max_tokens=2024,
                             model="claude-3-sonnet-20240229",
                             tools=available_tools,
@@ -312,7 +567,8 @@ class ProteinDesignAgent:
                         })
                         
                         # Continue conversation with error
-                        response = self.anthropic.messages.create(
+                        response = await asyncio.to_thread(
+                            self.anthropic.messages.create,
                             max_tokens=2024,
                             model="claude-3-sonnet-20240229",
                             tools=available_tools,
@@ -326,6 +582,20 @@ class ProteinDesignAgent:
     
     def start_mcp_server(self):
         """Verify the ESMfold MCP server is available and accessible."""
+        if self.fold_server_url and ASYNC_MCP_AVAILABLE:
+            # Shared HTTP server: nothing to launch, just check it answers
+            self.log(f"VERIFYING shared fold server at {self.fold_server_url}...", Colors.BOLD + Colors.BLUE)
+            try:
+                tool_names = self._event_loop().run_until_complete(self._list_fold_tools())
+            except Exception as e:
+                self.log(f"Error reaching fold server: {e}", Colors.RED)
+                return False
+            if "fold_sequence" not in tool_names:
+                self.log("ERROR: fold server does not offer 'fold_sequence' tool", Colors.RED)
+                return False
+            self.log("Shared fold server verified and accessible!", Colors.GREEN)
+            return True
+        
         if not self.esmfold_mcp_path or not os.path.exists(self.esmfold_mcp_path):
             self.log(f"ESMfold MCP server script not found at {self.esmfold_mcp_path}", Colors.RED)
             self.log(f"Current working directory: {os.getcwd()}", Colors.RED)
@@ -368,30 +638,17 @@ class ProteinDesignAgent:
             
             # Just verify connection without folding test sequence
             try:
-                # Create test connection to verify server can be reached
-                python_path = sys.executable
-                server_params = StdioServerParameters(
-                    command=python_path,
-                    args=[self.esmfold_mcp_path],
-                    env=os.environ.copy(),
-                )
-                
                 # Check for connection instead of folding a sequence
                 loop = asyncio.get_event_loop()
                 async def test_connection():
                     self.log("Testing connection to MCP server...", Colors.BLUE)
-                    async with stdio_client(server_params) as (read, write):
-                        async with ClientSession(read, write) as session:
-                            await asyncio.wait_for(session.initialize(), timeout=10.0)
-                            response = await asyncio.wait_for(session.list_tools(), timeout=10.0)
-                            tools = response.tools
-                            tool_names = [tool.name for tool in tools]
-                            if "fold_sequence" in tool_names:
-                                self.log(f"MCP server offers the required 'fold_sequence' tool", Colors.GREEN)
-                                return True
-                            else:
-                                self.log(f"ERROR: MCP server does not offer 'fold_sequence' tool", Colors.RED)
-                                return False
+                    tool_names = await self._list_fold_tools()
+                    if "fold_sequence" in tool_names:
+                        self.log(f"MCP server offers the required 'fold_sequence' tool", Colors.GREEN)
+                        return True
+                    else:
+                        self.log(f"ERROR: MCP server does not offer 'fold_sequence' tool", Colors.RED)
+                        return False
                 
                 # Run the test connection function
                 connection_success = loop.run_until_complete(test_connection())
@@ -413,64 +670,73 @@ class ProteinDesignAgent:
         return False
     
     def stop_mcp_server(self):
-        """Clean up MCP resources."""
-        # There's no persistent session to clean up anymore with our fresh connection approach
-        self.log("No persistent MCP resources to clean up with fresh connection approach", Colors.BLUE)
-        
-        # Clean up server process if it exists (legacy code)
-        if self.mcp_server_process:
-            self.log("Stopping legacy MCP server process", Colors.BLUE)
-            try:
-                self.mcp_server_process.terminate()
-                self.mcp_server_process.wait(timeout=5)
-            except Exception as e:
-                self.log(f"Error stopping server: {e}", Colors.RED)
-                try:
-                    self.mcp_server_process.kill()
-                except:
-                    pass
-            self.mcp_server_process = None
+        """
+        Release the resources a session holds between folds.
+
+        Every fold opens (and closes) its own MCP connection, and with it its
+        own stdio server process, so there is no server to stop here; what
+        outlives a fold is the worker pool of background exact folds and the
+        temporary directory the private fold server wrote structures into.
+        """
+        if self._exact_fold_executor is not None:
+            self.log("Shutting down background exact folds", Colors.BLUE)
+            self._exact_fold_executor.shutdown(wait=False, cancel_futures=True)
+            self._exact_fold_executor = None
+        self.pending_exact_folds.clear()
+        with self._server_structures_lock:
+            store, self._server_structures = self._server_structures, None
+            owned, self._owns_server_structures = self._owns_server_structures, False
+        if store is not None and owned:
+            shutil.rmtree(store.root, ignore_errors=True)
     
-    async def fold_with_fresh_connection(self, sequence: str) -> Optional[str]:
+    async def fold_with_fresh_connection(
+        self,
+        sequence: str,
+        init_timeout: Optional[float] = None,
+        call_timeout: Optional[float] = None
+    ) -> Optional[str]:
         """
         Create a fresh MCP connection, fold a sequence, and properly close the connection.
         This avoids reusing potentially closed connections.
         
         Args:
             sequence: Protein sequence to fold
+            init_timeout: Seconds allowed for session initialization and tool listing
+                (default: learned from previous sessions)
+            call_timeout: Seconds allowed for the fold_sequence call itself
+                (default: learned from folds of similar length)
             
         Returns:
             PDB text or None if failed
         """
         self.log(f"Creating fresh MCP connection to fold: {sequence[:10]}...", Colors.BLUE)
+        if init_timeout is None:
+            init_timeout = self.fold_scheduler.init_timeout()
+        if call_timeout is None:
+            call_timeout = self.fold_timeout(sequence)
         
         try:
-            # Create server parameters for stdio connection
-            python_path = sys.executable
-            self.log(f"Using Python executable: {python_path}", Colors.BLUE)
-            
-            server_params = StdioServerParameters(
-                command=python_path,
-                args=[self.esmfold_mcp_path],
-                env=os.environ.copy(),
-            )
-            
+            connect_started = time.monotonic()
             # Use a fresh connection with proper context management
-            self.log("Establishing fresh MCP connection...", Colors.BLUE)
-            async with stdio_client(server_params) as (read, write):
+            self.log(f"Establishing fresh MCP connection to {self.fold_server_url or 'stdio subprocess'}...", Colors.BLUE)
+            async with self._open_fold_server() as (read, write):
                 self.log("Connection opened, initializing session...", Colors.BLUE)
                 
                 async with ClientSession(read, write) as session:
                     # Initialize the connection with timeout
                     self.log("Initializing MCP session...", Colors.BLUE)
-                    await asyncio.wait_for(session.initialize(), timeout=10.0)
+                    await asyncio.wait_for(session.initialize(), timeout=init_timeout)
                     self.log("Session initialized successfully", Colors.GREEN)
                     
                     # List available tools
-                    response = await asyncio.wait_for(session.list_tools(), timeout=10.0)
+                    response = await asyncio.wait_for(session.list_tools(), timeout=init_timeout)
                     tools = response.tools
                     tool_names = [tool.name for tool in tools]
                     self.log(f"Available tools: {tool_names}", Colors.GREEN)
+                    self.fold_scheduler.record_init(time.monotonic() - connect_started)
+                    
+                    if "fold_and_featurize" in tool_names:
+                        return await self._fold_and_featurize(session, sequence, init_timeout, call_timeout)
                     
                     # Verify fold_sequence tool is available
                     if "fold_sequence" not in tool_names:
@@ -481,11 +747,12 @@ class ProteinDesignAgent:
                     self.log(f"Calling fold_sequence with sequence: {sequence[:10]}...", Colors.BLUE)
                     result = await asyncio.wait_for(
                         session.call_tool("fold_sequence", arguments={"sequence": sequence}),
-                        timeout=60.0  # Longer timeout for actual folding
+                        timeout=call_timeout  # Longer timeout for actual folding
                     )
                     
-                    if result and hasattr(result, 'content'):
-                        pdb_text = result.content
+                    if result and hasattr(result, 'content') and not getattr(result, 'isError', False):
+                        # Tool results arrive as a list of content blocks
+                        pdb_text = "".join(getattr(block, "text", "") for block in result.content)
                         self.log("Successfully received PDB from fold_sequence", Colors.GREEN)
                         pdb_preview = pdb_text[:50] + "..." if len(pdb_text) > 50 else pdb_text
                         self.log(f"PDB content preview: {pdb_preview}", Colors.GREEN)
@@ -497,19 +764,126 @@ class ProteinDesignAgent:
         except asyncio.TimeoutError:
             self.log("Timeout error in MCP connection", Colors.RED)
             return None
+        except asyncio.CancelledError:
+            self.log("MCP fold cancelled", Colors.YELLOW)
+            raise
         except Exception as e:
             self.log(f"Error in MCP connection: {e}", Colors.RED)
             import traceback
             self.log(traceback.format_exc(), Colors.RED)
             return None
     
-    def fold_sequence_direct(self, sequence: str) -> Optional[str]:
+    async def _fold_and_featurize(
+        self,
+        session: "ClientSession",
+        sequence: str,
+        init_timeout: float,
+        call_timeout: float
+    ) -> Optional[str]:
+        """
+        Fold with the server's fused fold_and_featurize tool.
+
+        The compact feature record is kept in self.fold_features. The PDB stays
+        in the server's structure store; structure_pdb loads it only for the
+        consumers that need coordinates.
+
+        Returns:
+            Structure handle or None if failed
+        """
+        self.log(f"Calling fold_and_featurize with sequence: {sequence[:10]}...", Colors.BLUE)
+        result = await asyncio.wait_for(
+            session.call_tool("fold_and_featurize", arguments={"sequence": sequence}),
+            timeout=call_timeout
+        )
+        if not result or getattr(result, "isError", False):
+            self.log(f"fold_and_featurize failed. Result: {result}", Colors.RED)
+            return None
+        record = json.loads("".join(getattr(block, "text", "") for block in result.content))
+        self.fold_features[sequence] = record
+        self.log(f"Folded into {record['pdb_bytes']}-byte structure {record['handle']} "
+                 f"(mean pLDDT {record.get('plddt_mean', float('nan')):.2f})", Colors.GREEN)
+        return record["handle"]
+    
+    def _private_structures(self) -> Optional[ArtifactStore]:
+        """
+        Store the private stdio fold server writes structures into; None with a shared server.
+
+        Without an artifact store this is FOLD_STRUCTURE_DIR when set, and
+        otherwise a temporary directory that stop_mcp_server removes.
+        """
+        if self.fold_server_url:
+            return None
+        if self.artifacts:
+            return self.artifacts
+        with self._server_structures_lock:
+            if self._server_structures is None:
+                root = os.environ.get("FOLD_STRUCTURE_DIR")
+                self._owns_server_structures = not root
+                self._server_structures = ArtifactStore(root or tempfile.mkdtemp(prefix="fold_structures-"))
+            return self._server_structures
+    
+    async def _fetch_structure(self, handle: str) -> Optional[str]:
+        """Fetch the PDB behind a handle with the fold server's get_structure tool."""
+        try:
+            async with self._open_fold_server() as (read, write):
+                async with ClientSession(read, write) as session:
+                    init_timeout = self.fold_scheduler.init_timeout()
+                    await asyncio.wait_for(session.initialize(), timeout=init_timeout)
+                    result = await asyncio.wait_for(
+                        session.call_tool("get_structure", arguments={"handle": handle}),
+                        timeout=STRUCTURE_FETCH_TIMEOUT
+                    )
+        except Exception as e:
+            self.log(f"Error fetching {handle}: {e}", Colors.RED)
+            return None
+        if not result or getattr(result, "isError", False):
+            self.log(f"get_structure failed. Result: {result}", Colors.RED)
+            return None
+        return "".join(getattr(block, "text", "") for block in result.content)
+    
+    def structure_pdb(self, structure: Dict[str, Any]) -> str:
+        """
+        PDB text of a fold result, loaded on first use.
+
+        Folds through fold_and_featurize only carry a handle. The PDB is read
+        from the private fold server's store when it is local, and otherwise
+        fetched from the fold server; either way it is kept on the structure
+        afterwards. Returns "" if the structure cannot be loaded.
+        """
+        pdb_text = structure.get("pdb_text")
+        if pdb_text is not None:
+            return pdb_text
+        handle = structure.get("pdb_handle")
+        if not handle:
+            return ""
+        for store in (self.artifacts, self._private_structures()):
+            if store:
+                try:
+                    pdb_text = store.get(handle)
+                    break
+                except KeyError:
+                    pass
+        if pdb_text is None:
+            pdb_text = self._event_loop().run_until_complete(self._fetch_structure(handle))
+        if pdb_text is None:
+            return ""
+        structure["pdb_text"] = pdb_text
+        return pdb_text
+    
+    def structure_plddt(self, structure: Dict[str, Any]) -> Optional[float]:
+        """Mean pLDDT (0-1) of a fold result, from its features when it has them."""
+        if "error" in structure:
+            return None
+        plddt = structure.get("features", {}).get("plddt_mean")
+        return plddt if plddt is not None else mean_plddt(self.structure_pdb(structure))
+    
+    def fold_sequence_direct(self, sequence: str, timeout: Optional[float] = None) -> Optional[str]:
         """Call the ESMfold API directly as a fallback."""
         self.log("Attempting direct call to ESMfold API (bypassing MCP)...", Colors.YELLOW)
         try:
-            url = "https://api.esmatlas.com/foldSequence/v1/pdb/"
+            url = os.environ.get("ESMFOLD_API_URL", "https://api.esmatlas.com/foldSequence/v1/pdb/")
             self.log(f"Sending POST request to {url}", Colors.BLUE)
-            response = requests.post(url, data=sequence, headers={"Content-Type": "text/plain"})
+            response = requests.post(url, data=sequence, headers={"Content-Type": "text/plain"}, timeout=timeout)
             
             if response.status_code == 200:
                 self.log("ESMfold API direct call successful", Colors.GREEN)
@@ -528,12 +902,150 @@ class ProteinDesignAgent:
             self.log(f"Error in direct call to ESMfold API: {e}", Colors.RED)
             return None
 
-    def predict_structure(self, sequence: str) -> Dict[str, Any]:
+    def fold_timeout(self, sequence: str) -> float:
+        """
+        Per-attempt fold timeout for this sequence's length.
+
+        A base budget plus a per-residue allowance, raised to the latency
+        percentiles of earlier folds of similar length when those are higher.
+
+        Args:
+            sequence: Amino acid sequence
+
+        Returns:
+            Timeout in seconds
+        """
+        return self.fold_scheduler.timeout(len(sequence))
+
+    def hedge_delay(self, backend: str) -> float:
+        """
+        How long to wait on a backend before launching a backup.
+
+        Uses the configured percentile of that backend's observed successful
+        latencies, or a fixed default until enough samples exist.
+        """
+        samples = sorted(self.fold_latencies.get(backend, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        index = min(int(len(samples) * self.hedge_percentile / 100.0), len(samples) - 1)
+        return samples[index]
+
+    def _fold_backends(self) -> List[str]:
+        """Fold backends in order of preference."""
+        backends = ["mcp", "direct"]
+        # The Claude-mediated path costs an LLM round trip per fold; only on explicit opt-in
+        if self.allow_llm_fold and self.anthropic:
+            backends.append("llm")
+        return backends
+
+    async def _run_fold_backend(self, backend: str, sequence: str, timeout: float) -> Optional[str]:
+        """
+        One fold attempt on one backend.
+
+        Blocking calls (the direct ESMFold request, the Claude API calls of the
+        llm backend) run in worker threads so they never stall the event loop.
+        Cancelling the attempt stops waiting for them, but a request already
+        sent keeps running in its thread until it finishes or hits its own
+        timeout; only the mcp backend's session is actually torn down.
+        """
+        if backend == "mcp":
+            return await self.fold_with_fresh_connection(
+                sequence, init_timeout=min(self.fold_scheduler.init_timeout(), timeout), call_timeout=timeout
+            )
+        if backend == "direct":
+            return await asyncio.to_thread(self.fold_sequence_direct, sequence, timeout)
+        if backend == "llm":
+            query = f"Please fold this protein sequence using the fold_sequence tool."
+            return await asyncio.wait_for(self.process_query(query, sequence), timeout=timeout)
+        raise ValueError(f"Unknown fold backend: {backend}")
+
+    async def _hedged_fold(self, sequence: str, deadline: float) -> Optional[tuple]:
+        """
+        Race fold backends against each other.
+
+        The preferred backend starts immediately. If it has not answered within
+        its hedge delay (or fails), the next backend is launched alongside it.
+        The first valid PDB wins and every other attempt is cancelled. A losing
+        direct or llm attempt is only abandoned, not stopped: its HTTP request
+        finishes in the background (see _run_fold_backend).
+
+        Args:
+            sequence: Cleaned amino acid sequence
+            deadline: Absolute time.monotonic() by which a result is needed
+
+        Returns:
+            (backend name, PDB text or structure handle) or None if nothing
+            succeeded before the deadline
+        """
+        backends = self._fold_backends()
+        pending: Dict[asyncio.Task, tuple] = {}
+        next_backend = 0
+
+        def launch():
+            nonlocal next_backend
+            backend = backends[next_backend]
+            next_backend += 1
+            timeout = max(min(self.fold_timeout(sequence), deadline - time.monotonic()), 0.1)
+            self.log(f"Launching {backend} fold (timeout {timeout:.0f}s)", Colors.BLUE)
+            task = asyncio.ensure_future(self._run_fold_backend(backend, sequence, timeout))
+            pending[task] = (backend, time.monotonic())
+            return backend
+
+        try:
+            latest = launch()
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.log("Fold deadline reached", Colors.RED)
+                    return None
+                wait = remaining
+                if self.hedge_folds and next_backend < len(backends):
+                    wait = min(wait, self.hedge_delay(latest))
+
+                done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if next_backend < len(backends):
+                        self.log(f"{latest} fold is slow, hedging with {backends[next_backend]}", Colors.YELLOW)
+                        latest = launch()
+                    continue
+
+                for task in done:
+                    backend, started = pending.pop(task)
+                    try:
+                        pdb_text = task.result()
+                    except Exception as e:
+                        self.log(f"{backend} fold attempt raised: {e}", Colors.RED)
+                        pdb_text = None
+                    if pdb_text and ("ATOM" in pdb_text or is_handle(pdb_text)):
+                        elapsed = time.monotonic() - started
+                        self.fold_latencies[backend].append(elapsed)
+                        self.fold_scheduler.record(len(sequence), elapsed)
+                        return backend, pdb_text
+                    self.log(f"{backend} fold attempt failed", Colors.YELLOW)
+
+                # Nothing usable yet; make sure something is still running
+                if not pending and next_backend < len(backends):
+                    latest = launch()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def predict_structure(self, sequence: str, deadline: Optional[float] = None) -> Dict[str, Any]:
         """
         Call the ESMfold MCP server to predict protein structure.
+
+        Backends are raced rather than tried strictly in sequence: the MCP fold
+        starts first and a direct ESMFold call is launched as a hedge once the
+        MCP attempt exceeds its usual latency. The Claude-mediated fold is only
+        used when allow_llm_fold is set.
         
         Args:
             sequence: Amino acid sequence
+            deadline: Absolute time.monotonic() by which a result is needed;
+                defaults to a length-scaled budget
             
         Returns:
             Structure prediction result
@@ -543,83 +1055,60 @@ class ProteinDesignAgent:
         
         # Clean the sequence
         sequence = self.validate_and_clean_sequence(sequence)
-        
-        # Try direct fold with fresh connection
+        if not self.fold_scheduler.fits(sequence):
+            return self._fold_over_length(sequence, deadline)
+        if deadline is None:
+            deadline = time.monotonic() + self.fold_timeout(sequence) * 2
+
+        outcome = None
         try:
-            # Create a fresh connection for each fold
-            self.log("Attempting to fold with fresh MCP connection", Colors.BOLD + Colors.BLUE)
-            loop = asyncio.get_event_loop()
-            pdb_text = loop.run_until_complete(self.fold_with_fresh_connection(sequence))
-            
-            if pdb_text:
-                self.log("SUCCESS: Successfully folded sequence using MCP!", Colors.GREEN)
-                pdb_preview = pdb_text[:50] + "..." if len(pdb_text) > 50 else pdb_text
-                self.log(f"PDB text (preview): {pdb_preview}", Colors.GREEN)
-                
-                # Check if the PDB text looks valid
-                if "ATOM" in pdb_text and "HEADER" in pdb_text:
-                    self.log("PDB format validation passed", Colors.GREEN)
-                else:
-                    self.log("WARNING: PDB text doesn't contain expected ATOM/HEADER markers", Colors.YELLOW)
-                
-                # Generate visualization URL (placeholder)
-                viz_url = f"https://example.com/viz/{self.current_iteration}.png"
-                
-                return {
-                    "sequence": sequence,
-                    "pdb_text": pdb_text,
-                    "confidence": 0.9,  # High confidence with official method
-                    "visualization_url": viz_url
-                }
+            loop = self._event_loop()
+            outcome = loop.run_until_complete(self._hedged_fold(sequence, deadline))
         except Exception as e:
-            self.log(f"Error in MCP fold attempt: {e}", Colors.RED)
+            self.log(f"Error in hedged fold: {e}", Colors.RED)
             import traceback
             self.log(traceback.format_exc(), Colors.RED)
-        
-        # Try through Claude as another approach if direct approach failed
-        if self.anthropic:
-            try:
-                self.log("ATTEMPT 2: Going through Claude to call the MCP tool", Colors.BLUE)
-                query = f"Please fold this protein sequence using the fold_sequence tool."
-                loop = asyncio.get_event_loop()
-                pdb_text = loop.run_until_complete(self.process_query(query, sequence))
-                
-                if pdb_text:
-                    self.log("SUCCESS: Successfully folded sequence through Claude!", Colors.GREEN)
-                    pdb_preview = pdb_text[:50] + "..." if len(pdb_text) > 50 else pdb_text
-                    self.log(f"PDB text (preview): {pdb_preview}", Colors.GREEN)
-                    
-                    # Generate visualization URL (placeholder)
-                    viz_url = f"https://example.com/viz/{self.current_iteration}.png"
-                    
-                    return {
-                        "sequence": sequence,
-                        "pdb_text": pdb_text,
-                        "confidence": 0.85,
-                        "visualization_url": viz_url
-                    }
-            except Exception as e:
-                self.log(f"Error in Claude-based fold attempt: {e}", Colors.RED)
-                import traceback
-                self.log(traceback.format_exc(), Colors.RED)
-        
-        # Fall back to direct ESMfold API call
-        self.log("FALLBACK: Using direct ESMfold API call", Colors.YELLOW)
-        pdb_text = self.fold_sequence_direct(sequence)
-        
-        if pdb_text:
-            self.log("Successfully folded sequence using direct ESMfold API", Colors.GREEN)
+
+        if outcome and is_handle(outcome[1]):
+            backend, handle = outcome
+            # A concurrent fold of the same sequence may already have taken the
+            # feature record; then the structure is loaded and featurized here
+            features = self.fold_features.pop(sequence, None)
+            if features is None:
+                pdb_text = self.structure_pdb({"pdb_handle": handle})
+                outcome = (backend, pdb_text) if pdb_text else None
+        if outcome and is_handle(outcome[1]):
+            self.log(f"SUCCESS: Successfully folded sequence using {backend}!", Colors.GREEN)
+            self.observe_outcome("plddt", sequence, features.get("plddt_mean"))
+            return {
+                "sequence": sequence,
+                "pdb_handle": handle,
+                "pdb_bytes": features["pdb_bytes"],
+                "confidence": BACKEND_CONFIDENCE[backend],
+                "visualization_url": f"https://example.com/viz/{self.current_iteration}.png",
+                "backend": backend,
+                "features": features
+            }
+        if outcome:
+            backend, pdb_text = outcome
+            self.log(f"SUCCESS: Successfully folded sequence using {backend}!", Colors.GREEN)
             pdb_preview = pdb_text[:50] + "..." if len(pdb_text) > 50 else pdb_text
             self.log(f"PDB text (preview): {pdb_preview}", Colors.GREEN)
-            
-            # Generate visualization URL (placeholder)
-            viz_url = f"https://example.com/viz/{self.current_iteration}.png"
-            
+
+            # Check if the PDB text looks valid
+            if "HEADER" not in pdb_text:
+                self.log("WARNING: PDB text doesn't contain expected HEADER marker", Colors.YELLOW)
+
+            # Computed by the fold server when it folded this sequence, otherwise here
+            features = self.fold_features.pop(sequence, None) or featurize(sequence, pdb_text)
+            self.observe_outcome("plddt", sequence, features.get("plddt_mean"))
             return {
                 "sequence": sequence,
                 "pdb_text": pdb_text,
-                "confidence": 0.8,  # Good confidence with direct API
-                "visualization_url": viz_url
+                "confidence": BACKEND_CONFIDENCE[backend],
+                "visualization_url": f"https://example.com/viz/{self.current_iteration}.png",
+                "backend": backend,
+                "features": features
             }
         
         # If all methods failed, use placeholder
@@ -631,7 +1120,226 @@ class ProteinDesignAgent:
             "visualization_url": f"https://example.com/viz/{self.current_iteration}.png",
             "error": "Failed to fold sequence with all available methods"
         }
-    
+
+    def _fold_over_length(self, sequence: str, deadline: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Handle a sequence longer than the fold backend accepts.
+
+        Rejected outright unless split_long_sequences is set, in which case the
+        windows are folded separately and their ATOM records concatenated with
+        continuous residue and atom numbering. The segments are not docked against each
+        other, so the stitched model is only meaningful per segment.
+        """
+        max_length = self.fold_scheduler.max_length
+        if not self.split_long_sequences:
+            self.log(f"Sequence of {len(sequence)} residues exceeds the {max_length}-residue fold limit; "
+                     f"not folding", Colors.YELLOW)
+            return {
+                "sequence": sequence,
+                "pdb_text": "HEADER\nREMARK NOT FOLDED - SEQUENCE EXCEEDS MAXIMUM LENGTH",
+                "confidence": 0.0,
+                "visualization_url": f"https://example.com/viz/{self.current_iteration}.png",
+                "error": f"Sequence length {len(sequence)} exceeds maximum fold length {max_length}"
+            }
+        
+        segments = self.fold_scheduler.split(sequence)
+        self.log(f"Splitting {len(sequence)}-residue sequence into {len(segments)} segments", Colors.YELLOW)
+        folded = self.predict_structures(segments, deadline)
+        lines = [f"REMARK STITCHED FROM {len(segments)} INDEPENDENTLY FOLDED SEGMENTS"]
+        offset = 0
+        serial = 0
+        for segment, structure in zip(segments, folded):
+            if "error" in structure:
+                return {**structure, "sequence": sequence, "segments": folded}
+            for line in self.structure_pdb(structure).splitlines():
+                if line.startswith(("ATOM", "HETATM")) and len(line) >= 26:
+                    serial += 1
+                    line = f"{line[:6]}{serial:5d}{line[11:22]}{int(line[22:26]) + offset:4d}{line[26:]}"
+                    lines.append(line)
+            offset += len(segment)
+        lines.append("END")
+        return {
+            "sequence": sequence,
+            "pdb_text": "\n".join(lines),
+            "confidence": min(s["confidence"] for s in folded) * 0.5,
+            "visualization_url": f"https://example.com/viz/{self.current_iteration}.png",
+            "segments": folded
+        }
+
+    def predict_structures(
+        self,
+        sequences: List[str],
+        deadline: Optional[float] = None,
+        target: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Predict structures for a batch of sequences.
+
+        With a fold queue configured, every sequence is enqueued at once so the
+        batch is spread across all workers; sequences the queue could not fold in
+        time fall back to predict_structure. Without a queue this is just
+        predict_structure applied in order.
+
+        With a target, queued sequences are sent as score jobs, so the worker
+        also computes the binding score and it comes back on the structure as
+        "binding_score".
+
+        Args:
+            sequences: Amino acid sequences
+            deadline: Absolute time.monotonic() by which every result is needed
+            target: Binding target to score queued candidates against
+
+        Returns:
+            Structure prediction results, in the same order as the input
+        """
+        sequences = [self.validate_and_clean_sequence(seq) for seq in sequences]
+        
+        # Reuse structures already folded during a streamed planning call
+        if any(seq in self.prefolded for seq in sequences):
+            todo = [seq for seq in sequences if seq not in self.prefolded]
+            folded = dict(zip(todo, self.predict_structures(todo, deadline, target))) if todo else {}
+            structures = [self.prefolded.get(seq) or folded[seq] for seq in sequences]
+            for seq in sequences:
+                self.prefolded.pop(seq, None)
+            return structures
+        
+        # Fast mode: answer from close neighbours now, fold exactly in the background
+        if self.provisional_similarity is not None:
+            provisional = {}
+            for seq in sequences:
+                structure = self.provisional_structure(seq)
+                if structure:
+                    provisional[seq] = structure
+            if provisional:
+                todo = [seq for seq in sequences if seq not in provisional]
+                folded = dict(zip(todo, self.predict_structures(todo, deadline, target))) if todo else {}
+                return [provisional.get(seq) or folded[seq] for seq in sequences]
+        
+        # Longest expected fold first keeps parallel workers evenly loaded to the end
+        order = self.fold_scheduler.order(sequences)
+        structures: List[Optional[Dict[str, Any]]] = [None] * len(sequences)
+        
+        if not self.fold_queue:
+            for i in order:
+                structures[i] = self.predict_structure(sequences[i], deadline)
+            return structures
+
+        # Over-long sequences never reach a worker; predict_structure rejects or splits them
+        queued = [i for i in order if self.fold_scheduler.fits(sequences[i])]
+        workers = max(len(self.fold_queue.stats()["workers"]), 1)
+        makespan = self.fold_scheduler.makespan([sequences[i] for i in queued], workers)
+        self.log(f"Enqueuing {len(queued)} {'score' if target is not None else 'fold'} jobs on the fold queue, "
+                 f"longest first (estimated makespan {makespan:.0f}s on {workers} workers)", Colors.BOLD + Colors.BLUE)
+        if target is not None:
+            job_ids = {i: self.fold_queue.enqueue_score(sequences[i], target, self.current_iteration) for i in queued}
+        else:
+            job_ids = {i: self.fold_queue.enqueue_fold(sequences[i]) for i in queued}
+        timeout = self.fold_queue_timeout
+        if deadline is not None:
+            timeout = max(min(timeout, deadline - time.monotonic()), 0.0)
+        finished = self.fold_queue.wait(list(job_ids.values()), timeout=timeout)
+
+        stats = self.fold_queue.stats()
+        self.log(f"Fold queue: backlog={stats['backlog']} in_flight={stats['in_flight']} "
+                 f"rate={stats['total_jobs_per_second']:.2f} jobs/s across {len(stats['workers'])} workers",
+                 Colors.BLUE)
+
+        for i in order:
+            seq = sequences[i]
+            job = finished.get(job_ids[i]) if i in job_ids else None
+            if job and job["status"] == DONE:
+                result = job["result"]
+                self.observe_outcome("plddt", seq, result.get("plddt", mean_plddt(result["pdb_text"])))
+                if job.get("started") and job.get("finished"):
+                    self.fold_scheduler.record(len(seq), job["finished"] - job["started"])
+                structures[i] = {
+                    "sequence": seq,
+                    "pdb_text": result["pdb_text"],
+                    "confidence": 0.9,
+                    "visualization_url": f"https://example.com/viz/{self.current_iteration}.png",
+                    "worker_id": job["worker_id"]
+                }
+                if "binding_score" in result:
+                    structures[i]["binding_score"] = result["binding_score"]
+            else:
+                if i in job_ids:
+                    reason = job["error"] if job else "timed out waiting for a worker"
+                    self.log(f"Queued fold failed ({reason}), folding locally", Colors.YELLOW)
+                structures[i] = self.predict_structure(seq, deadline)
+        return structures
+
+    def record_fold(self, sequence: str, structure: Dict[str, Any]) -> None:
+        """Add a finished (non-provisional, non-placeholder) fold to the similarity index."""
+        if "error" in structure or structure.get("provisional"):
+            return
+        # Handle-only folds are loaded for the index only when fast mode will reuse them
+        pdb_text = structure.get("pdb_text")
+        if pdb_text is None and self.provisional_similarity is not None:
+            pdb_text = self.structure_pdb(structure)
+        self.similarity_index.add(sequence, pdb_text or None, self.structure_plddt(structure))
+
+    def provisional_structure(self, sequence: str) -> Optional[Dict[str, Any]]:
+        """
+        Structure of the closest already-folded neighbour, if it is similar enough.
+
+        An exact match is returned as a normal (cached) result. For a near match
+        the neighbour's structure is returned with provisional=True and the exact
+        fold of `sequence` is started in the background; collect it with
+        resolve_provisional_folds.
+        """
+        for neighbour, similarity in self.similarity_index.nearest(sequence, 3, self.provisional_similarity):
+            stored = self.similarity_index.structure(neighbour)
+            if not stored:
+                continue
+            structure = {
+                "sequence": sequence,
+                "pdb_text": stored["pdb_text"],
+                "confidence": BACKEND_CONFIDENCE["direct"],
+                "visualization_url": f"https://example.com/viz/{self.current_iteration}.png",
+            }
+            if neighbour == sequence:
+                structure["backend"] = "cache"
+                return structure
+            if sequence not in self.pending_exact_folds:
+                if self._exact_fold_executor is None:
+                    self._exact_fold_executor = ThreadPoolExecutor(
+                        max_workers=self.fold_concurrency, thread_name_prefix="exact-fold"
+                    )
+                self.pending_exact_folds[sequence] = self._exact_fold_executor.submit(self.predict_structure, sequence)
+            self.log(f"Provisional structure for {sequence[:10]}... from neighbour {neighbour[:10]}... "
+                     f"(similarity {similarity:.2f}); exact fold queued", Colors.BLUE)
+            structure.update(provisional=True, neighbour=neighbour, similarity=similarity)
+            return structure
+        return None
+
+    def resolve_provisional_folds(self, timeout: Optional[float] = 0.0) -> Dict[str, Dict[str, Any]]:
+        """
+        Collect exact folds that replaced provisional structures.
+
+        Args:
+            timeout: Seconds to wait for outstanding folds (0 = only those already
+                finished, None = wait for all)
+
+        Returns:
+            sequence -> exact structure for every fold finished so far
+        """
+        if not self.pending_exact_folds:
+            return {}
+        wait(list(self.pending_exact_folds.values()), timeout=timeout)
+        resolved = {}
+        for seq, future in list(self.pending_exact_folds.items()):
+            if not future.done():
+                continue
+            del self.pending_exact_folds[seq]
+            try:
+                structure = future.result()
+            except Exception as e:
+                self.log(f"Exact fold of {seq[:10]}... failed: {e}", Colors.RED)
+                continue
+            self.record_fold(seq, structure)
+            resolved[seq] = structure
+        return resolved
+
     def query_llm(self, prompt: str, include_history: bool = True) -> str:
         """
         Query the LLM with a prompt and optional conversation history.
@@ -760,6 +1468,306 @@ class ProteinDesignAgent:
             self.log(f"Error querying LLM: {e}", Colors.RED)
             return f"Error: {str(e)}"
     
+    def observe_outcome(self, kind: str, sequence: str, score: Optional[float]) -> None:
+        """
+        Feed an observed outcome into the matching surrogate model.
+
+        Args:
+            kind: "binding" or "plddt"
+            sequence: Sequence the outcome belongs to
+            score: Observed value (ignored if None)
+        """
+        if score is not None:
+            with self._surrogate_lock:
+                self.surrogates[kind].update([sequence], [score])
+
+    def literature_context(self, user_prompt: str) -> str:
+        """Most relevant cached paper digests for the prompt, within literature_token_budget."""
+        if not self.literature_token_budget:
+            return ""
+        try:
+            if self.digest_index is None:
+                self.digest_index = DigestIndex()
+            else:
+                self.digest_index.refresh()
+        except OSError as e:
+            self.log(f"Could not load literature digests: {e}", Colors.YELLOW)
+            return ""
+        block = self.digest_index.pack(user_prompt, self.literature_token_budget)
+        if block:
+            self.log(f"Added {block.count(chr(10))} literature digests (~{estimate_tokens(block)} tokens) "
+                     f"to the planning prompt", Colors.BLUE)
+        return block
+    
+    def extract_target(self, user_prompt: str) -> str:
+        """Extract the binding target from the user prompt (text after "binds")."""
+        target = "MDM2"  # Default/placeholder - in real implementation we'd extract this properly
+        if "binds" in user_prompt.lower():
+            parts = user_prompt.lower().split("binds")
+            if len(parts) > 1:
+                target = parts[1].strip()
+        return target
+
+    def generate_local_candidates(
+        self,
+        parent: str,
+        n: int,
+        top_candidates: Optional[List[str]] = None,
+        exclude: Optional[set] = None
+    ) -> List[str]:
+        """
+        Generate variants of a sequence locally, without an LLM round trip.
+
+        Args:
+            parent: Sequence to mutate, usually the current best sequence
+            n: Maximum number of variants
+            top_candidates: Other strong sequences to recombine with the parent
+            exclude: Sequences that should not be proposed again
+
+        Returns:
+            Variant sequences that keep every hotspot residue of the parent
+        """
+        parent = self.validate_and_clean_sequence(parent)
+        fixed = self.hotspot_positions if self.hotspot_positions is not None else find_hotspots(parent)
+        engine = MutagenesisEngine(fixed_positions=fixed)
+        variants = engine.generate(parent, n, top_candidates=top_candidates, exclude=exclude or ())
+        self.log(f"Generated {len(variants)} local variants of {parent[:20]}... (fixed positions: {fixed})", Colors.BLUE)
+        return variants
+
+    def generate_staple_candidates(self, parent: str, n: int, exclude: Optional[set] = None) -> List[str]:
+        """
+        Rank staple placements on a helix and return the Ala proxies of the best ones.
+
+        Args:
+            parent: Helix to staple; a proxy from an earlier placement is traced back
+                to its unstapled parent so staples are not stacked
+            n: Maximum number of placements
+            exclude: Sequences that should not be proposed again
+
+        Returns:
+            Proxy sequences to fold; their placements are kept in self.staple_placements
+        """
+        parent = self.validate_and_clean_sequence(parent)
+        parent = self.staple_placements.get(parent, {}).get("parent", parent)
+        hotspots = self.hotspot_positions if self.hotspot_positions is not None else find_hotspots(parent)
+        placements = staple_candidates(parent, n, hotspots, exclude=exclude or (),
+                                       n_staples=range(1, self.max_staples + 1))
+        for placement in placements:
+            self.staple_placements[placement["sequence"]] = {
+                "parent": parent,
+                "staples": placement["staples"],
+                "stapled_sequence": placement["stapled_sequence"],
+                "placement_score": placement["score"],
+            }
+        self.log(f"Generated {len(placements)} staple placements on {parent[:20]}... "
+                 f"(hotspots: {hotspots})", Colors.BLUE)
+        return [placement["sequence"] for placement in placements]
+    
+    def query_llm_for_candidates(self, prompt: str, include_history: bool = True) -> tuple:
+        """
+        Query the LLM once and get both its reasoning and its candidate sequences.
+
+        The propose_sequences tool is offered alongside the prompt so the model
+        returns candidates as structured JSON in the same response. If the
+        model answers in plain text, or the tool-enabled call is unavailable,
+        sequences are parsed locally from the text instead of asking again.
+
+        Args:
+            prompt: The prompt to send to the LLM
+            include_history: Whether to include conversation history
+
+        Returns:
+            (response text, list of candidate sequences)
+        """
+        if not self.anthropic:
+            text = self.query_llm(prompt, include_history=include_history)
+            return text, extract_sequences(text)
+
+        print("\n" + "-"*80)
+        self.log("SENDING STRUCTURED REQUEST TO LLM API", Colors.RED)
+        self.log(f"Prompt: {prompt}", Colors.YELLOW)
+
+        messages = []
+        if include_history and self.conversation_history:
+            messages = [msg for msg in self.conversation_history
+                        if isinstance(msg, dict) and 'role' in msg and 'content' in msg]
+        messages.append({"role": "user", "content": prompt})
+
+        try:
+            response = self.anthropic.messages.create(
+                model="claude-3-sonnet-20240229",
+                max_tokens=4000,
+                messages=messages,
+                tools=[PROPOSE_SEQUENCES_TOOL],
+                system="You are a protein design expert agent tasked with designing novel proteins for specific purposes."
+            )
+        except Exception as e:
+            self.log(f"Error in structured LLM query: {e}", Colors.RED)
+            self.log("Falling back to plain query with local parsing", Colors.YELLOW)
+            text = self.query_llm(prompt, include_history=include_history)
+            return text, extract_sequences(text)
+
+        text_parts = []
+        sequences = []
+        for block in response.content:
+            if block.type == "text":
+                text_parts.append(block.text)
+            elif block.type == "tool_use" and block.name == PROPOSE_SEQUENCES_TOOL["name"]:
+                sequences.extend(sequences_from_tool_input(block.input))
+        text = "\n".join(text_parts)
+
+        if sequences:
+            self.log(f"Received {len(sequences)} sequences via {PROPOSE_SEQUENCES_TOOL['name']}", Colors.GREEN)
+        else:
+            sequences = extract_sequences(text)
+            self.log(f"No tool call in response; parsed {len(sequences)} sequences from text", Colors.YELLOW)
+        sequences = list(dict.fromkeys(sequences))
+
+        # Record the candidates as plain text so later turns can refer to them
+        history_text = text
+        if sequences:
+            history_text += "\n\nProposed sequences:\n" + "\n".join(sequences)
+        self.conversation_history.append({"role": "user", "content": prompt})
+        self.conversation_history.append({"role": "assistant", "content": history_text})
+
+        self.log(f"Received response: {history_text}", Colors.GREEN)
+        print("-"*80 + "\n")
+        return text, sequences
+
+    def query_llm_streaming(
+        self,
+        prompt: str,
+        on_sequence: Optional[Any] = None,
+        include_history: bool = True
+    ) -> tuple:
+        """
+        Query the LLM with the streaming messages API, parsing sequences as they arrive.
+
+        Args:
+            prompt: The prompt to send to the LLM
+            on_sequence: Called with each candidate sequence as soon as it is complete
+                in the token stream
+            include_history: Whether to include conversation history
+
+        Returns:
+            (response text, list of candidate sequences)
+        """
+        on_sequence = on_sequence or (lambda seq: None)
+        if not self.anthropic:
+            text = self.query_llm(prompt, include_history=include_history)
+            sequences = extract_sequences(text)
+            for seq in sequences:
+                on_sequence(seq)
+            return text, sequences
+
+        print("\n" + "-"*80)
+        self.log("STREAMING REQUEST TO LLM API", Colors.RED)
+        self.log(f"Prompt: {prompt}", Colors.YELLOW)
+
+        messages = []
+        if include_history and self.conversation_history:
+            messages = [msg for msg in self.conversation_history
+                        if isinstance(msg, dict) and 'role' in msg and 'content' in msg]
+        messages.append({"role": "user", "content": prompt})
+
+        parser = StreamingSequenceParser()
+        chunks = []
+        sequences = []
+
+        def emit(batch):
+            for seq in batch:
+                sequences.append(seq)
+                self.log(f"Streamed candidate {len(sequences)}: {seq[:20]}...", Colors.GREEN)
+                on_sequence(seq)
+
+        try:
+            with self.anthropic.messages.stream(
+                model="claude-3-sonnet-20240229",
+                max_tokens=4000,
+                messages=messages,
+                system="You are a protein design expert agent tasked with designing novel proteins for specific purposes."
+            ) as stream:
+                for chunk in stream.text_stream:
+                    chunks.append(chunk)
+                    emit(parser.feed(chunk))
+        except Exception as e:
+            self.log(f"Error streaming from LLM: {e}", Colors.RED)
+            if not chunks:
+                self.log("Falling back to non-streaming query", Colors.YELLOW)
+                text = self.query_llm(prompt, include_history=include_history)
+                emit([seq for seq in extract_sequences(text) if seq not in sequences])
+                return text, sequences
+        emit(parser.close())
+
+        text = "".join(chunks)
+        self.conversation_history.append({"role": "user", "content": prompt})
+        self.conversation_history.append({"role": "assistant", "content": text})
+        self.log(f"Received response: {text}", Colors.GREEN)
+        print("-"*80 + "\n")
+        return text, sequences
+
+    def plan_and_fold_streaming(
+        self,
+        prompt: str,
+        prescreen: Optional[PreScreen] = None,
+        max_folds: Optional[int] = None
+    ) -> tuple:
+        """
+        Stream a planning response and fold candidates while it is still generating.
+
+        Each candidate is validated, checked against the pre-screen constraints
+        and handed to a fold worker the moment it is complete in the stream.
+        Finished structures are kept in self.prefolded, where predict_structures
+        picks them up instead of folding again.
+
+        Args:
+            prompt: Planning prompt
+            prescreen: Pre-screen whose hard constraints a candidate must pass to be folded
+            max_folds: Fold at most this many streamed candidates
+
+        Returns:
+            (response text, candidate sequences, timings dict in seconds with
+            first_sequence, first_fold, llm_done and total)
+        """
+        start = time.monotonic()
+        timings = {"first_sequence": None, "first_fold": None, "llm_done": None, "total": None}
+        lock = threading.Lock()
+        futures = {}
+
+        def fold(seq):
+            structure = self.predict_structure(seq)
+            with lock:
+                if timings["first_fold"] is None:
+                    timings["first_fold"] = time.monotonic() - start
+            return structure
+
+        def on_sequence(seq):
+            seq = self.validate_and_clean_sequence(seq)
+            if timings["first_sequence"] is None:
+                timings["first_sequence"] = time.monotonic() - start
+            if seq in futures or (max_folds is not None and len(futures) >= max_folds):
+                return
+            if prescreen and not prescreen.passes(seq):
+                self.log(f"Streamed candidate {seq[:20]}... fails pre-screen constraints, not folding", Colors.YELLOW)
+                return
+            futures[seq] = executor.submit(fold, seq)
+
+        executor = ThreadPoolExecutor(max_workers=self.fold_concurrency)
+        try:
+            text, sequences = self.query_llm_streaming(prompt, on_sequence, include_history=False)
+            timings["llm_done"] = time.monotonic() - start
+            for seq, future in futures.items():
+                self.prefolded[seq] = future.result()
+        finally:
+            executor.shutdown(wait=True)
+        timings["total"] = time.monotonic() - start
+
+        fmt = lambda t: f"{t:.1f}s" if t is not None else "n/a"
+        self.log(f"Streamed planning: first sequence {fmt(timings['first_sequence'])}, "
+                 f"first fold {fmt(timings['first_fold'])}, LLM done {fmt(timings['llm_done'])}, "
+                 f"total {fmt(timings['total'])} ({len(futures)} folds overlapped)", Colors.GREEN)
+        return text, sequences, timings
+
     def predict_binding(self, sequence: str, target: str) -> float:
         """
         Call the MCP server to predict binding affinity to target protein.
@@ -778,10 +1786,11 @@ class ProteinDesignAgent:
         # In a real implementation, this would call the MCP server
         self.log("Simulating binding prediction (MCP server call)", Colors.RED)
         
-        # Simulate a binding score
-        binding_score = 0.5 + (self.current_iteration * 0.05)  # Fake improvement over iterations
+        # Shared with fold_queue score workers so both give the same score
+        binding_score = predict_binding_score(sequence, target, self.current_iteration)
         
         self.log(f"Binding prediction complete, score: {binding_score:.2f}", Colors.GREEN)
+        self.observe_outcome("binding", sequence, binding_score)
         return binding_score
     
     def run(self, user_prompt: str) -> Dict[str, Any]:
@@ -794,6 +1803,29 @@ class ProteinDesignAgent:
         Returns:
             Results of the protein design process
         """
+        if not self.profile:
+            return self._run_session(user_prompt)
+        
+        profiler = self.profiler = SessionProfiler(self.profile, self.session_id)
+        try:
+            with profiler:
+                profiler.instrument_loop(self._event_loop())
+                results = self._run_session(user_prompt)
+        finally:
+            self.profiler = None
+            self.log(f"Session profile written to {profiler.summary_path}", Colors.BLUE)
+            for line in profiler.top_hotspots(5):
+                self.log(f"  {line.strip()}", Colors.BLUE)
+        results["profile"] = {
+            "mode": profiler.mode,
+            "directory": profiler.dir,
+            "summary": profiler.summary_path,
+            "hotspots": profiler.top_hotspots()
+        }
+        return results
+    
+    def _run_session(self, user_prompt: str) -> Dict[str, Any]:
+        """One design session; see run."""
         try:
             self.log(f"Starting protein design process for: {user_prompt}", Colors.BLUE)
             
@@ -804,16 +1836,28 @@ class ProteinDesignAgent:
                 self.log("Will use ESMfold API calls as fallback", Colors.YELLOW)
             
             # Initialize a new session
-            self.conversation_history = []
+            self.conversation_history = self._new_history()
             self.current_iteration = 0
             self.best_sequence = None
             self.best_score = float('-inf')
+            self.representative_coords = []
             
             # Step 1: Initial planning
             self.log(f"STARTING INITIAL PLANNING", Colors.BLUE)
+            if self.stream_llm:
+                # FASTA text can be parsed incrementally out of the token stream
+                format_instruction = "List every sequence as a FASTA record (a '>' header line, then the sequence)."
+            else:
+                format_instruction = (
+                    "Submit the sequences with the propose_sequences tool, using standard one-letter codes "
+                    "(ACDEFGHIKLMNPQRSTVWY). If you cannot use the tool, list them as FASTA records instead."
+                )
+            literature = self.literature_context(user_prompt)
             initial_prompt = f"""
             I need your help with this protein design task: "{user_prompt}"
             
+            {literature}
+            
             First, analyze this request and create a plan:
             1. What are the key requirements and constraints?
             2. What approach will you take to design this protein?
@@ -822,44 +1866,30 @@ class ProteinDesignAgent:
             
             Please generate 2-3 initial amino acid sequences that meet these requirements.
             For each sequence, explain your design rationale.
-            """
-            
-            planning_response = self.query_llm(initial_prompt, include_history=False)
-            self.log("Initial planning complete", Colors.BLUE)
-            
-            # Extract sequences from the response using the LLM
-            self.log("Requesting specific sequence format from LLM", Colors.BLUE)
-            extract_prompt = """
-            Based on your previous response, I need the sequences in a very specific format.
             
-            Please provide ONLY the amino acid sequences using one-letter codes (ACDEFGHIKLMNPQRSTVWY).
-            Format each sequence on its own line with NO additional text, numbers, or formatting.
-            
-            Example of the exact format I need:
-            MAAKLVQAGKAAIALLKLLLKKR
-            WTAVKIYGRPYPIEWGN
-            DEFGHIKLM
-            
-            Please extract and format ONLY the sequences from your previous response exactly as shown above.
+            {format_instruction}
             """
             
-            sequences_response = self.query_llm(extract_prompt)
+            prescreen = None
+            if self.prescreen_keep_fraction is not None:
+                prescreen = PreScreen.from_prompt(user_prompt, keep_fraction=self.prescreen_keep_fraction)
             
-            # Extract sequences - much simpler now, just get non-empty lines
-            sequences = []
-            for line in sequences_response.split("\n"):
-                cleaned_line = line.strip()
-                # Skip empty lines and lines that are clearly not sequences
-                if cleaned_line and not cleaned_line.startswith(">") and not cleaned_line.startswith("#"):
-                    # Only keep valid amino acid characters
-                    valid_sequence = ''.join(c for c in cleaned_line.upper() if c in "ACDEFGHIKLMNPQRSTVWY")
-                    if valid_sequence and len(valid_sequence) >= 10:  # Minimum length check
-                        sequences.append(valid_sequence)
+            if self.stream_llm:
+                # Folding starts while the LLM is still writing the rest of the plan
+                self.prefolded = {}
+                planning_response, sequences, stream_timings = self.plan_and_fold_streaming(
+                    initial_prompt, prescreen, max_folds=self.folds_per_iteration
+                )
+            else:
+                # One round trip returns both the plan and the candidate sequences
+                planning_response, sequences = self.query_llm_for_candidates(initial_prompt, include_history=False)
+                stream_timings = None
+            self.log("Initial planning complete", Colors.BLUE)
             
             if not sequences:
                 # Fallback in case no sequences were found
                 self.log("No valid sequences found in LLM response, using placeholder", Colors.YELLOW)
-                self.log("Here was the response:\n" + sequences_response, Colors.YELLOW)
+                self.log("Here was the response:\n" + planning_response, Colors.YELLOW)
                 sequences = ["ALELAELALELAELALELAELALELAELALELAELALELAELALELAEL"]
             else:
                 self.log(f"Successfully extracted {len(sequences)} sequences", Colors.GREEN)
@@ -874,25 +1904,36 @@ class ProteinDesignAgent:
                 "final_sequence": None,
                 "final_binding_score": None,
                 "final_structure": None,
-                "rationale": None
+                "rationale": None,
+                "planning_stream": stream_timings
             }
             
-            # Modified to run just 1 iteration and process only the first sequence
-            max_iterations = 1  # Just 1 iteration
+            # Candidate pool for the first iteration comes from the LLM plan
+            candidates = list(dict.fromkeys(sequences))
+            evaluated = {}  # sequence -> binding score
+            redundant = set()  # folded, but structurally redundant with a kept candidate
+            target = self.extract_target(user_prompt)
+            constraints = parse_constraints(user_prompt)
+            plddts = {}  # sequence -> mean pLDDT of its fold
+            front = []  # Pareto front over everything evaluated so far
+            
+            max_iterations = self.max_iterations
             for iteration in range(max_iterations):
                 self.current_iteration = iteration + 1
                 self.log(f"STARTING ITERATION {self.current_iteration}/{max_iterations}", Colors.BOLD + Colors.BLUE)
                 
                 # Check if user wants to stop
-                try:
-                    user_input = input(f"{Colors.CYAN}Press Enter to continue to iteration {self.current_iteration}, or type 'stop' to end: {Colors.END}")
-                    if user_input.lower() == 'stop':
-                        self.log("Process stopped by user", Colors.YELLOW)
+                if self.interactive:
+                    try:
+                        user_input = input(f"{Colors.CYAN}Press Enter to continue to iteration {self.current_iteration}, or type 'stop' to end: {Colors.END}")
+                        if user_input.lower() == 'stop':
+                            self.log("Process stopped by user", Colors.YELLOW)
+                            break
+                    except KeyboardInterrupt:
+                        self.log("Process interrupted by user", Colors.YELLOW)
                         break
-                except KeyboardInterrupt:
-                    self.log("Process interrupted by user", Colors.YELLOW)
-                    break
                     
+                iteration_start = time.monotonic()
                 iteration_results = {
                     "iteration": self.current_iteration,
                     "sequences": [],
@@ -902,36 +1943,174 @@ class ProteinDesignAgent:
                     "best_score": None
                 }
                 
-                # Process only the first sequence to minimize MCP requests
-                if sequences:
-                    sequence = sequences[0]
-                    self.log(f"Processing sequence: {sequence[:20]}...", Colors.BLUE)
+                # Ask for new designs that build on the whole front, not only the best binder
+                if self.refine_with_llm and front:
+                    refinement_prompt = f"""
+                    We are designing for the task: "{user_prompt}"
                     
-                    # Predict structure - this makes one MCP request
-                    structure = self.predict_structure(sequence)
+                    After {iteration} iteration(s), these candidates are Pareto-optimal: none is
+                    beaten on every objective (binding, fold confidence, length and helicity,
+                    aggregation and charge) by another candidate:
+                    {format_front(front)}
                     
-                    # Extract target from prompt
-                    target = "MDM2"  # Default/placeholder - in real implementation we'd extract this properly
-                    if "binds" in user_prompt.lower():
-                        parts = user_prompt.lower().split("binds")
-                        if len(parts) > 1:
-                            target = parts[1].strip()
+                    Propose 2-3 new sequences that improve on these trade-offs, and explain
+                    which objectives each one targets.
                     
-                    # Predict binding
-                    binding_score = self.predict_binding(sequence, target)
+                    {format_instruction}
+                    """
+                    _, proposed = self.query_llm_for_candidates(refinement_prompt)
+                    proposed = [seq for seq in proposed if seq not in evaluated and seq not in candidates]
+                    candidates = proposed + candidates
+                    iteration_results["llm_candidates"] = len(proposed)
+                    self.log(f"LLM proposed {len(proposed)} new candidates from the Pareto front", Colors.BLUE)
+                
+                # Top up the pool with local variants of the best sequence so far
+                if self.local_candidates > 0:
+                    parent = self.best_sequence or (candidates[0] if candidates else sequences[0])
+                    top = [record["sequence"] for record in front] or \
+                        sorted(evaluated, key=evaluated.get, reverse=True)[:8]
+                    variants = self.generate_local_candidates(
+                        parent, self.local_candidates, top_candidates=top,
+                        exclude=set(evaluated) | set(candidates) | redundant
+                    )
+                    candidates.extend(variants)
+                
+                # Stapled versions of the best helix so far, folded as Ala proxies
+                if self.staple_candidates > 0:
+                    parent = self.best_sequence or (candidates[0] if candidates else sequences[0])
+                    candidates.extend(self.generate_staple_candidates(
+                        parent, self.staple_candidates, exclude=set(evaluated) | set(candidates) | redundant
+                    ))
+                
+                pool = [seq for seq in candidates if seq not in evaluated and seq not in redundant]
+                
+                # Exact folds that finished in the background since the last iteration
+                resolved = self.resolve_provisional_folds(timeout=0.0)
+                if resolved:
+                    iteration_results["exact_folds_resolved"] = len(resolved)
+                
+                # Drop candidates that are one or two residues away from something already folded
+                if self.near_duplicate_similarity is not None and pool and len(self.similarity_index):
+                    fresh = [seq for seq in pool
+                             if not self.similarity_index.nearest(seq, 1, self.near_duplicate_similarity)]
+                    if len(fresh) < len(pool):
+                        redundant.update(set(pool) - set(fresh))
+                        iteration_results["near_duplicates"] = len(pool) - len(fresh)
+                        self.log(f"Dropped {len(pool) - len(fresh)} near-duplicates of folded sequences", Colors.BLUE)
+                        pool = fresh
+                
+                # Rank and prune the pool on cheap sequence descriptors before folding
+                if prescreen and pool:
+                    screen = prescreen.screen(pool)
+                    # Only the first folds_per_iteration candidates are folded either way, so pruning
+                    # saves a fold only where it leaves fewer candidates than that budget
+                    folds_saved = 0
+                    if screen["kept"]:
+                        folds_saved = (min(screen["screened"], self.folds_per_iteration)
+                                       - min(len(screen["kept"]), self.folds_per_iteration))
+                    iteration_results["prescreen"] = {
+                        "screened": screen["screened"],
+                        "passed": screen["passed"],
+                        "kept": len(screen["kept"]),
+                        "pruned": screen["pruned"],
+                        "folds_saved": folds_saved
+                    }
+                    self.log(f"Pre-screen kept {len(screen['kept'])}/{screen['screened']} candidates "
+                             f"({screen['passed']} passed constraints, {folds_saved} folds saved)", Colors.BLUE)
+                    if screen["kept"]:
+                        pool = screen["kept"]
+                    else:
+                        self.log("No candidate passed the pre-screen constraints; folding unscreened", Colors.YELLOW)
+                
+                # Let the surrogates decide which candidates are worth folding
+                trusted = {kind: model for kind, model in self.surrogates.items()
+                           if model.n_observations >= self.surrogate_min_observations
+                           and self.surrogate_weights.get(kind)}
+                if self.surrogate_beta is not None and trusted and len(pool) > self.folds_per_iteration:
+                    mean, std = combine_predictions(
+                        [model.predict(pool) for model in trusted.values()],
+                        [self.surrogate_weights[kind] for kind in trusted]
+                    )
+                    order = select_ucb(mean, std, len(pool), beta=self.surrogate_beta)
+                    pool = [pool[i] for i in order]
+                    top = order[:self.folds_per_iteration]
+                    iteration_results["surrogate"] = {
+                        "observations": {kind: model.n_observations for kind, model in trusted.items()},
+                        "predicted_scores": mean[top].tolist(),
+                        "predicted_stds": std[top].tolist()
+                    }
+                    self.log(f"Surrogates ({', '.join(trusted)}) selected "
+                             f"{len(top)}/{len(pool)} candidates by UCB", Colors.BLUE)
+                
+                # Candidates already folded during streamed planning go first
+                if self.prefolded:
+                    pool = list(self.prefolded) + [seq for seq in pool if seq not in self.prefolded]
+                
+                # Fold only the first few candidates to limit MCP requests
+                batch = pool[:self.folds_per_iteration]
+                candidates = pool[self.folds_per_iteration:]
+                if batch:
+                    self.log(f"Processing {len(batch)} of {len(batch) + len(candidates)} candidates", Colors.BLUE)
+                    
+                    # Predict structures - one MCP request (or queued job) per sequence
+                    structures = self.predict_structures(batch, target=target)
+                    folded = list(zip(batch, structures))
+                    for sequence, structure in folded:
+                        self.record_fold(sequence, structure)
                     
-                    # Track results
-                    iteration_results["sequences"].append(sequence)
-                    iteration_results["structures"].append(structure)
-                    iteration_results["binding_scores"].append(binding_score)
+                    # Score only one representative per structural cluster
+                    if self.structure_tm_threshold is not None:
+                        confidence = [self.structure_plddt(s) for s in structures]
+                        diversity = select_diverse(
+                            [self.structure_pdb(s) for s in structures], confidence,
+                            tm_threshold=self.structure_tm_threshold,
+                            reference_coords=self.representative_coords
+                        )
+                        keep = diversity["representatives"]
+                        self.representative_coords.extend(diversity["coords"][i] for i in keep)
+                        redundant.update(batch[i] for i in range(len(batch)) if i not in keep)
+                        folded = [folded[i] for i in keep]
+                        iteration_results["diversity"] = {
+                            "folded": len(batch),
+                            "representatives": len(keep),
+                            "redundant": len(batch) - len(keep)
+                        }
+                        self.log(f"Structural clustering kept {len(keep)}/{len(batch)} folds "
+                                 f"(TM >= {self.structure_tm_threshold:.2f} counts as redundant)", Colors.BLUE)
                     
-                    # Update best sequence if this is better
-                    if binding_score > self.best_score:
-                        self.best_sequence = sequence
-                        self.best_score = binding_score
+                    for sequence, structure in folded:
+                        # Predict binding, unless a fold queue worker already scored it
+                        binding_score = structure.get("binding_score")
+                        if binding_score is None:
+                            binding_score = self.predict_binding(sequence, target)
+                        else:
+                            self.observe_outcome("binding", sequence, binding_score)
+                        evaluated[sequence] = binding_score
+                        plddts[sequence] = self.structure_plddt(structure)
                         
-                    # Log results
-                    self.log(f"Sequence: binding score = {binding_score:.2f}", Colors.GREEN)
+                        # Track results
+                        iteration_results["sequences"].append(sequence)
+                        # Without an artifact store the PDB travels with the results;
+                        # the private server's directory is removed at the end of the run
+                        if not self.artifacts:
+                            self.structure_pdb(structure)
+                        iteration_results["structures"].append(
+                            self.artifacts.spill_structure(structure) if self.artifacts else structure
+                        )
+                        iteration_results["binding_scores"].append(binding_score)
+                        
+                        # Update best sequence if this is better
+                        if binding_score > self.best_score:
+                            self.best_sequence = sequence
+                            self.best_score = binding_score
+                            
+                        # Log results
+                        self.log(f"Sequence {sequence[:20]}...: binding score = {binding_score:.2f}", Colors.GREEN)
+                
+                stapled = {seq: self.staple_placements[seq] for seq in iteration_results["sequences"]
+                           if seq in self.staple_placements}
+                if stapled:
+                    iteration_results["staples"] = stapled
                 
                 # Update iteration best
                 if iteration_results["binding_scores"]:
@@ -939,14 +2118,42 @@ class ProteinDesignAgent:
                     iteration_results["best_sequence"] = iteration_results["sequences"][best_idx]
                     iteration_results["best_score"] = iteration_results["binding_scores"][best_idx]
                 
+                # Rank everything evaluated so far on all objectives, not binding alone
+                if evaluated:
+                    ranking = rank_candidates(
+                        list(evaluated), list(evaluated.values()), [plddts.get(seq) for seq in evaluated],
+                        target_length=constraints["target_length"], helical=constraints["helical"]
+                    )
+                    front = [record for record in ranking if record["pareto_rank"] == 0][:self.pareto_front_size]
+                    iteration_results["pareto_front"] = front
+                    self.log(f"Pareto front: {sum(r['pareto_rank'] == 0 for r in ranking)} of "
+                             f"{len(ranking)} evaluated candidates", Colors.BLUE)
+                
                 # Add to results
+                iteration_results["latency_seconds"] = time.monotonic() - iteration_start
                 results["iterations"].append(iteration_results)
-                
-                # Skip generation of new sequences since we only do one iteration
             
             # Final results
             results["final_sequence"] = self.best_sequence
             results["final_binding_score"] = self.best_score
+            results["pareto_front"] = front
+            if self.pending_exact_folds or self.provisional_similarity is not None:
+                results["exact_structures"] = self.resolve_provisional_folds(timeout=self.fold_queue_timeout)
+                if self.artifacts:
+                    results["exact_structures"] = {
+                        seq: self.artifacts.spill_structure(structure)
+                        for seq, structure in results["exact_structures"].items()
+                    }
+                else:
+                    for structure in results["exact_structures"].values():
+                        self.structure_pdb(structure)
+            if self.artifacts:
+                results["artifacts"] = {
+                    "root": self.artifacts.root,
+                    "transcript": self.artifacts.transcript_path(self.session_id),
+                    "history_messages_spilled": getattr(self.conversation_history, "spilled", 0),
+                    "cache": self.artifacts.cache_stats()
+                }
             
             # Get final analysis from LLM
             final_prompt = f"""
@@ -956,9 +2163,12 @@ class ProteinDesignAgent:
             - Best sequence: {self.best_sequence}
             - Best binding score: {self.best_score:.2f}
             
+            Pareto front (no candidate is beaten on every objective by another):
+            {format_front(front) or "- none evaluated"}
+            
             Please provide:
             1. A summary of the design process and what we learned
-            2. An analysis of the final sequence and why it's effective
+            2. An analysis of the final sequence and the trade-offs across the Pareto front
             3. Suggestions for further optimization if we were to continue
             4. Any limitations or considerations for experimental validation
             """
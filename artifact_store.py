@@ -0,0 +1,179 @@
+"""
+On-disk store for large session artifacts, referenced by handle.
+
+Long campaigns otherwise keep every PDB string (iteration results, tool
+results) and the whole LLM transcript in process memory. With an
+ArtifactStore, structures are written once under their SHA-256 and the
+in-memory records only keep a short handle:
+
+    artifact:pdb/<sha256>
+
+Reads go through a small LRU cache bounded in bytes, so RSS stays flat no
+matter how many artifacts a campaign produces. BoundedHistory does the same
+for the conversation transcript: turns beyond a character budget are
+appended to a JSONL file in the store and dropped from memory.
+
+Layout:
+    <root>/pdb/ab/abcdef....pdb
+    <root>/history/<session_id>.jsonl
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+HANDLE_PREFIX = "artifact:"
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+DEFAULT_HISTORY_CHARS = 200_000
+
+
+def is_handle(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(HANDLE_PREFIX)
+
+
+class ArtifactStore:
+    """Content-addressed text artifacts on disk with a byte-bounded read cache."""
+
+    def __init__(self, root: str, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        """
+        Args:
+            root: Directory the artifacts live in (created if missing)
+            cache_bytes: Most artifact bytes kept in memory for repeated reads
+        """
+        self.root = os.path.abspath(root)
+        self.cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cached = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, handle: str) -> str:
+        kind, _, digest = handle[len(HANDLE_PREFIX):].partition("/")
+        if not kind or len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise ValueError(f"Not an artifact handle: {handle!r}")
+        return os.path.join(self.root, kind, digest[:2], f"{digest}.{kind}")
+
+    def _remember(self, handle: str, text: str) -> None:
+        size = len(text)
+        if size > self.cache_bytes:
+            return
+        with self._lock:
+            if handle in self._cache:
+                self._cache.move_to_end(handle)
+                return
+            self._cache[handle] = text
+            self._cached += size
+            while self._cached > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached -= len(evicted)
+
+    def put(self, text: str, kind: str = "pdb") -> str:
+        """Store text (idempotent) and return its handle."""
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        handle = f"{HANDLE_PREFIX}{kind}/{digest}"
+        path = self._path(handle)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        return handle
+
+    def get(self, handle: str) -> str:
+        """Text behind a handle; raises KeyError if it is not in the store."""
+        with self._lock:
+            text = self._cache.get(handle)
+            if text is not None:
+                self._cache.move_to_end(handle)
+                return text
+        try:
+            with open(self._path(handle), encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            raise KeyError(handle) from None
+        self._remember(handle, text)
+        return text
+
+    def spill_structure(self, structure: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of a structure record with its PDB text replaced by a handle."""
+        pdb_text = structure.get("pdb_text")
+        if not isinstance(pdb_text, str):
+            return structure
+        spilled = {k: v for k, v in structure.items() if k != "pdb_text"}
+        spilled["pdb_handle"] = self.put(pdb_text, "pdb")
+        spilled["pdb_bytes"] = len(pdb_text)
+        return spilled
+
+    def load_structure(self, structure: Dict[str, Any]) -> Dict[str, Any]:
+        """Inverse of spill_structure."""
+        if "pdb_handle" not in structure:
+            return structure
+        loaded = {k: v for k, v in structure.items() if k not in ("pdb_handle", "pdb_bytes")}
+        loaded["pdb_text"] = self.get(structure["pdb_handle"])
+        return loaded
+
+    def transcript_path(self, session_id: str) -> str:
+        return os.path.join(self.root, "history", f"{session_id}.jsonl")
+
+    def cache_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._cache), "bytes": self._cached, "budget_bytes": self.cache_bytes}
+
+
+def _message_chars(message: Any) -> int:
+    content = message.get("content", "") if isinstance(message, dict) else message
+    return len(content) if isinstance(content, str) else len(json.dumps(content, default=str))
+
+
+class BoundedHistory(list):
+    """
+    Conversation history capped at a character budget.
+
+    Behaves like the plain list the agent used before. When appending pushes
+    the total over the budget, the oldest user/assistant pair is written to the
+    transcript file and dropped, so every prompt still sees the most recent
+    turns and the full transcript survives on disk.
+    """
+
+    def __init__(self, transcript_path: Optional[str], max_chars: int = DEFAULT_HISTORY_CHARS,
+                 messages: Iterable[Any] = ()):
+        super().__init__()
+        self.transcript_path = transcript_path
+        self.max_chars = max_chars
+        self.chars = 0
+        self.spilled = 0
+        if transcript_path:
+            os.makedirs(os.path.dirname(transcript_path), exist_ok=True)
+        for message in messages:
+            self.append(message)
+
+    def append(self, message: Any) -> None:
+        super().append(message)
+        self.chars += _message_chars(message)
+        self._trim()
+
+    def extend(self, messages: Iterable[Any]) -> None:
+        for message in messages:
+            self.append(message)
+
+    def _trim(self) -> None:
+        # Never drop the newest pair: the current exchange must stay in context
+        while self.chars > self.max_chars and len(self) > 2:
+            dropped = [self.pop(0), self.pop(0)]
+            self.chars -= sum(_message_chars(m) for m in dropped)
+            self.spilled += len(dropped)
+            if self.transcript_path:
+                with open(self.transcript_path, "a", encoding="utf-8") as f:
+                    for message in dropped:
+                        f.write(json.dumps(message, default=str) + "\n")
+
+    def full_transcript(self) -> List[Any]:
+        """Spilled turns read back from disk, followed by the in-memory ones."""
+        spilled = []
+        if self.transcript_path and os.path.exists(self.transcript_path):
+            with open(self.transcript_path, encoding="utf-8") as f:
+                spilled = [json.loads(line) for line in f]
+        return spilled + list(self)
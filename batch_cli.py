@@ -0,0 +1,316 @@
+"""
+Headless batch runner: one ProteinDesignAgent session per prompt, across a process pool.
+
+Prompts come from a text file (one prompt per line; blank lines and lines
+starting with # are skipped) or JSON lines of the form
+
+    {"id": "mdm2-helix", "prompt": "Design a ...", "max_iterations": 3}
+
+where any key besides id and prompt overrides a ProteinDesignAgent argument
+for that prompt. Each finished session is appended to the output JSONL as
+soon as it completes, so a crashed or interrupted screen loses nothing.
+
+All sessions share one fold_server over streamable HTTP (its connection pool,
+fold memo and in-flight coalescing) and, with --similarity-index, one MinHash
+index of folded sequences.
+
+    python batch_cli.py prompts.txt --output results.jsonl --concurrency 8
+    python batch_cli.py prompts.jsonl --output results.jsonl --resume --time-budget 28800
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+import traceback
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Set
+from urllib.parse import urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FOLD_SERVER_PATH = os.path.join(HERE, "fold_server.py")
+
+# Result keys holding PDB text; dropped from the JSONL unless --include-structures
+STRUCTURE_KEYS = ("final_structure", "exact_structures")
+
+
+def prompt_id(prompt: str) -> str:
+    """Stable id of a prompt without an explicit one, so --resume can match it."""
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+def read_prompts(path: str) -> Iterator[Dict[str, Any]]:
+    """Jobs ({"id", "prompt", "overrides"}) from a text or JSON lines file."""
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{path}:{line_no}: invalid JSON: {e}") from e
+                prompt = record.pop("prompt", None)
+                if not prompt:
+                    raise ValueError(f"{path}:{line_no}: missing 'prompt'")
+                job_id = str(record.pop("id", None) or prompt_id(prompt))
+                yield {"id": job_id, "prompt": prompt, "overrides": record}
+            else:
+                yield {"id": prompt_id(line), "prompt": line, "overrides": {}}
+
+
+def finished_ids(path: str) -> Set[str]:
+    """Ids that already completed successfully in an existing output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by a crash; that prompt is simply run again
+                continue
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def _strip_structures(results: Dict[str, Any]) -> Dict[str, Any]:
+    results = {k: v for k, v in results.items() if k not in STRUCTURE_KEYS}
+    results["iterations"] = [
+        {k: v for k, v in iteration.items() if k != "structures"}
+        for iteration in results.get("iterations", [])
+    ]
+    return results
+
+
+def run_session(job: Dict[str, Any], agent_kwargs: Dict[str, Any], include_structures: bool) -> Dict[str, Any]:
+    """Run one design session in a pool worker and return its JSONL record."""
+    from agent import ProteinDesignAgent
+
+    started = time.monotonic()
+    record = {"id": job["id"], "prompt": job["prompt"], "worker_pid": os.getpid()}
+    try:
+        agent = ProteinDesignAgent(**{**agent_kwargs, **job["overrides"], "interactive": False})
+        results = agent.run(job["prompt"])
+        record.update(results if include_structures else _strip_structures(results))
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+        record["traceback"] = traceback.format_exc()
+    record["elapsed_seconds"] = time.monotonic() - started
+    return record
+
+
+def _server_pid(port: int) -> Optional[int]:
+    """Pid reported by the fold_server answering on a local port, or None if nothing answers."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1.0) as response:
+            return json.load(response).get("pid")
+    except (OSError, ValueError):
+        return None
+
+
+def start_fold_server(port: int, workers: int, timeout: float = 30.0) -> subprocess.Popen:
+    """
+    Launch a shared fold_server over streamable HTTP and wait until it is serving.
+
+    The server counts as up only once its /health route reports the pid of
+    the process started here, so another listener on the port is never
+    mistaken for it.
+    """
+    with socket.socket() as probe:
+        try:
+            probe.bind(("127.0.0.1", port))
+        except OSError:
+            raise RuntimeError(f"Port {port} is already in use; pass --fold-server-url to use that server "
+                               f"or --fold-server-port to pick another port") from None
+    proc = subprocess.Popen(
+        [sys.executable, FOLD_SERVER_PATH, "--transport", "streamable-http",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        stdout=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"fold_server exited with code {proc.returncode}")
+        pid = _server_pid(port)
+        if pid == proc.pid:
+            return proc
+        if pid is not None:
+            stop_process(proc)
+            raise RuntimeError(f"Port {port} is answered by another fold_server (pid {pid})")
+        time.sleep(0.2)
+    stop_process(proc)
+    raise RuntimeError(f"fold_server did not start serving on port {port} within {timeout:.0f}s")
+
+
+def stop_process(proc: Optional[subprocess.Popen]) -> None:
+    if proc is None or proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn: workers must not inherit the parent's event loop or threads
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def run_batch(
+    jobs: List[Dict[str, Any]],
+    output: str,
+    agent_kwargs: Dict[str, Any],
+    concurrency: int,
+    time_budget: Optional[float] = None,
+    include_structures: bool = False
+) -> Dict[str, int]:
+    """
+    Run jobs on a process pool, appending each record to `output` as it finishes.
+
+    At most `concurrency` sessions are in flight; new ones stop being started
+    once `time_budget` seconds have passed, and running ones are allowed to finish.
+    A worker that dies (e.g. OOM kill) breaks the whole pool: the sessions
+    that were in flight are recorded as errors and a fresh pool runs the rest.
+
+    Returns:
+        Counts of ok, error and not-started (budget) sessions
+    """
+    counts = {"ok": 0, "error": 0, "not_started": 0}
+    started = time.monotonic()
+    pending = list(reversed(jobs))
+    in_flight = {}
+    pool = _process_pool(concurrency)
+    try:
+        with open(output, "a", encoding="utf-8") as out:
+            while pending or in_flight:
+                over_budget = time_budget is not None and time.monotonic() - started >= time_budget
+                while pending and len(in_flight) < concurrency and not over_budget:
+                    job = pending.pop()
+                    try:
+                        future = pool.submit(run_session, job, agent_kwargs, include_structures)
+                    except BrokenProcessPool:
+                        pool.shutdown(wait=False)
+                        pool = _process_pool(concurrency)
+                        future = pool.submit(run_session, job, agent_kwargs, include_structures)
+                    in_flight[future] = (job, pool)
+                if over_budget and pending:
+                    print(f"Time budget reached; {len(pending)} prompts not started", file=sys.stderr)
+                    counts["not_started"] += len(pending)
+                    pending = []
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job, job_pool = in_flight.pop(future)
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        # The worker process itself died (e.g. OOM kill)
+                        record = {"id": job["id"], "prompt": job["prompt"], "status": "error",
+                                  "error": f"{type(e).__name__}: {e}"}
+                        if isinstance(e, BrokenProcessPool) and job_pool is pool:
+                            print("Worker process died; starting a new process pool", file=sys.stderr)
+                            pool.shutdown(wait=False)
+                            pool = _process_pool(concurrency)
+                    out.write(json.dumps(record, default=str) + "\n")
+                    out.flush()
+                    counts[record["status"]] += 1
+                    score = record.get("final_binding_score")
+                    detail = f"score {score:.2f}" if isinstance(score, (int, float)) else record.get("error", "")
+                    print(f"[{counts['ok'] + counts['error']}/{len(jobs)}] {record['status']:5s} {job['id']} "
+                          f"({record.get('elapsed_seconds', 0.0):.1f}s) {detail}", file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        print("Interrupted; cancelling sessions that have not started", file=sys.stderr)
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown()
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run many protein design prompts without interaction")
+    parser.add_argument("prompts", help="Text file (one prompt per line) or JSON lines with id/prompt/overrides")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1, help="Sessions run in parallel")
+    parser.add_argument("--resume", action="store_true",
+                        help="Keep the output file and skip prompts that already finished successfully")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Replace an existing output file instead of refusing to run")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="Stop starting new sessions after this many seconds")
+    parser.add_argument("--max-sessions", type=int, default=None, help="Run at most this many sessions")
+    parser.add_argument("--max-iterations", type=int, default=1, help="Design iterations per session")
+    parser.add_argument("--folds-per-iteration", type=int, default=1)
+    parser.add_argument("--local-candidates", type=int, default=0)
+    parser.add_argument("--fold-server-url", default=os.environ.get("FOLD_SERVER_URL"),
+                        help="Existing shared fold server; by default one is started for the batch")
+    parser.add_argument("--fold-server-port", type=int, default=8000)
+    parser.add_argument("--stdio-fold-servers", action="store_true",
+                        help="Let every session spawn its own stdio fold_server instead of sharing one")
+    parser.add_argument("--fold-queue-url", default=None, help="Fold through fold_queue workers instead")
+    parser.add_argument("--similarity-index", default=None,
+                        help="SQLite MinHash index shared by all sessions (near-duplicate and provisional folds)")
+    parser.add_argument("--include-structures", action="store_true", help="Keep PDB text in the output")
+    parser.add_argument("--verbose", action="store_true", help="Print each session's agent log")
+    args = parser.parse_args(argv)
+
+    jobs = list(read_prompts(args.prompts))
+    if args.resume:
+        done = finished_ids(args.output)
+        skipped = sum(job["id"] in done for job in jobs)
+        jobs = [job for job in jobs if job["id"] not in done]
+        print(f"Resuming: {skipped} prompts already finished", file=sys.stderr)
+    elif os.path.exists(args.output) and os.path.getsize(args.output):
+        if not args.overwrite:
+            parser.error(f"{args.output} already exists; pass --resume to continue it or --overwrite to replace it")
+        open(args.output, "w").close()
+    if args.max_sessions is not None:
+        jobs = jobs[:args.max_sessions]
+    if not jobs:
+        print("Nothing to run", file=sys.stderr)
+        return
+
+    fold_server = None
+    fold_server_url = args.fold_server_url
+    if not fold_server_url and not args.stdio_fold_servers and not args.fold_queue_url:
+        fold_server = start_fold_server(args.fold_server_port, workers=max(16, 2 * args.concurrency))
+        fold_server_url = f"http://127.0.0.1:{args.fold_server_port}/mcp"
+    if fold_server_url:
+        print(f"Sharing fold server {urlparse(fold_server_url).netloc} across sessions", file=sys.stderr)
+
+    agent_kwargs = {
+        "esmfold_mcp_path": FOLD_SERVER_PATH,
+        "verbose": args.verbose,
+        "max_iterations": args.max_iterations,
+        "folds_per_iteration": args.folds_per_iteration,
+        "local_candidates": args.local_candidates,
+        "fold_server_url": fold_server_url,
+        "fold_queue_url": args.fold_queue_url,
+        "similarity_index_path": args.similarity_index,
+    }
+    started = time.monotonic()
+    try:
+        counts = run_batch(jobs, args.output, agent_kwargs, max(args.concurrency, 1),
+                           args.time_budget, args.include_structures)
+    finally:
+        stop_process(fold_server)
+    print(f"Finished in {time.monotonic() - started:.1f}s: {counts['ok']} ok, {counts['error']} failed, "
+          f"{counts['not_started']} not started; results in {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,681 @@
+"""
+Distributed fold/score job queue.
+
+ProteinDesignAgent enqueues fold jobs (structure only) or score jobs (structure,
+pLDDT and binding score) on a broker, and worker
+processes on any node lease those jobs, run the fold_server logic and write
+the results back.
+
+Brokers:
+    sqlite:///path/to/queue.db   - local SQLite file (single host / shared disk)
+    tcp://host:port              - JSON-lines TCP front end to a SQLite broker
+
+Run a broker for several nodes:
+    python fold_queue.py broker --db fold_queue.db --port 8765
+
+Run workers against it (one process per --concurrency):
+    python fold_queue.py worker --broker tcp://broker-host:8765 --concurrency 4
+
+Inspect backlog and per-worker rates:
+    python fold_queue.py stats --broker tcp://broker-host:8765
+"""
+import abc
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+# Job states
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_LEASE_SECONDS = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class Broker(abc.ABC):
+    """
+    Interface every queue backend implements.
+
+    Jobs are plain dicts with the keys: id, kind, payload, status, attempts,
+    max_attempts, worker_id, lease_expires, result, error, created, started,
+    finished.
+    """
+
+    @abc.abstractmethod
+    def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> str:
+        ...
+
+    @abc.abstractmethod
+    def lease(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              kinds: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abc.abstractmethod
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def complete(self, job_id: str, worker_id: str, result: Any) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    def get_many(self, job_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return [self.get(job_id) for job_id in job_ids]
+
+    @abc.abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBroker(Broker):
+    """
+    Broker backed by a single SQLite file.
+
+    Leases are claimed inside an IMMEDIATE transaction so concurrent workers
+    never receive the same job. A lease that is not renewed before it expires
+    is handed out again, which is how crashed workers are recovered.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                worker_id TEXT,
+                lease_expires REAL,
+                result TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+            CREATE TABLE IF NOT EXISTS workers (
+                worker_id TEXT PRIMARY KEY,
+                host TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                failed INTEGER NOT NULL DEFAULT 0,
+                busy_seconds REAL NOT NULL DEFAULT 0
+            );
+        """)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections are not thread-safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_job(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def _touch_worker(self, conn: sqlite3.Connection, worker_id: str, now: float,
+                      completed: int = 0, failed: int = 0, busy: float = 0.0) -> None:
+        host = worker_id.split("/", 1)[0]
+        conn.execute(
+            "INSERT INTO workers (worker_id, host, first_seen, last_seen, completed, failed, busy_seconds) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(worker_id) DO UPDATE SET last_seen = excluded.last_seen, "
+            "completed = completed + excluded.completed, failed = failed + excluded.failed, "
+            "busy_seconds = busy_seconds + excluded.busy_seconds",
+            (worker_id, host, now, now, completed, failed, busy),
+        )
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> str:
+        job_id = str(uuid.uuid4())
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, payload, status, max_attempts, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), QUEUED, max_attempts, time.time()),
+        )
+        return job_id
+
+    def lease(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              kinds: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        conn = self._conn()
+        now = time.time()
+        kind_filter = ""
+        params: List[Any] = [QUEUED, LEASED, now]
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            while True:
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE (status = ? OR (status = ? AND lease_expires < ?))"
+                    f"{kind_filter} ORDER BY created LIMIT 1",
+                    params,
+                ).fetchone()
+                if row is None or row["status"] == QUEUED or row["attempts"] < row["max_attempts"]:
+                    break
+                # Expired lease on the final attempt: give up on the job and look again
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished = ?, lease_expires = NULL WHERE id = ?",
+                    (FAILED, f"lease expired on attempt {row['attempts']}", now, row["id"]),
+                )
+            if row is None:
+                self._touch_worker(conn, worker_id, now)
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker_id = ?, lease_expires = ?, attempts = attempts + 1, "
+                "started = ? WHERE id = ?",
+                (LEASED, worker_id, now + lease_seconds, now, row["id"]),
+            )
+            self._touch_worker(conn, worker_id, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        job = self._row_to_job(row)
+        job.update(status=LEASED, worker_id=worker_id, lease_expires=now + lease_seconds,
+                   attempts=job["attempts"] + 1, started=now)
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        cur = self._conn().execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker_id = ? AND status = ?",
+            (time.time() + lease_seconds, job_id, worker_id, LEASED),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Any) -> bool:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, finished = ?, lease_expires = NULL "
+                "WHERE id = ? AND worker_id = ? AND status = ?",
+                (DONE, json.dumps(result), now, job_id, worker_id, LEASED),
+            )
+            ok = cur.rowcount == 1
+            if ok:
+                started = conn.execute("SELECT started FROM jobs WHERE id = ?", (job_id,)).fetchone()["started"]
+                self._touch_worker(conn, worker_id, now, completed=1, busy=now - (started or now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return ok
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT attempts, max_attempts, started FROM jobs WHERE id = ? AND worker_id = ? AND status = ?",
+                (job_id, worker_id, LEASED),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return False
+            if row["attempts"] >= row["max_attempts"]:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished = ?, lease_expires = NULL WHERE id = ?",
+                    (FAILED, error, now, job_id),
+                )
+            else:
+                # Put the job back for another worker to retry
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, lease_expires = NULL WHERE id = ?",
+                    (QUEUED, error, job_id),
+                )
+            self._touch_worker(conn, worker_id, now, failed=1, busy=now - (row["started"] or now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def get_many(self, job_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        jobs: Dict[str, Dict[str, Any]] = {}
+        conn = self._conn()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(job_ids), 500):
+            chunk = job_ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT * FROM jobs WHERE id IN ({','.join('?' for _ in chunk)})", chunk
+            ).fetchall()
+            for row in rows:
+                jobs[row["id"]] = self._row_to_job(row)
+        return [jobs.get(job_id) for job_id in job_ids]
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._conn()
+        now = time.time()
+        counts = {QUEUED: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for row in conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        oldest = conn.execute("SELECT MIN(created) AS t FROM jobs WHERE status = ?", (QUEUED,)).fetchone()["t"]
+        workers = []
+        for row in conn.execute("SELECT * FROM workers ORDER BY worker_id"):
+            elapsed = max(row["last_seen"] - row["first_seen"], 1e-9)
+            workers.append({
+                "worker_id": row["worker_id"],
+                "host": row["host"],
+                "completed": row["completed"],
+                "failed": row["failed"],
+                "jobs_per_second": row["completed"] / elapsed,
+                "utilization": min(row["busy_seconds"] / elapsed, 1.0),
+                "idle_seconds": now - row["last_seen"],
+            })
+        return {
+            "backlog": counts[QUEUED],
+            "in_flight": counts[LEASED],
+            "done": counts[DONE],
+            "failed": counts[FAILED],
+            "oldest_queued_age": (now - oldest) if oldest is not None else 0.0,
+            "workers": workers,
+            "total_jobs_per_second": sum(w["jobs_per_second"] for w in workers if w["idle_seconds"] < 60),
+        }
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _BrokerRequestHandler(socketserver.StreamRequestHandler):
+    """Serves one JSON-lines connection: {"method": ..., "args": {...}} -> {"ok": ..., "value": ...}."""
+
+    METHODS = ("enqueue", "lease", "heartbeat", "complete", "fail", "get", "get_many", "stats")
+
+    def handle(self):
+        broker = self.server.broker
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                method = request.get("method")
+                if method not in self.METHODS:
+                    raise ValueError(f"Unknown broker method: {method}")
+                reply = {"ok": True, "value": getattr(broker, method)(**request.get("args", {}))}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class BrokerServer(socketserver.ThreadingTCPServer):
+    """TCP front end that exposes a SQLiteBroker to workers on other nodes."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, broker: Broker, host: str = "0.0.0.0", port: int = 8765):
+        self.broker = broker
+        super().__init__((host, port), _BrokerRequestHandler)
+
+
+class TCPBroker(Broker):
+    """Client for a BrokerServer. Keeps one persistent connection per thread."""
+
+    def __init__(self, host: str, port: int, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _stream(self):
+        stream = getattr(self._local, "stream", None)
+        if stream is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            stream = sock.makefile("rwb")
+            self._local.sock = sock
+            self._local.stream = stream
+        return stream
+
+    def _call(self, method: str, **args) -> Any:
+        for attempt in range(2):
+            try:
+                stream = self._stream()
+                stream.write((json.dumps({"method": method, "args": args}) + "\n").encode("utf-8"))
+                stream.flush()
+                line = stream.readline()
+                if not line:
+                    raise ConnectionError("Broker closed the connection")
+                break
+            except (OSError, ConnectionError):
+                # Reconnect once on a dropped connection
+                self.close()
+                if attempt == 1:
+                    raise
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise RuntimeError(f"Broker error in {method}: {reply.get('error')}")
+        return reply["value"]
+
+    def enqueue(self, kind, payload, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        return self._call("enqueue", kind=kind, payload=payload, max_attempts=max_attempts)
+
+    def lease(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS, kinds=None):
+        return self._call("lease", worker_id=worker_id, lease_seconds=lease_seconds, kinds=kinds)
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        return self._call("heartbeat", job_id=job_id, worker_id=worker_id, lease_seconds=lease_seconds)
+
+    def complete(self, job_id, worker_id, result):
+        return self._call("complete", job_id=job_id, worker_id=worker_id, result=result)
+
+    def fail(self, job_id, worker_id, error):
+        return self._call("fail", job_id=job_id, worker_id=worker_id, error=error)
+
+    def get(self, job_id):
+        return self._call("get", job_id=job_id)
+
+    def get_many(self, job_ids):
+        return self._call("get_many", job_ids=job_ids)
+
+    def stats(self):
+        return self._call("stats")
+
+    def close(self) -> None:
+        stream = getattr(self._local, "stream", None)
+        if stream is not None:
+            try:
+                stream.close()
+                self._local.sock.close()
+            except OSError:
+                pass
+            self._local.stream = None
+            self._local.sock = None
+
+
+def connect_broker(url: str) -> Broker:
+    """
+    Open a broker from a URL.
+
+    Args:
+        url: "sqlite:///path/to/db", "tcp://host:port", or a bare path to a SQLite file
+
+    Returns:
+        Broker instance
+    """
+    if url.startswith("tcp://"):
+        host, _, port = url[len("tcp://"):].rpartition(":")
+        return TCPBroker(host or "127.0.0.1", int(port))
+    if url.startswith("sqlite:///"):
+        return SQLiteBroker(url[len("sqlite:///"):])
+    return SQLiteBroker(url)
+
+
+def mean_plddt(pdb_text: str) -> Optional[float]:
+    """Mean per-residue confidence, read from the B-factor column of CA atoms."""
+    values = []
+    for line in pdb_text.splitlines():
+        if line.startswith("ATOM") and line[12:16].strip() == "CA":
+            try:
+                values.append(float(line[60:66]))
+            except ValueError:
+                continue
+    if not values:
+        return None
+    score = sum(values) / len(values)
+    # ESMFold reports pLDDT as 0-1, other predictors as 0-100
+    return score / 100.0 if score > 1.0 else score
+
+
+def _run_fold(payload: Dict[str, Any]) -> Dict[str, Any]:
+    import fold_server
+    pdb_text = fold_server.fold_pdb(payload["sequence"])
+    return {"sequence": payload["sequence"], "pdb_text": pdb_text}
+
+
+def _run_score(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from scoring import predict_binding_score
+    result = _run_fold(payload)
+    result["plddt"] = mean_plddt(result["pdb_text"])
+    result["binding_score"] = predict_binding_score(
+        payload["sequence"], payload.get("target", ""), payload.get("iteration", 0)
+    )
+    if not payload.get("return_pdb", True):
+        del result["pdb_text"]
+    return result
+
+
+# Job kind -> handler. Handlers take the payload and return a JSON-serializable result.
+HANDLERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "fold": _run_fold,
+    "score": _run_score,
+}
+
+
+class FoldWorker:
+    """
+    Leases jobs from a broker, runs them and writes the results back.
+
+    A background thread renews the lease while a job runs so long folds are
+    not handed to another worker; if this process dies the lease lapses and
+    the job is retried elsewhere.
+    """
+
+    def __init__(
+        self,
+        broker: Broker,
+        worker_id: Optional[str] = None,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        poll_interval: float = 0.5,
+        kinds: Optional[List[str]] = None,
+        verbose: bool = True
+    ):
+        self.broker = broker
+        self.worker_id = worker_id or f"{socket.gethostname()}/{os.getpid()}/{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.kinds = kinds
+        self.verbose = verbose
+        self._stop = threading.Event()
+
+    def log(self, message: str) -> None:
+        if self.verbose:
+            print(f"[FoldWorker {self.worker_id}] {message}", flush=True)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _keep_leased(self, job_id: str, done: threading.Event) -> None:
+        while not done.wait(self.lease_seconds / 3):
+            if not self.broker.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                return
+
+    def run_one(self) -> bool:
+        """
+        Lease and process a single job.
+
+        Returns:
+            True if a job was processed, False if the queue was empty
+        """
+        job = self.broker.lease(self.worker_id, self.lease_seconds, self.kinds)
+        if job is None:
+            return False
+
+        handler = HANDLERS.get(job["kind"])
+        if handler is None:
+            self.broker.fail(job["id"], self.worker_id, f"No handler for job kind {job['kind']!r}")
+            return True
+
+        done = threading.Event()
+        keeper = threading.Thread(target=self._keep_leased, args=(job["id"], done), daemon=True)
+        keeper.start()
+        try:
+            result = handler(job["payload"])
+        except Exception as e:
+            self.log(f"Job {job['id']} ({job['kind']}) failed on attempt {job['attempts']}: {e}")
+            self.broker.fail(job["id"], self.worker_id, str(e))
+        else:
+            if not self.broker.complete(job["id"], self.worker_id, result):
+                self.log(f"Lease on job {job['id']} was lost before completion; result discarded")
+        finally:
+            done.set()
+            keeper.join()
+        return True
+
+    def run(self, max_jobs: Optional[int] = None, exit_when_idle: bool = False) -> int:
+        """
+        Process jobs until stopped.
+
+        Args:
+            max_jobs: Stop after this many jobs (None for no limit)
+            exit_when_idle: Return as soon as the queue is empty
+
+        Returns:
+            Number of jobs processed
+        """
+        processed = 0
+        self.log("Worker started")
+        while not self._stop.is_set() and (max_jobs is None or processed < max_jobs):
+            if self.run_one():
+                processed += 1
+            elif exit_when_idle:
+                break
+            else:
+                self._stop.wait(self.poll_interval)
+        self.log(f"Worker exiting after {processed} jobs")
+        return processed
+
+
+class FoldQueue:
+    """Client-side helper the agent uses to submit jobs and collect results."""
+
+    def __init__(self, broker: Broker, poll_interval: float = 0.25):
+        self.broker = broker
+        self.poll_interval = poll_interval
+
+    def enqueue_fold(self, sequence: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> str:
+        return self.broker.enqueue("fold", {"sequence": sequence}, max_attempts)
+
+    def enqueue_score(self, sequence: str, target: str, iteration: int = 0, return_pdb: bool = True,
+                      max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> str:
+        """Fold and score a sequence against `target` on a worker (result adds plddt and binding_score)."""
+        payload = {"sequence": sequence, "target": target, "iteration": iteration, "return_pdb": return_pdb}
+        return self.broker.enqueue("score", payload, max_attempts)
+
+    def wait(self, job_ids: List[str], timeout: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Wait for jobs to reach a terminal state.
+
+        Args:
+            job_ids: Jobs to wait for
+            timeout: Give up after this many seconds (None to wait forever)
+
+        Returns:
+            Mapping of job ID to job dict; jobs still pending at the timeout are omitted
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = list(job_ids)
+        finished: Dict[str, Dict[str, Any]] = {}
+        while pending:
+            for job_id, job in zip(pending, self.broker.get_many(pending)):
+                if job is not None and job["status"] in (DONE, FAILED):
+                    finished[job_id] = job
+            pending = [job_id for job_id in pending if job_id not in finished]
+            if not pending or (deadline is not None and time.monotonic() >= deadline):
+                break
+            time.sleep(self.poll_interval)
+        return finished
+
+    def stats(self) -> Dict[str, Any]:
+        return self.broker.stats()
+
+
+def _worker_process(broker_url: str, lease_seconds: float, exit_when_idle: bool) -> None:
+    FoldWorker(connect_broker(broker_url), lease_seconds=lease_seconds).run(exit_when_idle=exit_when_idle)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Distributed fold/score job queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    broker_cmd = sub.add_parser("broker", help="Serve a SQLite broker over TCP")
+    broker_cmd.add_argument("--db", default="fold_queue.db")
+    broker_cmd.add_argument("--host", default="0.0.0.0")
+    broker_cmd.add_argument("--port", type=int, default=8765)
+
+    worker_cmd = sub.add_parser("worker", help="Run fold workers")
+    worker_cmd.add_argument("--broker", default="sqlite:///fold_queue.db")
+    worker_cmd.add_argument("--concurrency", type=int, default=1, help="Worker processes on this node")
+    worker_cmd.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+    worker_cmd.add_argument("--exit-when-idle", action="store_true")
+
+    stats_cmd = sub.add_parser("stats", help="Show backlog and per-worker rates")
+    stats_cmd.add_argument("--broker", default="sqlite:///fold_queue.db")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "broker":
+        server = BrokerServer(SQLiteBroker(args.db), args.host, args.port)
+        print(f"Fold queue broker serving {args.db} on {args.host}:{args.port}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    elif args.command == "worker":
+        if args.concurrency <= 1:
+            _worker_process(args.broker, args.lease_seconds, args.exit_when_idle)
+            return
+        procs = [
+            multiprocessing.Process(target=_worker_process,
+                                    args=(args.broker, args.lease_seconds, args.exit_when_idle))
+            for _ in range(args.concurrency)
+        ]
+        for proc in procs:
+            proc.start()
+        try:
+            for proc in procs:
+                proc.join()
+        except KeyboardInterrupt:
+            for proc in procs:
+                proc.terminate()
+    elif args.command == "stats":
+        print(json.dumps(connect_broker(args.broker).stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
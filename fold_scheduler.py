@@ -0,0 +1,176 @@
+"""
+Length-aware scheduling and adaptive timeouts for fold requests.
+
+Fold latency grows with sequence length, so one fixed timeout is either too
+tight for long sequences or far too loose for short ones. FoldScheduler keeps
+a short history of observed latencies per length bucket and derives:
+
+    - a timeout per sequence: a high percentile of its bucket (or the
+      neighbouring buckets while history is thin) times a safety margin,
+      never below a linear base + per-residue budget, which is also the
+      timeout while there is no history
+    - a processing order: longest expected fold first, which minimizes the
+      makespan when the batch is spread over several workers (LPT rule)
+    - an admission check: sequences longer than the backend accepts are
+      rejected (or split into foldable windows) before any request is spent
+"""
+from collections import defaultdict, deque
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# The public ESMFold API refuses sequences longer than this
+MAX_FOLD_LENGTH = 400
+
+LENGTH_BUCKET = 25
+TIMEOUT_PERCENTILE = 95.0
+TIMEOUT_MARGIN = 1.5
+MIN_SAMPLES = 5
+HISTORY = 200
+
+
+class FoldScheduler:
+    """
+    Learns per-length fold latencies and uses them for timeouts and ordering.
+    """
+
+    def __init__(
+        self,
+        max_length: int = MAX_FOLD_LENGTH,
+        base_timeout: float = 15.0,
+        per_residue_timeout: float = 0.15,
+        max_timeout: float = 120.0,
+        init_timeout: float = 10.0,
+        bucket_width: int = LENGTH_BUCKET,
+        percentile: float = TIMEOUT_PERCENTILE,
+        margin: float = TIMEOUT_MARGIN,
+        min_samples: int = MIN_SAMPLES
+    ):
+        """
+        Args:
+            max_length: Longest sequence the fold backend accepts
+            base_timeout: Fallback timeout for a zero-length sequence
+            per_residue_timeout: Fallback timeout added per residue
+            max_timeout: Cap on the linear timeout (learned timeouts may go up
+                to twice this, since they reflect what the backend actually needs)
+            init_timeout: Fallback timeout for opening an MCP session
+            bucket_width: Residues per length bucket
+            percentile: Latency percentile the learned timeout is based on
+            margin: Multiplier applied to that percentile
+            min_samples: Observations a bucket needs before it is trusted
+        """
+        self.max_length = max_length
+        self.base_timeout = base_timeout
+        self.per_residue_timeout = per_residue_timeout
+        self.max_timeout = max_timeout
+        self.default_init_timeout = init_timeout
+        self.bucket_width = bucket_width
+        self.percentile = percentile
+        self.margin = margin
+        self.min_samples = min_samples
+        self._latencies: Dict[int, deque] = defaultdict(lambda: deque(maxlen=HISTORY))
+        self._init_latencies: deque = deque(maxlen=HISTORY)
+
+    def bucket(self, length: int) -> int:
+        return length // self.bucket_width
+
+    def record(self, length: int, seconds: float) -> None:
+        """Record a successful fold of a sequence of the given length."""
+        self._latencies[self.bucket(length)].append((max(length, 1), seconds))
+
+    def record_init(self, seconds: float) -> None:
+        """Record how long opening and initializing an MCP session took."""
+        self._init_latencies.append(seconds)
+
+    def _samples(self, length: int) -> List[float]:
+        """
+        Latencies for this length's bucket, widened to neighbouring buckets while
+        history is thin. Borrowed samples are rescaled to `length` in proportion
+        to the length they were observed at.
+        """
+        center = self.bucket(length)
+        samples = [seconds for _, seconds in self._latencies.get(center, ())]
+        radius = 1
+        while len(samples) < self.min_samples and radius <= 2:
+            for b in (center - radius, center + radius):
+                samples.extend(seconds * length / seen for seen, seconds in self._latencies.get(b, ()))
+            radius += 1
+        return samples
+
+    def timeout(self, length: int) -> float:
+        """
+        Per-attempt fold timeout in seconds for a sequence of this length.
+
+        Learned latencies can only raise the linear budget: near-instant
+        answers (fold server memo hits, coalesced requests) would otherwise
+        teach a timeout that a real fold cannot meet.
+        """
+        linear = min(self.base_timeout + self.per_residue_timeout * length, self.max_timeout)
+        samples = self._samples(length)
+        if len(samples) >= self.min_samples:
+            learned = float(np.percentile(samples, self.percentile)) * self.margin
+            return min(max(learned, linear), 2 * self.max_timeout)
+        return linear
+
+    def init_timeout(self) -> float:
+        """Timeout for MCP session initialization and tool listing."""
+        if len(self._init_latencies) >= self.min_samples:
+            learned = float(np.percentile(self._init_latencies, self.percentile)) * self.margin
+            return min(max(learned, 1.0), self.default_init_timeout * 3)
+        return self.default_init_timeout
+
+    def expected(self, length: int) -> float:
+        """Median expected fold latency, used for ordering."""
+        samples = self._samples(length)
+        if len(samples) >= self.min_samples:
+            return float(np.median(samples))
+        # Without history, latency is assumed proportional to length
+        return self.per_residue_timeout * length
+
+    def fits(self, sequence: str) -> bool:
+        return len(sequence) <= self.max_length
+
+    def split(self, sequence: str, overlap: int = 0) -> List[str]:
+        """
+        Cut an over-long sequence into windows the backend accepts.
+
+        The sequence is partitioned into near-equal cores; with overlap > 0 each
+        window after the first also carries the `overlap` residues before its
+        core, so consecutive windows share that many residues.
+        """
+        if self.fits(sequence):
+            return [sequence]
+        n_windows = int(np.ceil(len(sequence) / (self.max_length - overlap)))
+        bounds = np.linspace(0, len(sequence), n_windows + 1).round().astype(int)
+        return [sequence[max(start - overlap, 0):end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def order(self, sequences: Sequence[str]) -> List[int]:
+        """
+        Indices of `sequences` in processing order: longest expected fold first.
+
+        Ties (e.g. before any history exists) are broken by length, then by
+        original position.
+        """
+        keys = [(-self.expected(len(seq)), -len(seq), i) for i, seq in enumerate(sequences)]
+        return [key[-1] for key in sorted(keys)]
+
+    def makespan(self, sequences: Sequence[str], workers: int) -> float:
+        """Estimated wall time of the batch on `workers` parallel workers, in order()."""
+        loads = [0.0] * max(workers, 1)
+        for i in self.order(sequences):
+            slot = loads.index(min(loads))
+            loads[slot] += self.expected(len(sequences[i]))
+        return max(loads)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Sample count, median and learned timeout per length bucket."""
+        out = {}
+        for b in sorted(self._latencies):
+            samples = [seconds for _, seconds in self._latencies[b]]
+            low = b * self.bucket_width
+            out[f"{low}-{low + self.bucket_width - 1}"] = {
+                "samples": len(samples),
+                "median": float(np.median(samples)),
+                "timeout": self.timeout(low),
+            }
+        return out
@@ -1,25 +1,279 @@
-from typing import Optional
+from typing import Optional, Dict, Tuple
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+import argparse
+import asyncio
+import json
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 import base64
 import py3Dmol
 from mcp.server.fastmcp import FastMCP
 import os
 
+from artifact_store import ArtifactStore
+from mcp_http import serve_http
+from metrics import Registry, ToolMetrics, instrument_tool, start_http_server
+from profiling import profile_child_process
+from structure_features import featurize
+
 mcp = FastMCP("fold")
 
-@mcp.tool()
-def fold_sequence(sequence: str) -> str:
-    """
-    Submits a raw amino-acid sequence to the ESMFold API and returns the PDB text.
-    """
-    url = "https://api.esmatlas.com/foldSequence/v1/pdb/"
-    resp = requests.post(url, data=sequence, headers={"Content-Type":"text/plain"})
+ESMFOLD_URL = os.environ.get("ESMFOLD_API_URL", "https://api.esmatlas.com/foldSequence/v1/pdb/")
+
+# Short-lived memo of finished folds, so back-to-back duplicates skip the API too
+MEMO_TTL_SECONDS = float(os.environ.get("FOLD_MEMO_TTL_SECONDS", "300"))
+MEMO_MAX_ENTRIES = int(os.environ.get("FOLD_MEMO_MAX_ENTRIES", "1024"))
+
+# (connect, read) timeout of an ESMFold request; requests coalesced onto it wait no longer than it can take
+UPSTREAM_TIMEOUT = (
+    float(os.environ.get("FOLD_UPSTREAM_CONNECT_TIMEOUT", "10")),
+    float(os.environ.get("FOLD_UPSTREAM_READ_TIMEOUT", "300")),
+)
+COALESCED_WAIT_SECONDS = sum(UPSTREAM_TIMEOUT) + 5.0
+
+_lock = threading.Lock()
+_inflight: Dict[str, Future] = {}
+_memo: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_stats = {"requests": 0, "upstream_calls": 0, "coalesced": 0, "memo_hits": 0, "upstream_errors": 0}
+
+# One keep-alive session for every upstream call; the pool is resized to --workers when serving over HTTP
+_http = requests.Session()
+
+# Full structures behind the handles returned by fold_and_featurize
+FOLD_STRUCTURE_DIR = os.environ.get("FOLD_STRUCTURE_DIR", "fold_structures")
+_structures: Optional[ArtifactStore] = None
+
+
+# Metrics, scraped via get_metrics or --metrics-port
+METRICS = Registry()
+TOOL_METRICS = ToolMetrics(METRICS, "fold")
+UPSTREAM_RESPONSES = METRICS.counter("fold_upstream_responses_total", "ESMFold responses by HTTP status", ["status"])
+UPSTREAM_LATENCY = METRICS.histogram("fold_upstream_latency_seconds", "ESMFold request latency")
+UPSTREAM_BYTES = METRICS.counter("fold_upstream_bytes_total", "Bytes exchanged with ESMFold", ["direction"])
+FEATURE_BYTES = METRICS.counter("fold_feature_bytes_total", "Bytes of fold_and_featurize results and of the PDBs they stand in for", ["kind"])
+
+
+def _collect_fold_stats():
+    stats = fold_stats()
+    yield "fold_requests_total", "counter", "Fold requests, including coalesced and memoized ones", stats["requests"]
+    yield "fold_upstream_calls_total", "counter", "Fold requests that reached ESMFold", stats["upstream_calls"]
+    yield "fold_upstream_errors_total", "counter", "ESMFold calls that failed", stats["upstream_errors"]
+    yield "fold_coalesced_total", "counter", "Requests that joined an identical in-flight fold", stats["coalesced"]
+    yield "fold_memo_hits_total", "counter", "Requests answered from the fold memo", stats["memo_hits"]
+    yield "fold_coalescing_ratio", "gauge", "Share of requests served by coalescing", stats["coalescing_ratio"]
+    yield "fold_memo_hit_ratio", "gauge", "Share of requests served by the memo", stats["memo_hit_ratio"]
+    yield "fold_upstream_in_flight", "gauge", "Distinct folds currently waiting on ESMFold", stats["in_flight"]
+    yield "fold_memo_entries", "gauge", "Folds currently held in the memo", stats["memo_entries"]
+
+
+METRICS.collector(_collect_fold_stats)
+
+
+def configure_upstream_pool(size: int) -> None:
+    """Size the keep-alive connection pool used for ESMFold requests."""
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(size, 1))
+    _http.mount("https://", adapter)
+    _http.mount("http://", adapter)
+
+
+def normalize_sequence(sequence: str) -> str:
+    """Canonical form used to detect identical requests: no whitespace, upper case."""
+    return "".join(sequence.split()).upper()
+
+
+def _post_fold(sequence: str) -> str:
+    started = time.perf_counter()
+    try:
+        resp = _http.post(ESMFOLD_URL, data=sequence, headers={"Content-Type":"text/plain"}, timeout=UPSTREAM_TIMEOUT)
+    except requests.RequestException:
+        UPSTREAM_RESPONSES.inc(status="error")
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - started)
+    UPSTREAM_RESPONSES.inc(status=str(resp.status_code))
+    UPSTREAM_BYTES.inc(len(sequence), direction="sent")
+    UPSTREAM_BYTES.inc(len(resp.content), direction="received")
     if resp.status_code != 200:
         print("Status:", resp.status_code)
         print("Body:", resp.text)
     resp.raise_for_status()
     return resp.text
 
+
+def fold_pdb(sequence: str) -> str:
+    """
+    Fold a sequence, sharing work with identical concurrent requests.
+
+    The first caller for a normalized sequence issues the ESMFold request;
+    callers that arrive while it is in flight wait on the same future and
+    receive the same result (or exception), or a TimeoutError if it takes
+    longer than the leader's request is allowed to. Finished results stay in
+    a short-lived memo so immediate repeats do not reach the API either.
+    """
+    key = normalize_sequence(sequence)
+    now = time.monotonic()
+    with _lock:
+        _stats["requests"] += 1
+        cached = _memo.get(key)
+        if cached and cached[0] > now:
+            _memo.move_to_end(key)
+            _stats["memo_hits"] += 1
+            return cached[1]
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+            _stats["upstream_calls"] += 1
+        else:
+            _stats["coalesced"] += 1
+
+    if not leader:
+        try:
+            return future.result(timeout=COALESCED_WAIT_SECONDS)
+        except FuturesTimeoutError:
+            raise TimeoutError(f"Coalesced fold still running after {COALESCED_WAIT_SECONDS:.0f}s") from None
+
+    try:
+        pdb_text = _post_fold(key)
+    except Exception as e:
+        with _lock:
+            _stats["upstream_errors"] += 1
+            _inflight.pop(key, None)
+        future.set_exception(e)
+        raise
+
+    with _lock:
+        if MEMO_TTL_SECONDS > 0:
+            _memo[key] = (time.monotonic() + MEMO_TTL_SECONDS, pdb_text)
+            _memo.move_to_end(key)
+            while len(_memo) > MEMO_MAX_ENTRIES:
+                _memo.popitem(last=False)
+        _inflight.pop(key, None)
+    future.set_result(pdb_text)
+    return pdb_text
+
+
+def structure_store() -> ArtifactStore:
+    global _structures
+    with _lock:
+        if _structures is None:
+            _structures = ArtifactStore(FOLD_STRUCTURE_DIR)
+    return _structures
+
+
+def fold_and_featurize_record(sequence: str, reference_handle: Optional[str] = None) -> Dict:
+    """Fold (with coalescing and memo), store the PDB and return its feature record and handle."""
+    key = normalize_sequence(sequence)
+    pdb_text = fold_pdb(key)
+    store = structure_store()
+    record = featurize(key, pdb_text, store.get(reference_handle) if reference_handle else None)
+    record["handle"] = store.put(pdb_text, "pdb")
+    record["pdb_bytes"] = len(pdb_text)
+    return record
+
+
+def fold_stats() -> Dict[str, float]:
+    """Request counters plus coalescing and memo hit ratios."""
+    with _lock:
+        stats = dict(_stats)
+        stats["in_flight"] = len(_inflight)
+        stats["memo_entries"] = len(_memo)
+    requests_seen = max(stats["requests"], 1)
+    stats["coalescing_ratio"] = stats["coalesced"] / requests_seen
+    stats["memo_hit_ratio"] = stats["memo_hits"] / requests_seen
+    return stats
+
+
+@mcp.tool()
+@instrument_tool(TOOL_METRICS, "fold_sequence")
+async def fold_sequence(sequence: str) -> str:
+    """
+    Submits a raw amino-acid sequence to the ESMFold API and returns the PDB text.
+    """
+    # Run in a worker thread so concurrent requests can overlap and coalesce
+    return await asyncio.to_thread(fold_pdb, sequence)
+
+
+@mcp.tool()
+@instrument_tool(TOOL_METRICS, "fold_and_featurize")
+async def fold_and_featurize(sequence: str, reference_handle: Optional[str] = None) -> str:
+    """
+    Folds a sequence and returns a compact JSON feature record instead of the PDB:
+    length, mean/min pLDDT, confident and helical fractions, radius of gyration,
+    end-to-end distance and sequence descriptors (helix propensity, hydrophobic
+    moment, net charge, aggregation motifs). With reference_handle (the handle
+    of an earlier fold) the record also has a TM-like score and RMSD to that
+    structure. The full structure stays on the server; fetch it with
+    get_structure(handle) only if it is needed.
+    """
+    record = await asyncio.to_thread(fold_and_featurize_record, sequence, reference_handle)
+    payload = json.dumps(record)
+    FEATURE_BYTES.inc(len(payload), kind="record")
+    FEATURE_BYTES.inc(record["pdb_bytes"], kind="pdb")
+    return payload
+
+
+@mcp.tool()
+@instrument_tool(TOOL_METRICS, "get_structure")
+async def get_structure(handle: str) -> str:
+    """
+    Returns the PDB text behind a handle from fold_and_featurize.
+    """
+    try:
+        return await asyncio.to_thread(structure_store().get, handle)
+    except KeyError:
+        raise ValueError(f"Unknown structure handle: {handle}") from None
+
+
+@mcp.tool()
+@instrument_tool(TOOL_METRICS, "get_fold_stats")
+def get_fold_stats() -> str:
+    """
+    Returns fold server counters as JSON: requests, upstream calls, coalesced
+    requests, memo hits and the coalescing ratio.
+    """
+    return json.dumps(fold_stats(), indent=2)
+
+
+@mcp.tool()
+def get_metrics() -> str:
+    """
+    Returns the server's metrics in Prometheus text format: per-tool request
+    counts, latency histograms and in-flight calls, ESMFold status codes,
+    latency and bytes, and coalescing / memo hit ratios.
+    """
+    return METRICS.render()
+
+
 if __name__ == "__main__":
-    # run over stdio, per the tutorial
-    mcp.run(transport="stdio")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ESMFold MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"], default="stdio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent tool calls (HTTP transports)")
+    parser.add_argument("--drain-timeout", type=float, default=30.0,
+                        help="Seconds to let in-flight requests finish on shutdown")
+    parser.add_argument("--stateless", action="store_true",
+                        help="Stateless streamable HTTP (no per-client session state)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on http://127.0.0.1:<port>/metrics")
+    args = parser.parse_args()
+
+    # Profiles this process when spawned by an agent session running with AGENT_PROFILE
+    profile_child_process("fold_server")
+
+    if args.metrics_port:
+        start_http_server(METRICS, args.metrics_port)
+
+    if args.transport == "stdio":
+        # run over stdio, per the tutorial
+        mcp.run(transport="stdio")
+    else:
+        mcp.settings.stateless_http = args.stateless
+        # The upstream keep-alive pool is sized to the tool-call thread pool
+        configure_upstream_pool(args.workers)
+        serve_http(mcp, args.transport, args.host, args.port, args.workers, args.drain_timeout, "Fold server")
@@ -0,0 +1,69 @@
+"""
+Serving a FastMCP server over HTTP, shared by fold_server and research_server.
+
+Both servers run as long-lived network services the same way: a uvicorn
+server around the streamable HTTP (or SSE) app, a thread pool sized for
+their blocking tool work, a graceful drain on shutdown and a /health route
+that reports the serving process.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+
+async def _health(request):
+    from starlette.responses import JSONResponse
+
+    # The pid lets a launcher check that it reached the server it started
+    return JSONResponse({"status": "ok", "pid": os.getpid()})
+
+
+def serve_http(
+    mcp,
+    transport: str,
+    host: str,
+    port: int,
+    workers: int,
+    drain_timeout: float,
+    name: str,
+    on_shutdown: Optional[Callable[[], Awaitable[None]]] = None
+) -> None:
+    """
+    Serve a FastMCP server's tools over streamable HTTP or SSE so many clients share one server.
+
+    Blocking work (tool calls run with asyncio.to_thread) runs on a thread
+    pool of `workers` threads. On SIGINT/SIGTERM the server stops accepting
+    new connections and gives in-flight requests up to `drain_timeout`
+    seconds to finish; `on_shutdown` is awaited after that.
+
+    Args:
+        mcp: FastMCP server
+        transport: "streamable-http" or "sse"
+        name: Server name for the startup message; also names the worker threads
+    """
+    import uvicorn
+
+    mcp.custom_route("/health", methods=["GET"])(_health)
+    app = mcp.streamable_http_app() if transport == "streamable-http" else mcp.sse_app()
+    config = uvicorn.Config(
+        app,
+        host=host,
+        port=port,
+        log_level=mcp.settings.log_level.lower(),
+        timeout_graceful_shutdown=drain_timeout,
+    )
+    server = uvicorn.Server(config)
+
+    async def main():
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name.split()[0].lower())
+        )
+        try:
+            await server.serve()
+        finally:
+            if on_shutdown is not None:
+                await on_shutdown()
+
+    print(f"{name} listening on {transport} at http://{host}:{port} with {workers} workers")
+    asyncio.run(main())
@@ -0,0 +1,261 @@
+"""
+Minimal in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are plain Python objects guarded by one
+lock each; updating one costs a dict lookup and an add, so they can sit on
+every tool call. Values that already live elsewhere (e.g. fold_server's
+coalescing counters) are exported through collect callbacks that only run
+when metrics are scraped.
+
+Expose them either with start_http_server(port) (GET /metrics) or by
+returning registry.render() from an MCP tool.
+"""
+import asyncio
+import functools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Latency buckets in seconds, from a cache hit to a slow fold
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down (e.g. requests in flight)."""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram of observations per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        # Linear scan beats bisect for ~15 buckets
+        slot = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                slot = i
+                break
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            row[slot] += 1
+            row[-1] += value
+
+    def count(self, **labels: str) -> float:
+        row = self._values.get(self._key(labels))
+        return sum(row[:-1]) if row else 0.0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        lines = self.header()
+        for key, row in items:
+            cumulative = 0.0
+            for bound, n in zip(self.buckets + (float("inf"),), row[:-1]):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    """A set of metrics plus scrape-time collectors, rendered together."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, float]]]] = []
+        self.started = time.time()
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def collector(self, fn: Callable[[], Iterable[Tuple[str, str, str, float]]]) -> None:
+        """
+        Register a callback run at scrape time. It yields (name, type, help, value)
+        tuples for values that are cheaper to read on demand than to track.
+        """
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for fn in self._collectors:
+            for name, kind, help_text, value in fn():
+                lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"])
+        lines.append("# HELP process_uptime_seconds Seconds since the metrics registry was created")
+        lines.append("# TYPE process_uptime_seconds gauge")
+        lines.append(f"process_uptime_seconds {_format_value(time.time() - self.started)}")
+        return "\n".join(lines) + "\n"
+
+
+def instrument_tool(tool_metrics: "ToolMetrics", tool: str):
+    """
+    Decorator recording request count, errors, in-flight and latency of a tool.
+
+    Works on sync and async functions and keeps the signature (FastMCP reads it
+    to build the tool schema), so it goes directly under @mcp.tool().
+    """
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                tool_metrics.start(tool)
+                started = time.perf_counter()
+                ok = False
+                try:
+                    result = await fn(*args, **kwargs)
+                    ok = True
+                    return result
+                finally:
+                    tool_metrics.finish(tool, time.perf_counter() - started, ok)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                tool_metrics.start(tool)
+                started = time.perf_counter()
+                ok = False
+                try:
+                    result = fn(*args, **kwargs)
+                    ok = True
+                    return result
+                finally:
+                    tool_metrics.finish(tool, time.perf_counter() - started, ok)
+        return wrapper
+    return decorate
+
+
+class ToolMetrics:
+    """The per-tool request metrics every MCP server exports."""
+
+    def __init__(self, registry: Registry, prefix: str):
+        self.requests = registry.counter(f"{prefix}_tool_requests_total", "Tool calls received", ["tool"])
+        self.errors = registry.counter(f"{prefix}_tool_errors_total", "Tool calls that raised", ["tool"])
+        self.in_flight = registry.gauge(f"{prefix}_tool_in_flight", "Tool calls currently running", ["tool"])
+        self.latency = registry.histogram(f"{prefix}_tool_latency_seconds", "Tool call latency", ["tool"])
+
+    def start(self, tool: str) -> None:
+        self.requests.inc(tool=tool)
+        self.in_flight.inc(tool=tool)
+
+    def finish(self, tool: str, seconds: float, ok: bool) -> None:
+        self.in_flight.dec(tool=tool)
+        self.latency.observe(seconds, tool=tool)
+        if not ok:
+            self.errors.inc(tool=tool)
+
+
+def start_http_server(registry: Registry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve GET /metrics from a daemon thread and return the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
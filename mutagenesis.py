@@ -0,0 +1,309 @@
+"""
+Local in-silico mutagenesis for ProteinDesignAgent.
+
+Generates large batches of variants around a parent sequence without an LLM
+round trip: random point mutants, alanine and residue (saturation) scans,
+helical-wheel face swaps and recombination of top candidates. Positions
+listed as fixed (e.g. binding hotspots) are never changed.
+
+All operators work on uint8-encoded NumPy arrays so tens of thousands of
+candidates can be produced per second.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+AA_INDEX = {aa: i for i, aa in enumerate(AMINO_ACIDS)}
+_AA_BYTES = np.frombuffer(AMINO_ACIDS.encode("ascii"), dtype=np.uint8)
+
+# Byte value -> amino-acid index (255 for anything that is not a standard residue)
+BYTE_TO_INDEX = np.full(256, 255, dtype=np.uint8)
+BYTE_TO_INDEX[_AA_BYTES] = np.arange(len(AMINO_ACIDS), dtype=np.uint8)
+
+# Degrees of rotation per residue in an ideal alpha-helix
+HELIX_TURN_DEGREES = 100.0
+
+# p53-like MDM2 binding motif: Phe19, Trp23 and Leu26 spaced i, i+4, i+7
+MDM2_HOTSPOT_PATTERN = "F...W..L"
+
+
+def encode(sequence: str) -> np.ndarray:
+    """Encode a sequence as a uint8 array of amino-acid indices."""
+    return BYTE_TO_INDEX[np.frombuffer(sequence.encode("ascii"), dtype=np.uint8)]
+
+
+def decode_batch(batch: np.ndarray) -> List[str]:
+    """Decode a 2D array of amino-acid indices into sequences."""
+    if batch.size == 0:
+        return []
+    raw = _AA_BYTES[batch]
+    return [row.tobytes().decode("ascii") for row in raw]
+
+
+def find_hotspots(sequence: str, pattern: str = MDM2_HOTSPOT_PATTERN) -> List[int]:
+    """
+    Locate hotspot residues by motif.
+
+    Every non-wildcard character of the pattern marks a hotspot, so the default
+    "F...W..L" returns the Phe/Trp/Leu positions of each p53-like motif.
+
+    Args:
+        sequence: Amino acid sequence
+        pattern: Regex-style motif where "." is a wildcard
+
+    Returns:
+        Sorted 0-based positions of hotspot residues
+    """
+    offsets = [i for i, c in enumerate(pattern) if c != "."]
+    positions = set()
+    for match in re.finditer(f"(?=({pattern}))", sequence):
+        positions.update(match.start() + offset for offset in offsets)
+    return sorted(positions)
+
+
+def helical_faces(length: int, n_faces: int = 4, phase: float = 0.0) -> np.ndarray:
+    """
+    Assign each residue of an ideal helix to a face of the helical wheel.
+
+    Args:
+        length: Number of residues
+        n_faces: Number of equal angular sectors
+        phase: Rotation of the wheel in degrees
+
+    Returns:
+        Array of face indices (0..n_faces-1), one per residue
+    """
+    angles = (np.arange(length) * HELIX_TURN_DEGREES + phase) % 360.0
+    return (angles // (360.0 / n_faces)).astype(np.int64)
+
+
+class MutagenesisEngine:
+    """
+    Generate sequence variants around a parent while respecting fixed positions.
+    """
+
+    def __init__(
+        self,
+        fixed_positions: Iterable[int] = (),
+        alphabet: str = AMINO_ACIDS,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            fixed_positions: 0-based positions that must keep the parent residue
+            alphabet: Residues allowed as substitutions
+            seed: Seed for the random generator
+        """
+        self.fixed_positions = sorted(set(fixed_positions))
+        self.alphabet = np.array([AA_INDEX[aa] for aa in alphabet], dtype=np.uint8)
+        self.rng = np.random.default_rng(seed)
+
+    def _mutable(self, length: int) -> np.ndarray:
+        mask = np.ones(length, dtype=bool)
+        fixed = [p for p in self.fixed_positions if 0 <= p < length]
+        mask[fixed] = False
+        return np.flatnonzero(mask)
+
+    def _parent(self, parent: str) -> np.ndarray:
+        encoded = encode(parent)
+        if (encoded == 255).any():
+            raise ValueError(f"Parent sequence contains non-standard residues: {parent}")
+        return encoded
+
+    def point_mutants(self, parent: str, n: int, max_mutations: int = 3) -> List[str]:
+        """
+        Random multi-point mutants.
+
+        Args:
+            parent: Parent sequence
+            n: Number of variants to draw (duplicates are possible; see generate)
+            max_mutations: Each variant carries 1..max_mutations substitutions
+
+        Returns:
+            Mutant sequences
+        """
+        base = self._parent(parent)
+        mutable = self._mutable(len(base))
+        if n <= 0 or mutable.size == 0:
+            return []
+        k = min(max_mutations, mutable.size)
+
+        batch = np.tile(base, (n, 1))
+        # Choose k distinct mutable positions per row via argsort of random keys
+        keys = self.rng.random((n, mutable.size))
+        positions = mutable[np.argsort(keys, axis=1)[:, :k]]
+        # Only the first m_i of the k positions are used in row i
+        counts = self.rng.integers(1, k + 1, size=n)
+        active = np.arange(k)[None, :] < counts[:, None]
+
+        # Draw substitutes that differ from the current residue
+        current = batch[np.arange(n)[:, None], positions]
+        substitutes = self.alphabet[self.rng.integers(0, self.alphabet.size, size=(n, k))]
+        clash = substitutes == current
+        while clash.any():
+            substitutes[clash] = self.alphabet[self.rng.integers(0, self.alphabet.size, size=int(clash.sum()))]
+            clash = (substitutes == current) & (self.alphabet.size > 1)
+
+        rows = np.broadcast_to(np.arange(n)[:, None], positions.shape)
+        batch[rows[active], positions[active]] = substitutes[active]
+        return decode_batch(batch)
+
+    def residue_scan(self, parent: str, residues: str = AMINO_ACIDS) -> List[str]:
+        """
+        Every single substitution to the given residues at every mutable position.
+
+        With the full alphabet this is a saturation scan.
+        """
+        base = self._parent(parent)
+        mutable = self._mutable(len(base))
+        targets = np.array([AA_INDEX[aa] for aa in residues], dtype=np.uint8)
+        pos = np.repeat(mutable, targets.size)
+        sub = np.tile(targets, mutable.size)
+        keep = base[pos] != sub
+        pos, sub = pos[keep], sub[keep]
+        batch = np.tile(base, (pos.size, 1))
+        batch[np.arange(pos.size), pos] = sub
+        return decode_batch(batch)
+
+    def alanine_scan(self, parent: str) -> List[str]:
+        """Single alanine substitutions at every mutable, non-alanine position."""
+        return self.residue_scan(parent, "A")
+
+    def face_swaps(self, parent: str, n_faces: int = 4) -> List[str]:
+        """
+        Swap residues between pairs of helical-wheel faces.
+
+        Residues on face a and face b are exchanged in sequence order (the
+        first residue of face a with the first of face b, and so on), which
+        moves a hydrophobic stripe to a different side of the helix. Fixed
+        positions stay where they are. One variant is produced per face pair
+        and wheel phase.
+
+        Args:
+            parent: Parent sequence, assumed helical
+            n_faces: Number of wheel sectors
+
+        Returns:
+            Face-swapped variants
+        """
+        base = self._parent(parent)
+        fixed = np.zeros(len(base), dtype=bool)
+        fixed[[p for p in self.fixed_positions if 0 <= p < len(base)]] = True
+        variants = []
+        for phase in np.arange(0.0, 360.0 / n_faces, HELIX_TURN_DEGREES / n_faces):
+            faces = helical_faces(len(base), n_faces, phase)
+            for a in range(n_faces):
+                for b in range(a + 1, n_faces):
+                    pos_a = np.flatnonzero((faces == a) & ~fixed)
+                    pos_b = np.flatnonzero((faces == b) & ~fixed)
+                    m = min(pos_a.size, pos_b.size)
+                    if m == 0:
+                        continue
+                    variant = base.copy()
+                    variant[pos_a[:m]], variant[pos_b[:m]] = base[pos_b[:m]], base[pos_a[:m]]
+                    variants.append(variant)
+        if not variants:
+            return []
+        return decode_batch(np.stack(variants))
+
+    def recombine(self, parents: Sequence[str], n: int) -> List[str]:
+        """
+        Uniform crossover between random pairs of equal-length parents.
+
+        Parents are grouped by length; each child takes every position from one
+        of its two parents at random. Fixed positions are taken from the first
+        parent in the input with that length (the parent, when called from generate).
+
+        Args:
+            parents: Top candidates to recombine
+            n: Total number of children to draw
+
+        Returns:
+            Recombined sequences
+        """
+        groups: Dict[int, List[np.ndarray]] = {}
+        for parent in parents:
+            groups.setdefault(len(parent), []).append(self._parent(parent))
+        groups = {length: np.stack(members) for length, members in groups.items() if len(members) > 1}
+        if not groups or n <= 0:
+            return []
+
+        total = sum(len(members) for members in groups.values())
+        children = []
+        for length, members in groups.items():
+            count = max(1, round(n * len(members) / total))
+            first = members[self.rng.integers(0, len(members), size=count)]
+            second = members[self.rng.integers(0, len(members), size=count)]
+            take_second = self.rng.random((count, length)) < 0.5
+            batch = np.where(take_second, second, first)
+            fixed = [p for p in self.fixed_positions if 0 <= p < length]
+            batch[:, fixed] = members[0, fixed]
+            children.extend(decode_batch(batch))
+        return children[:n]
+
+    def generate(
+        self,
+        parent: str,
+        n: int,
+        top_candidates: Optional[Sequence[str]] = None,
+        exclude: Iterable[str] = (),
+        max_mutations: int = 3
+    ) -> List[str]:
+        """
+        Produce up to n unique variants of parent from all operators.
+
+        The operators take turns (alanine scan, saturation scan, face swaps,
+        recombinants of the top candidates, random point mutants), so every
+        operator is represented even when n is small; the scans are visited
+        in random order so they cover the whole sequence, not its N-terminus.
+        Random point mutants fill whatever the other operators cannot.
+
+        Args:
+            parent: Sequence to mutate, usually the current best sequence
+            n: Maximum number of variants
+            top_candidates: Other strong sequences to recombine with parent
+            exclude: Sequences that must not be returned (e.g. already folded)
+            max_mutations: Maximum substitutions per random point mutant
+
+        Returns:
+            Unique variant sequences, never including parent or excluded ones
+        """
+        seen = set(exclude)
+        seen.add(parent)
+        variants: List[str] = []
+
+        def add(batch: Iterable[str]) -> None:
+            for seq in batch:
+                if len(variants) >= n:
+                    return
+                if seq not in seen:
+                    seen.add(seq)
+                    variants.append(seq)
+
+        pools = []
+        for scan in (self.alanine_scan(parent), self.residue_scan(parent)):
+            pools.append([scan[i] for i in self.rng.permutation(len(scan))])
+        pools.append(self.face_swaps(parent))
+        if top_candidates:
+            pools.append(self.recombine([parent, *top_candidates], max(n // 4, 1)))
+        pools.append(self.point_mutants(parent, 2 * n, max_mutations))
+        # Round-robin: one new variant from each operator in turn until all run dry
+        streams = [iter(pool) for pool in pools]
+        while streams and len(variants) < n:
+            for stream in list(streams):
+                for seq in stream:
+                    if seq not in seen:
+                        add([seq])
+                        break
+                else:
+                    streams.remove(stream)
+                if len(variants) >= n:
+                    break
+        # Random mutants may collide with each other; a few rounds fill the batch
+        for _ in range(4):
+            if len(variants) >= n:
+                break
+            add(self.point_mutants(parent, (n - len(variants)) * 2, max_mutations))
+        return variants
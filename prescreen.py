@@ -0,0 +1,294 @@
+"""
+Vectorized sequence-level pre-screening.
+
+Cheap descriptors are computed over a padded, uint8-encoded batch so that
+thousands of candidates can be ranked and pruned before any of them is sent
+to the (expensive) fold step:
+
+    - helix propensity (Pace & Scholtz energy penalty, lower is more helical)
+    - hydrophobic moment at 100 degrees (amphipathicity of an ideal helix)
+    - net charge at neutral pH
+    - aggregation-prone motifs (runs of consecutive hydrophobic residues)
+    - length and composition constraints parsed from the user prompt
+"""
+import math
+import re
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from mutagenesis import AMINO_ACIDS, AA_INDEX, HELIX_TURN_DEGREES, BYTE_TO_INDEX
+
+PAD = len(AMINO_ACIDS)
+
+# Pace & Scholtz (1998) helix propensity, kcal/mol relative to Ala
+HELIX_PENALTY = {
+    "A": 0.00, "L": 0.21, "R": 0.21, "M": 0.24, "K": 0.26, "Q": 0.39, "E": 0.40,
+    "I": 0.41, "W": 0.49, "S": 0.50, "Y": 0.53, "F": 0.54, "H": 0.61, "V": 0.61,
+    "N": 0.65, "T": 0.66, "C": 0.68, "D": 0.69, "G": 1.00, "P": 3.16,
+}
+
+# Eisenberg consensus hydrophobicity
+HYDROPHOBICITY = {
+    "A": 0.62, "R": -2.53, "N": -0.78, "D": -0.90, "C": 0.29, "Q": -0.85, "E": -0.74,
+    "G": 0.48, "H": -0.40, "I": 1.38, "L": 1.06, "K": -1.50, "M": 0.64, "F": 1.19,
+    "P": 0.12, "S": -0.18, "T": -0.05, "W": 0.81, "Y": 0.26, "V": 1.08,
+}
+
+CHARGE = {"K": 1.0, "R": 1.0, "H": 0.1, "D": -1.0, "E": -1.0}
+
+AGGREGATION_PRONE = "IVLFMWY"
+AGGREGATION_WINDOW = 5
+
+RESIDUE_NAMES = {
+    "alanine": "A", "arginine": "R", "asparagine": "N", "aspartate": "D", "aspartic acid": "D",
+    "cysteine": "C", "glutamine": "Q", "glutamate": "E", "glutamic acid": "E", "glycine": "G",
+    "histidine": "H", "isoleucine": "I", "leucine": "L", "lysine": "K", "methionine": "M",
+    "phenylalanine": "F", "proline": "P", "serine": "S", "threonine": "T", "tryptophan": "W",
+    "tyrosine": "Y", "valine": "V",
+}
+
+THREE_LETTER_CODES = {
+    "ala": "A", "arg": "R", "asn": "N", "asp": "D", "cys": "C", "gln": "Q", "glu": "E",
+    "gly": "G", "his": "H", "ile": "I", "leu": "L", "lys": "K", "met": "M", "phe": "F",
+    "pro": "P", "ser": "S", "thr": "T", "trp": "W", "tyr": "Y", "val": "V",
+}
+
+
+def _table(values: Dict[str, float], pad: float = 0.0) -> np.ndarray:
+    table = np.full(PAD + 1, pad, dtype=np.float64)
+    for aa, value in values.items():
+        table[AA_INDEX[aa]] = value
+    return table
+
+
+_HELIX_TABLE = _table(HELIX_PENALTY)
+_HYDRO_TABLE = _table(HYDROPHOBICITY)
+_CHARGE_TABLE = _table(CHARGE)
+_AGG_TABLE = _table({aa: 1.0 for aa in AGGREGATION_PRONE})
+
+
+def encode_batch(sequences: Sequence[str]) -> np.ndarray:
+    """
+    Encode sequences into a padded (N, max_len) uint8 matrix.
+
+    Non-standard characters and padding both map to PAD, which every lookup
+    table treats as a neutral residue.
+    """
+    if not sequences:
+        return np.zeros((0, 0), dtype=np.uint8)
+    max_len = max(len(seq) for seq in sequences)
+    joined = "".join(seq.ljust(max_len, "-") for seq in sequences).encode("ascii", "replace")
+    codes = BYTE_TO_INDEX[np.frombuffer(joined, dtype=np.uint8)].reshape(len(sequences), max_len)
+    codes[codes == 255] = PAD
+    return codes
+
+
+def compute_descriptors(sequences: Sequence[str]) -> Dict[str, np.ndarray]:
+    """
+    Compute per-sequence descriptors for a batch.
+
+    Args:
+        sequences: Amino acid sequences (any lengths)
+
+    Returns:
+        Dict of descriptor name -> array of shape (N,)
+    """
+    codes = encode_batch(sequences)
+    lengths = np.array([len(seq) for seq in sequences], dtype=np.float64)
+    safe_len = np.maximum(lengths, 1.0)
+    if codes.size == 0:
+        empty = np.zeros(len(sequences))
+        return {"length": lengths, "helix_penalty": empty, "hydrophobic_moment": empty,
+                "net_charge": empty, "aggregation_motifs": empty}
+
+    helix_penalty = _HELIX_TABLE[codes].sum(axis=1) / safe_len
+
+    hydro = _HYDRO_TABLE[codes]
+    angles = np.deg2rad(np.arange(codes.shape[1]) * HELIX_TURN_DEGREES)
+    moment = np.hypot(hydro @ np.cos(angles), hydro @ np.sin(angles)) / safe_len
+
+    net_charge = _CHARGE_TABLE[codes].sum(axis=1)
+
+    # Count windows where every residue is aggregation-prone
+    prone = _AGG_TABLE[codes]
+    window = AGGREGATION_WINDOW
+    if codes.shape[1] >= window:
+        csum = np.concatenate([np.zeros((len(sequences), 1)), np.cumsum(prone, axis=1)], axis=1)
+        aggregation = ((csum[:, window:] - csum[:, :-window]) >= window).sum(axis=1).astype(np.float64)
+    else:
+        aggregation = np.zeros(len(sequences))
+
+    return {
+        "length": lengths,
+        "helix_penalty": helix_penalty,
+        "hydrophobic_moment": moment,
+        "net_charge": net_charge,
+        "aggregation_motifs": aggregation,
+    }
+
+
+def parse_constraints(prompt: str) -> Dict[str, Any]:
+    """
+    Pull length and composition constraints out of a free-text design prompt.
+
+    Recognizes forms like "50-aa", "50 residues", "between 40 and 60 residues",
+    "helix"/"helical", and "no cysteine" / "without Cys".
+
+    Args:
+        prompt: User design request
+
+    Returns:
+        Dict with target_length, min_length, max_length, helical and forbidden
+    """
+    text = prompt.lower().replace("‑", "-").replace("–", "-").replace("α", "alpha ")
+    constraints: Dict[str, Any] = {
+        "target_length": None,
+        "min_length": None,
+        "max_length": None,
+        "helical": bool(re.search(r"\bhelix|\bhelical|\bhelices", text)),
+        "forbidden": "",
+    }
+
+    unit = r"(?:aa|amino[\s-]acids?|residues?|mers?)\b"
+    span = re.search(rf"(?:between\s+)?(\d+)\s*(?:-|to|and)\s*(\d+)\s*-?\s*{unit}", text)
+    if span:
+        low, high = sorted((int(span.group(1)), int(span.group(2))))
+        constraints.update(min_length=low, max_length=high, target_length=(low + high) // 2)
+    else:
+        single = re.search(rf"(\d+)\s*-?\s*{unit}", text)
+        if single:
+            constraints["target_length"] = int(single.group(1))
+
+    forbidden = set()
+    for name in re.findall(r"(?:no|without|avoid(?:ing)?|lacking)\s+([a-z]+(?:\s+acids?)?)", text):
+        for candidate in (name, name.rstrip("s")):
+            if candidate in RESIDUE_NAMES:
+                forbidden.add(RESIDUE_NAMES[candidate])
+                break
+            if candidate in THREE_LETTER_CODES:
+                forbidden.add(THREE_LETTER_CODES[candidate])
+                break
+    constraints["forbidden"] = "".join(sorted(forbidden))
+    return constraints
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    std = values.std()
+    if std == 0 or not np.isfinite(std):
+        return np.zeros_like(values)
+    return (values - values.mean()) / std
+
+
+class PreScreen:
+    """
+    Rank and prune candidates using sequence descriptors before folding.
+    """
+
+    def __init__(
+        self,
+        keep_fraction: float = 0.5,
+        min_keep: int = 1,
+        target_length: Optional[int] = None,
+        min_length: Optional[int] = None,
+        max_length: Optional[int] = None,
+        length_tolerance: float = 0.1,
+        helical: bool = False,
+        forbidden: str = "",
+        max_abs_charge: Optional[float] = None,
+        max_aggregation_motifs: int = 2
+    ):
+        """
+        Args:
+            keep_fraction: Fraction of the candidates that pass hard filters to keep
+            min_keep: Always keep at least this many candidates (if any pass)
+            target_length: Desired length; ranked by deviation from it
+            min_length: Hard lower length bound (default: target - tolerance)
+            max_length: Hard upper length bound (default: target + tolerance)
+            length_tolerance: Relative tolerance around target_length for the hard bounds
+            helical: Reward helix propensity and hydrophobic moment
+            forbidden: Residues that disqualify a candidate
+            max_abs_charge: Candidates with larger |net charge| are rejected
+            max_aggregation_motifs: Candidates with more aggregation-prone windows are rejected
+        """
+        self.keep_fraction = keep_fraction
+        self.min_keep = min_keep
+        self.target_length = target_length
+        if target_length is not None:
+            slack = max(int(math.ceil(target_length * length_tolerance)), 2)
+            min_length = min_length if min_length is not None else target_length - slack
+            max_length = max_length if max_length is not None else target_length + slack
+        self.min_length = min_length
+        self.max_length = max_length
+        self.helical = helical
+        self.forbidden = forbidden
+        self.max_abs_charge = max_abs_charge
+        self.max_aggregation_motifs = max_aggregation_motifs
+
+    @classmethod
+    def from_prompt(cls, prompt: str, keep_fraction: float = 0.5, **kwargs) -> "PreScreen":
+        """Build a pre-screen whose constraints are parsed from the design prompt."""
+        constraints = parse_constraints(prompt)
+        return cls(keep_fraction=keep_fraction, **{**constraints, **kwargs})
+
+    def passes(self, sequence: str) -> bool:
+        """Whether a single candidate satisfies the hard constraints."""
+        return self.screen([sequence])["passed"] == 1
+
+    def screen(self, sequences: Sequence[str]) -> Dict[str, Any]:
+        """
+        Score, filter and rank a batch of candidates.
+
+        Args:
+            sequences: Candidate sequences
+
+        Returns:
+            Dict with:
+                kept: surviving sequences, best first
+                scores: composite score of every input sequence (-inf if rejected)
+                descriptors: per-sequence descriptor arrays
+                screened / passed / pruned: counts
+        """
+        sequences = list(sequences)
+        descriptors = compute_descriptors(sequences)
+        n = len(sequences)
+        if n == 0:
+            return {"kept": [], "scores": np.zeros(0), "descriptors": descriptors,
+                    "screened": 0, "passed": 0, "pruned": 0}
+
+        lengths = descriptors["length"]
+        passed = np.ones(n, dtype=bool)
+        if self.min_length is not None:
+            passed &= lengths >= self.min_length
+        if self.max_length is not None:
+            passed &= lengths <= self.max_length
+        if self.max_abs_charge is not None:
+            passed &= np.abs(descriptors["net_charge"]) <= self.max_abs_charge
+        passed &= descriptors["aggregation_motifs"] <= self.max_aggregation_motifs
+        if self.forbidden:
+            codes = encode_batch(sequences)
+            bad = np.array([AA_INDEX[aa] for aa in self.forbidden], dtype=np.uint8)
+            passed &= ~np.isin(codes, bad).any(axis=1)
+
+        # Composite score: higher is better
+        score = -_zscore(descriptors["aggregation_motifs"])
+        if self.helical:
+            score += -_zscore(descriptors["helix_penalty"]) + _zscore(descriptors["hydrophobic_moment"])
+        if self.target_length is not None:
+            score += -_zscore(np.abs(lengths - self.target_length))
+        # Mildly prefer charge near neutral, which helps solubility without dominating
+        score += -0.5 * _zscore(np.abs(descriptors["net_charge"]))
+        score = np.where(passed, score, -np.inf)
+
+        n_passed = int(passed.sum())
+        n_keep = min(n_passed, max(self.min_keep, int(math.ceil(n_passed * self.keep_fraction))))
+        # Stable sort keeps the original order among ties
+        order = np.argsort(-score, kind="stable")[:n_keep]
+        return {
+            "kept": [sequences[i] for i in order],
+            "scores": score,
+            "descriptors": descriptors,
+            "screened": n,
+            "passed": n_passed,
+            "pruned": n - n_keep,
+        }
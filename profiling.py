@@ -0,0 +1,301 @@
+"""
+On-demand profiling of agent sessions.
+
+Enable it with AGENT_PROFILE=cprofile|sample (or ProteinDesignAgent(profile=...)):
+
+    cprofile   deterministic cProfile of the session thread; exact call counts,
+               higher overhead
+    sample     wall-clock stack sampling of every thread every few milliseconds;
+               low overhead, safe for production runs
+
+Either mode also records asyncio task timings on the agent's event loops and
+asks child fold_server processes (spawned over stdio) to cProfile themselves.
+Each session writes to <AGENT_PROFILE_DIR>/<session_id>/:
+
+    agent.prof        cProfile stats (cprofile mode), readable with pstats / snakeviz
+    agent.folded      collapsed stacks (sample mode), readable with flamegraph.pl / speedscope
+    tasks.json        asyncio task count / total / max seconds by coroutine
+    fold_server-*.prof  one cProfile per child fold server
+    summary.txt       top-N hotspots across all of the above
+"""
+import asyncio
+import atexit
+import cProfile
+import io
+import json
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+PROFILE_ENV = "AGENT_PROFILE"
+PROFILE_DIR_ENV = "AGENT_PROFILE_DIR"
+# Set for child processes: directory they should write their own profile to
+CHILD_PROFILE_ENV = "FOLD_SERVER_PROFILE_DIR"
+
+MODES = ("cprofile", "sample")
+DEFAULT_PROFILE_DIR = "profiles"
+SAMPLE_INTERVAL = 0.005
+TOP_N = 25
+
+
+def resolve_mode(value: Optional[str]) -> Optional[str]:
+    """Normalize a profile setting: None/""/"0"/"off" disable, "1"/"on" mean cprofile."""
+    if value is None:
+        return None
+    value = str(value).strip().lower()
+    if value in ("", "0", "off", "false", "no"):
+        return None
+    if value in ("1", "on", "true", "yes", "deterministic"):
+        return "cprofile"
+    if value not in MODES:
+        raise ValueError(f"Unknown profile mode {value!r}; expected one of {MODES}")
+    return value
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    """Samples the stacks of all threads from a background thread."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.self_counts: Counter = Counter()
+        self.inclusive_counts: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                stack.reverse()
+                thread_name = names.get(ident, str(ident))
+                self.stacks[(thread_name,) + tuple(stack)] += 1
+                self.self_counts[stack[-1]] += 1
+                for label in set(stack):
+                    self.inclusive_counts[label] += 1
+                self.samples += 1
+
+    def write_folded(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(";".join(stack) + f" {count}\n")
+
+    def summary(self, top_n: int) -> List[str]:
+        if not self.samples:
+            return ["(no samples)"]
+        lines = [f"{self.samples} samples every {self.interval * 1000:.0f} ms across all threads",
+                 "", "Self time (leaf frames):"]
+        for label, count in self.self_counts.most_common(top_n):
+            lines.append(f"  {100.0 * count / self.samples:6.2f}%  {label}")
+        lines += ["", "Inclusive time:"]
+        for label, count in self.inclusive_counts.most_common(top_n):
+            lines.append(f"  {100.0 * count / self.samples:6.2f}%  {label}")
+        return lines
+
+
+class TaskTimer:
+    """Task factory that records how long every asyncio task lives, by coroutine."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+
+    def instrument(self, loop: asyncio.AbstractEventLoop) -> None:
+        if getattr(loop, "_profile_task_timer", None) is self:
+            return
+        previous = loop.get_task_factory()
+
+        def factory(loop, coro, **kwargs):
+            task = previous(loop, coro, **kwargs) if previous else asyncio.Task(coro, loop=loop, **kwargs)
+            name = getattr(coro, "__qualname__", type(coro).__name__)
+            started = time.perf_counter()
+
+            def done(_task):
+                with self._lock:
+                    self.timings[name].append(time.perf_counter() - started)
+            task.add_done_callback(done)
+            return task
+
+        loop.set_task_factory(factory)
+        loop._profile_task_timer = self
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            items = list(self.timings.items())
+        return {
+            name: {"count": len(values), "total_seconds": sum(values), "max_seconds": max(values)}
+            for name, values in sorted(items, key=lambda kv: -sum(kv[1]))
+        }
+
+
+def _pstats_summary(stats: pstats.Stats, top_n: int) -> List[str]:
+    lines = []
+    for key, title in (("cumulative", "By cumulative time:"), ("tottime", "By own time:")):
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats(key).print_stats(top_n)
+        body = buffer.getvalue()
+        # Drop pstats' preamble; keep the table
+        start = body.find("   ncalls")
+        lines += [title, body[start:].rstrip() if start >= 0 else body.rstrip(), ""]
+    return lines
+
+
+class SessionProfiler:
+    """
+    Context manager that profiles one agent session.
+
+    Usage:
+        with SessionProfiler("sample", session_id) as profiler:
+            profiler.instrument_loop(loop)
+            ...
+        print(profiler.summary_path)
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        session_id: str,
+        out_dir: Optional[str] = None,
+        top_n: int = TOP_N,
+        sample_interval: float = SAMPLE_INTERVAL
+    ):
+        self.mode = resolve_mode(mode)
+        if self.mode is None:
+            raise ValueError("SessionProfiler needs a profile mode")
+        self.top_n = top_n
+        self.dir = os.path.abspath(os.path.join(out_dir or os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR),
+                                                session_id))
+        self.tasks = TaskTimer()
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+        self._sample_interval = sample_interval
+        self._previous_child_env: Optional[str] = None
+        self._started = 0.0
+        self.elapsed = 0.0
+        self.summary_path = os.path.join(self.dir, "summary.txt")
+
+    def instrument_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Record task timings on an event loop used during the session."""
+        self.tasks.instrument(loop)
+
+    def __enter__(self) -> "SessionProfiler":
+        os.makedirs(self.dir, exist_ok=True)
+        # Child fold servers inherit the environment and profile themselves
+        self._previous_child_env = os.environ.get(CHILD_PROFILE_ENV)
+        os.environ[CHILD_PROFILE_ENV] = self.dir
+        self._started = time.perf_counter()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = StackSampler(self._sample_interval)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._profile:
+            self._profile.disable()
+        if self._sampler:
+            self._sampler.stop()
+        self.elapsed = time.perf_counter() - self._started
+        if self._previous_child_env is None:
+            os.environ.pop(CHILD_PROFILE_ENV, None)
+        else:
+            os.environ[CHILD_PROFILE_ENV] = self._previous_child_env
+        self.write()
+
+    def write(self) -> None:
+        """Write raw profiles and the hotspot summary."""
+        lines = [f"Session profile ({self.mode}), {self.elapsed:.2f}s wall time", ""]
+        if self._profile:
+            path = os.path.join(self.dir, "agent.prof")
+            self._profile.dump_stats(path)
+            lines += ["== Agent (cProfile) =="] + _pstats_summary(pstats.Stats(path), self.top_n)
+        if self._sampler:
+            self._sampler.write_folded(os.path.join(self.dir, "agent.folded"))
+            lines += ["== Agent (sampled) =="] + self._sampler.summary(self.top_n) + [""]
+
+        tasks = self.tasks.report()
+        with open(os.path.join(self.dir, "tasks.json"), "w") as f:
+            json.dump(tasks, f, indent=2)
+        lines.append("== asyncio tasks ==")
+        for name, timing in list(tasks.items())[:self.top_n]:
+            lines.append(f"  {timing['total_seconds']:9.3f}s total  {timing['max_seconds']:8.3f}s max  "
+                         f"{timing['count']:5d}x  {name}")
+        lines.append("")
+
+        children = sorted(name for name in os.listdir(self.dir) if name.startswith("fold_server-") and name.endswith(".prof"))
+        if children:
+            lines.append(f"== Child fold servers ({len(children)} processes, combined) ==")
+            stats = pstats.Stats(*[os.path.join(self.dir, name) for name in children])
+            lines += _pstats_summary(stats, self.top_n)
+
+        with open(self.summary_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def top_hotspots(self, n: int = 10) -> List[str]:
+        """The first n lines of the hotspot table, for logs and results."""
+        if self._sampler:
+            return self._sampler.summary(n)[3:3 + n]
+        if self._profile:
+            stats = pstats.Stats(self._profile)
+            rows = sorted(stats.stats.items(), key=lambda kv: -kv[1][3])[:n]
+            return [f"{ct:9.3f}s cumulative  {os.path.basename(f)}:{line}({fn})" for (f, line, fn), (_, _, _, ct, _) in rows]
+        return []
+
+
+def profile_child_process(name: str) -> None:
+    """
+    Start cProfile in a child process when the parent session is profiling.
+
+    The profile is written to <dir>/<name>-<pid>.prof at interpreter exit,
+    including on SIGTERM from the parent closing the stdio connection.
+    """
+    out_dir = os.environ.get(CHILD_PROFILE_ENV)
+    if not out_dir:
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    path = os.path.join(out_dir, f"{name}-{os.getpid()}.prof")
+
+    def dump():
+        profile.disable()
+        try:
+            profile.dump_stats(path)
+        except OSError:
+            pass
+
+    atexit.register(dump)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
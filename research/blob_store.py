@@ -0,0 +1,185 @@
+"""
+Content-addressed store for paper PDFs and extracted text.
+
+search_papers used to save every PDF under papers/<topic>/<id>.pdf, so a
+paper found by two topics was downloaded and stored twice, and lookups had
+to walk every topic directory. Here every blob is stored once under its
+SHA-256, and a small ref file maps a paper id to its blob:
+
+    <root>/objects/ab/abcdef....pdf     blob, named by content hash
+    <root>/refs/pdf/<quoted paper id>   digest of the paper's PDF
+    <root>/refs/text/<quoted paper id>  digest of its extracted text
+
+Topic directories keep only papers_info.json, whose entries point at the
+blob (pdf_path, pdf_sha256). Blobs and refs are written to a temporary file
+and renamed into place, so several server processes can share one store.
+
+Move an existing papers/<topic>/*.pdf layout into the store with:
+
+    python blob_store.py migrate --papers papers
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Optional
+from urllib.parse import quote, unquote
+
+BLOB_STORE_PATH = os.environ.get("BLOB_STORE_PATH", "blobs")
+
+KINDS = {"pdf": ".pdf", "text": ".txt"}
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unique per thread: the research server stores downloads from its worker threads concurrently
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class BlobStore:
+    """Paper PDFs and texts stored once by content hash, found by paper id."""
+
+    def __init__(self, root: str = BLOB_STORE_PATH):
+        self.root = root
+
+    def _object_path(self, digest: str, kind: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + KINDS[kind])
+
+    def _ref_path(self, paper_id: str, kind: str) -> str:
+        # Old-style arXiv ids contain a slash (q-bio/0411035v1)
+        return os.path.join(self.root, "refs", kind, quote(paper_id, safe=""))
+
+    def put(self, data: bytes, kind: str = "pdf") -> str:
+        """Store a blob if it is not already present; returns its digest."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest, kind)
+        if not os.path.exists(path):
+            _atomic_write(path, data)
+        return digest
+
+    def digest(self, paper_id: str, kind: str = "pdf") -> Optional[str]:
+        """Digest a paper id points to, if its blob is present."""
+        try:
+            with open(self._ref_path(paper_id, kind), "r") as f:
+                digest = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return digest if os.path.exists(self._object_path(digest, kind)) else None
+
+    def path(self, paper_id: str, kind: str = "pdf") -> Optional[str]:
+        """Path of a paper's blob, or None if the store does not have it."""
+        digest = self.digest(paper_id, kind)
+        return self._object_path(digest, kind) if digest else None
+
+    def add(self, paper_id: str, data: bytes, kind: str = "pdf") -> str:
+        """Store a paper's blob and point its id at it; returns the blob path."""
+        digest = self.put(data, kind)
+        _atomic_write(self._ref_path(paper_id, kind), digest.encode("ascii"))
+        return self._object_path(digest, kind)
+
+    @staticmethod
+    def digest_of(blob_path: str) -> str:
+        """Digest of a blob, read from its path."""
+        return os.path.basename(blob_path).split(".", 1)[0]
+
+    def add_file(self, paper_id: str, file_path: str, kind: str = "pdf") -> str:
+        with open(file_path, "rb") as f:
+            return self.add(paper_id, f.read(), kind)
+
+    def read_text(self, paper_id: str) -> Optional[str]:
+        path = self.path(paper_id, "text")
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def add_text(self, paper_id: str, text: str) -> str:
+        return self.add(paper_id, text.encode("utf-8"), "text")
+
+    def stats(self) -> Dict[str, int]:
+        """Blob count and bytes, and the number of paper ids referencing them."""
+        out = {"objects": 0, "bytes": 0}
+        objects = os.path.join(self.root, "objects")
+        if os.path.isdir(objects):
+            for prefix in os.listdir(objects):
+                for name in os.listdir(os.path.join(objects, prefix)):
+                    out["objects"] += 1
+                    out["bytes"] += os.path.getsize(os.path.join(objects, prefix, name))
+        for kind in KINDS:
+            refs = os.path.join(self.root, "refs", kind)
+            out[f"{kind}_refs"] = len(os.listdir(refs)) if os.path.isdir(refs) else 0
+        return out
+
+
+def migrate(store: BlobStore, paper_dir: str = "papers", keep: bool = False) -> Dict[str, int]:
+    """
+    Move papers/<topic>/<id>.pdf files into the store and point the topic
+    manifests (papers_info.json) at the blobs.
+
+    Args:
+        store: Destination store
+        paper_dir: Root of the topic directories
+        keep: Leave the original PDFs in place
+
+    Returns:
+        Counts of migrated files, duplicate copies among them, bytes those
+        duplicates took up, and distinct blobs
+    """
+    counts = {"files": 0, "duplicates": 0, "bytes_freed": 0}
+    seen = set()
+    for topic in sorted(os.listdir(paper_dir)):
+        topic_path = os.path.join(paper_dir, topic)
+        if not os.path.isdir(topic_path):
+            continue
+        manifest_path = os.path.join(topic_path, "papers_info.json")
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            manifest = {}
+        for name in sorted(os.listdir(topic_path)):
+            if not name.endswith(".pdf"):
+                continue
+            pdf_path = os.path.join(topic_path, name)
+            paper_id = unquote(name[:-len(".pdf")])
+            size = os.path.getsize(pdf_path)
+            blob_path = store.add_file(paper_id, pdf_path)
+            digest = store.digest(paper_id)
+            counts["files"] += 1
+            if digest in seen:
+                counts["duplicates"] += 1
+                counts["bytes_freed"] += size
+            seen.add(digest)
+            if paper_id in manifest:
+                manifest[paper_id]["pdf_path"] = blob_path
+                manifest[paper_id]["pdf_sha256"] = digest
+            if not keep:
+                os.remove(pdf_path)
+        if manifest:
+            with open(manifest_path, "w") as f:
+                json.dump(manifest, f, indent=2)
+    counts["blobs"] = len(seen)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-addressed paper store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_migrate = sub.add_parser("migrate", help="Move topic-directory PDFs into the store")
+    p_migrate.add_argument("--papers", default="papers")
+    p_migrate.add_argument("--store", default=BLOB_STORE_PATH)
+    p_migrate.add_argument("--keep", action="store_true", help="Leave the original PDFs in place")
+
+    p_stats = sub.add_parser("stats", help="Print store size")
+    p_stats.add_argument("--store", default=BLOB_STORE_PATH)
+
+    args = parser.parse_args()
+    if args.command == "migrate":
+        print(json.dumps(migrate(BlobStore(args.store), args.papers, args.keep), indent=2))
+    else:
+        print(json.dumps(BlobStore(args.store).stats(), indent=2))
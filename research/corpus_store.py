@@ -0,0 +1,577 @@
+"""
+Packed, memory-mapped corpus of paper metadata and text.
+
+Every paper lives in one data file instead of per-topic papers_info.json
+files, info/<topic>/*.txt notes and PDFs. A corpus at corpus.pack is two
+files:
+
+    corpus.pack               the index: header b"MCPCORP2", then
+                              table    6 x uint64 per record: meta_off, meta_len,
+                                       text_off, text_len, chunks_off, n_chunks
+                              ids      JSON list of paper ids, one per table row
+                              trailer  magic, generation, data_len, n_records, ids_len
+    corpus.pack.<gen>.data    the records: header b"MCPDATA1", then
+                              [metadata JSON][text UTF-8][chunk boundaries, uint64],
+                              8-byte aligned
+
+Readers map the first data_len bytes of the data file read-only and slice
+metadata, text and chunks straight out of the mapping. Writes append new
+records past data_len and then publish them by writing a new index next to
+the old one and renaming it into place, so a reader sees either the old or
+the new corpus, and a crash mid-write leaves the old one intact. Bytes
+already published are never modified, so mappings of them stay valid until
+they are refreshed.
+
+update() merges papers into the corpus: new metadata keys are added, topics
+are unioned, and stored text is kept when the update brings none (searches
+only know metadata; text comes from rebuilds). Updates that change nothing
+do not touch the files. A changed paper is appended again and its old record
+becomes dead space; once more than half the data file is dead, the corpus is
+compacted into a new generation of the data file, as write() and rebuilds do.
+
+Rebuild from the existing directory layout with:
+
+    python corpus_store.py rebuild --papers papers --info info --out corpus.pack
+"""
+import argparse
+import contextlib
+import json
+import mmap
+import os
+import struct
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from blob_store import BLOB_STORE_PATH, BlobStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers in several processes are not serialized
+    fcntl = None
+
+try:
+    from pypdf import PdfReader
+    PDF_TEXT_AVAILABLE = True
+except ImportError:
+    PDF_TEXT_AVAILABLE = False
+
+CORPUS_PATH = os.environ.get("CORPUS_PATH", "corpus.pack")
+
+MAGIC = b"MCPCORP2"
+DATA_MAGIC = b"MCPDATA1"
+TRAILER = struct.Struct("<8sQQQQ")
+FIELDS = 6
+CHUNK_CHARS = 2000
+# Compact once dead records take up more than this share of the data file
+MAX_DEAD_FRACTION = 0.5
+
+
+def _pad(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def chunk_boundaries(text_bytes: bytes, max_chars: int = CHUNK_CHARS) -> List[int]:
+    """
+    Byte offsets splitting UTF-8 text into chunks of at most ~max_chars bytes.
+
+    Chunks end at paragraph breaks where possible, otherwise at the last
+    newline or space before the limit. Returns n_chunks + 1 offsets, starting
+    at 0 and ending at len(text_bytes).
+    """
+    bounds = [0]
+    start, n = 0, len(text_bytes)
+    while n - start > max_chars:
+        limit = start + max_chars
+        cut = -1
+        for sep in (b"\n\n", b"\n", b" "):
+            cut = text_bytes.rfind(sep, start + 1, limit)
+            if cut > start:
+                cut += len(sep)
+                break
+        if cut <= start:
+            cut = limit
+            # Never split a multi-byte UTF-8 character
+            while cut > start and (text_bytes[cut] & 0xC0) == 0x80:
+                cut -= 1
+        bounds.append(cut)
+        start = cut
+    if n > 0:
+        bounds.append(n)
+    return bounds
+
+
+def _pack_record(offset: int, meta: Dict[str, Any], text_bytes: bytes) -> Tuple[bytes, List[int]]:
+    """Bytes of one record written at `offset` (8-byte aligned) and its table row."""
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    bounds = chunk_boundaries(text_bytes)
+    text_off = offset + len(meta_bytes)
+    chunks_off = text_off + len(text_bytes)
+    chunks_off += _pad(chunks_off)
+    packed = b"".join([
+        meta_bytes,
+        text_bytes,
+        b"\0" * _pad(text_off + len(text_bytes)),
+        struct.pack(f"<{len(bounds)}Q", *bounds),
+    ])
+    return packed, [offset, len(meta_bytes), text_off, len(text_bytes), chunks_off, max(len(bounds) - 1, 0)]
+
+
+def _record_end(row: List[int]) -> int:
+    # Records without text still store one chunk boundary
+    return row[4] + 8 * (row[5] + 1)
+
+
+class CorpusStore:
+    """
+    Read-only view of a packed corpus, plus appending and compacting writes.
+
+    Reads are zero-copy slices of a shared memory map; the mapping is
+    refreshed automatically when another writer has published a new index.
+    """
+
+    def __init__(self, path: str = CORPUS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mm: Optional[mmap.mmap] = None
+        self._table: Optional[memoryview] = None
+        self._index: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._generation = 0
+        self._data_len = 0
+
+    def _data_path(self, generation: int) -> str:
+        return f"{self.path}.{generation}.data"
+
+    # --- mapping -------------------------------------------------------
+
+    def _close_map(self) -> None:
+        if self._table is not None:
+            self._table.release()
+            self._table = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._index, self._ids = {}, []
+
+    def _refresh(self) -> None:
+        # A compaction can remove the data file between reading an index and
+        # opening its data; the index that replaced it is read on the next pass
+        for attempt in range(3):
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._close_map()
+                self._stamp = None
+                return
+            if (st.st_ino, st.st_size, st.st_mtime_ns) == self._stamp:
+                return
+            with open(self.path, "rb") as f:
+                # Stamp the index actually read; the path may be replaced in between
+                st = os.fstat(f.fileno())
+                stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+                index = f.read()
+            if len(index) < len(MAGIC) + TRAILER.size or index[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{self.path} is not a complete corpus index; rebuild it")
+            magic, generation, data_len, n_records, ids_len = TRAILER.unpack_from(index, len(index) - TRAILER.size)
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a complete corpus index; rebuild it")
+            try:
+                with open(self._data_path(generation), "rb") as f:
+                    mm = mmap.mmap(f.fileno(), data_len, access=mmap.ACCESS_READ)
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+                continue
+            if mm[:len(DATA_MAGIC)] != DATA_MAGIC:
+                mm.close()
+                raise ValueError(f"{self._data_path(generation)} is not a corpus data file; rebuild it")
+            self._close_map()
+            table_off = len(MAGIC)
+            table_bytes = n_records * FIELDS * 8
+            self._mm = mm
+            self._table = memoryview(index)[table_off:table_off + table_bytes].cast("Q")
+            self._ids = json.loads(index[table_off + table_bytes:table_off + table_bytes + ids_len])
+            # Later rows shadow earlier ones with the same id
+            self._index = {paper_id: row for row, paper_id in enumerate(self._ids)}
+            self._generation, self._data_len = generation, data_len
+            self._stamp = stamp
+            return
+
+    def close(self) -> None:
+        with self._lock:
+            self._close_map()
+            self._stamp = None
+
+    def _row(self, paper_id: str) -> Optional[Tuple[int, ...]]:
+        self._refresh()
+        row = self._index.get(paper_id)
+        if row is None:
+            return None
+        return tuple(self._table[row * FIELDS:(row + 1) * FIELDS])
+    # --- reads ---------------------------------------------------------
+
+    def __contains__(self, paper_id: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return paper_id in self._index
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._index)
+
+    def ids(self) -> List[str]:
+        """Paper ids in the corpus, oldest first."""
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+    def metadata(self, paper_id: str) -> Optional[Dict[str, Any]]:
+        """Stored metadata for a paper, or None if it is not in the corpus."""
+        with self._lock:
+            row = self._row(paper_id)
+            if row is None:
+                return None
+            meta_off, meta_len = row[0], row[1]
+            return json.loads(self._mm[meta_off:meta_off + meta_len])
+
+    def text_view(self, paper_id: str) -> Optional[memoryview]:
+        """Zero-copy UTF-8 bytes of a paper's text. Release the view when done."""
+        with self._lock:
+            row = self._row(paper_id)
+            if row is None:
+                return None
+            text_off, text_len = row[2], row[3]
+            return memoryview(self._mm)[text_off:text_off + text_len]
+
+    def text(self, paper_id: str) -> Optional[str]:
+        """A paper's full text, or None if it is not in the corpus."""
+        view = self.text_view(paper_id)
+        if view is None:
+            return None
+        with view:
+            return str(view, "utf-8")
+
+    def n_chunks(self, paper_id: str) -> int:
+        with self._lock:
+            row = self._row(paper_id)
+            return 0 if row is None else row[5]
+
+    def chunk(self, paper_id: str, index: int) -> Optional[str]:
+        """
+        One chunk of a paper's text.
+
+        Args:
+            paper_id: Paper to read
+            index: Chunk number, 0-based (negative counts from the end)
+
+        Returns:
+            The chunk text, or None if the paper or chunk does not exist
+        """
+        with self._lock:
+            row = self._row(paper_id)
+            if row is None:
+                return None
+            text_off, chunks_off, n_chunks = row[2], row[4], row[5]
+            if index < 0:
+                index += n_chunks
+            if not 0 <= index < n_chunks:
+                return None
+            start, end = struct.unpack_from("<QQ", self._mm, chunks_off + index * 8)
+            return str(self._mm[text_off + start:text_off + end], "utf-8")
+
+    def _live_bytes(self) -> int:
+        return sum(_record_end(self._table[row * FIELDS:(row + 1) * FIELDS]) - self._table[row * FIELDS]
+                   for row in self._index.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {
+                "path": self.path,
+                "papers": len(self._index),
+                "records": len(self._ids),
+                "bytes": self._data_len + self._stamp[1] if self._stamp else 0,
+                "dead_bytes": self._data_len - len(DATA_MAGIC) - self._live_bytes() if self._stamp else 0,
+                "generation": self._generation,
+            }
+
+    # --- writes --------------------------------------------------------
+
+    def _stored(self, paper_id: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """A stored record as (metadata, text bytes); caller holds the lock."""
+        row = self._row(paper_id)
+        if row is None:
+            return None
+        meta_off, meta_len, text_off, text_len = row[:4]
+        return json.loads(self._mm[meta_off:meta_off + meta_len]), self._mm[text_off:text_off + text_len]
+
+    def _records(self) -> Dict[str, Tuple[Dict[str, Any], bytes]]:
+        """Every live record as paper_id -> (metadata, text bytes); caller holds the lock."""
+        self._refresh()
+        return {paper_id: self._stored(paper_id) for paper_id in self._index}
+
+    def _publish(self, generation: int, data_len: int, rows: Dict[str, List[int]]) -> None:
+        """Write an index for the first data_len bytes of a data file and rename it into place."""
+        table = [value for row in rows.values() for value in row]
+        ids_bytes = json.dumps(list(rows)).encode("utf-8")
+        tmp_path = f"{self.path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(MAGIC)
+                f.write(struct.pack(f"<{len(table)}Q", *table))
+                f.write(ids_bytes)
+                f.write(TRAILER.pack(MAGIC, generation, data_len, len(rows), len(ids_bytes)))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._close_map()
+        self._stamp = None
+
+    def _write(self, records: Dict[str, Tuple[Dict[str, Any], bytes]]) -> None:
+        """Write every record into a new generation of the data file and publish it; caller holds the lock."""
+        try:
+            self._refresh()
+            old = self._generation if self._stamp else None
+        except ValueError:
+            # An unreadable or older-format index is simply replaced
+            old = None
+        generation = (old or 0) + 1
+        data_path = self._data_path(generation)
+        rows: Dict[str, List[int]] = {}
+        try:
+            with open(data_path, "wb") as f:
+                f.write(DATA_MAGIC)
+                offset = len(DATA_MAGIC)
+                for paper_id, (meta, text_bytes) in records.items():
+                    packed, rows[paper_id] = _pack_record(offset, meta, text_bytes)
+                    f.write(packed)
+                    offset += len(packed)
+                f.flush()
+                os.fsync(f.fileno())
+            self._publish(generation, offset, rows)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(data_path)
+            raise
+        if old is not None:
+            # Readers still mapping the old generation keep it until they refresh
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._data_path(old))
+
+    def _append(self, records: Dict[str, Tuple[Dict[str, Any], bytes]]) -> None:
+        """Append records to the current data file and publish them; caller holds the lock and has refreshed."""
+        rows = {paper_id: list(self._table[row * FIELDS:(row + 1) * FIELDS])
+                for paper_id, row in self._index.items()}
+        offset = self._data_len
+        with open(self._data_path(self._generation), "r+b") as f:
+            # Drop whatever a writer that crashed before publishing left past the index
+            f.truncate(offset)
+            f.seek(offset)
+            for paper_id, (meta, text_bytes) in records.items():
+                packed, rows[paper_id] = _pack_record(offset, meta, text_bytes)
+                f.write(packed)
+                offset += len(packed)
+            f.flush()
+            os.fsync(f.fileno())
+        live = sum(_record_end(row) - row[0] for row in rows.values())
+        self._publish(self._generation, offset, rows)
+        if live < (1.0 - MAX_DEAD_FRACTION) * (offset - len(DATA_MAGIC)):
+            self._write(self._records())
+
+    @contextlib.contextmanager
+    def _writer(self):
+        """Serialize writers in this process and, where fcntl exists, across processes."""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.path + ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def write(self, entries: Iterable[Tuple[str, Dict[str, Any], str]]) -> int:
+        """
+        Replace the whole corpus with the given papers.
+
+        Args:
+            entries: (paper_id, metadata, text) tuples; text may be empty
+
+        Returns:
+            Number of papers written
+        """
+        records = {paper_id: (metadata, (text or "").encode("utf-8")) for paper_id, metadata, text in entries}
+        with self._writer():
+            self._write(records)
+        return len(records)
+
+    def compact(self) -> None:
+        """Rewrite the corpus without the dead records that updates left behind."""
+        with self._writer():
+            self._write(self._records())
+
+    def update(self, entries: Iterable[Tuple[str, Dict[str, Any], str]]) -> int:
+        """
+        Add papers or merge them into the records already stored.
+
+        Metadata keys of an entry override the stored ones, its topics are
+        added to the stored topics, and its text replaces the stored text only
+        when it is not empty. Added and changed papers are appended to the
+        data file; nothing is written if nothing changed.
+
+        Args:
+            entries: (paper_id, metadata, text) tuples; text may be empty
+
+        Returns:
+            Number of papers added or changed
+        """
+        entries = list(entries)
+        with self._writer():
+            self._refresh()
+            changed: Dict[str, Tuple[Dict[str, Any], bytes]] = {}
+            for paper_id, metadata, text in entries:
+                stored = changed.get(paper_id) or self._stored(paper_id)
+                old_meta, old_text = stored or ({}, b"")
+                meta = merge_metadata(old_meta, metadata)
+                text_bytes = text.encode("utf-8") if text else old_text
+                if stored is not None and meta == old_meta and text_bytes == old_text:
+                    continue
+                changed[paper_id] = (meta, text_bytes)
+            if changed:
+                if self._stamp is None:
+                    self._write(changed)
+                else:
+                    self._append(changed)
+            return len(changed)
+
+
+def merge_metadata(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Stored metadata updated with new keys; the topics lists are unioned in order."""
+    merged = {**old, **new}
+    topics = list(old.get("topics", []))
+    topics += [topic for topic in new.get("topics", []) if topic not in topics]
+    if topics:
+        merged["topics"] = topics
+    return merged
+
+
+def _pdf_text(pdf_path: str) -> str:
+    if not PDF_TEXT_AVAILABLE:
+        return ""
+    try:
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(pdf_path).pages)
+    except Exception as e:
+        print(f"Error extracting text from {pdf_path}: {str(e)}")
+        return ""
+
+
+def scan_directories(
+    paper_dir: str = "papers",
+    info_dir: str = "info",
+    blobs: Optional[BlobStore] = None
+) -> Dict[str, Tuple[Dict[str, Any], str]]:
+    """
+    Collect papers from the on-disk layout the research server writes.
+
+    Metadata comes from <paper_dir>/<topic>/papers_info.json, text from
+    <info_dir>/<topic>/<paper_id>.txt, falling back to the PDF text when
+    pypdf is installed. With a blob store, PDFs are also found there and
+    extracted text is cached in it, so each PDF is parsed only once.
+
+    Returns:
+        paper_id -> (metadata, text)
+    """
+    papers: Dict[str, Tuple[Dict[str, Any], str]] = {}
+    if os.path.isdir(paper_dir):
+        for topic in sorted(os.listdir(paper_dir)):
+            file_path = os.path.join(paper_dir, topic, "papers_info.json")
+            if not os.path.isfile(file_path):
+                continue
+            try:
+                with open(file_path, "r") as json_file:
+                    papers_info = json.load(json_file)
+            except json.JSONDecodeError as e:
+                print(f"Error reading {file_path}: {str(e)}")
+                continue
+            for paper_id, info in papers_info.items():
+                meta = dict(papers[paper_id][0]) if paper_id in papers else {}
+                meta.update(info)
+                meta.setdefault("topics", [])
+                if topic not in meta["topics"]:
+                    meta["topics"].append(topic)
+                papers[paper_id] = (meta, "")
+
+    if os.path.isdir(info_dir):
+        for topic in sorted(os.listdir(info_dir)):
+            topic_path = os.path.join(info_dir, topic)
+            if not os.path.isdir(topic_path):
+                continue
+            for name in sorted(os.listdir(topic_path)):
+                if not name.endswith(".txt"):
+                    continue
+                paper_id = name[:-len(".txt")]
+                with open(os.path.join(topic_path, name), "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+                meta = papers.get(paper_id, ({"topics": [topic]}, ""))[0]
+                papers[paper_id] = (meta, text)
+
+    for paper_id, (meta, text) in papers.items():
+        if text:
+            continue
+        if blobs is not None:
+            text = blobs.read_text(paper_id) or ""
+            if text:
+                papers[paper_id] = (meta, text)
+                continue
+        pdf_path = meta.get("pdf_path")
+        if not (pdf_path and os.path.isfile(pdf_path)) and blobs is not None:
+            pdf_path = blobs.path(paper_id)
+        if pdf_path and os.path.isfile(pdf_path):
+            text = _pdf_text(pdf_path)
+            if text and blobs is not None:
+                blobs.add_text(paper_id, text)
+            papers[paper_id] = (meta, text)
+    return papers
+
+
+def rebuild(
+    out_path: str = CORPUS_PATH,
+    paper_dir: str = "papers",
+    info_dir: str = "info",
+    blobs: Optional[BlobStore] = None
+) -> int:
+    """Write a fresh, compacted corpus file from the directory layout."""
+    papers = scan_directories(paper_dir, info_dir, blobs)
+    store = CorpusStore(out_path)
+    count = store.write((paper_id, meta, text) for paper_id, (meta, text) in papers.items())
+    store.close()
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Packed paper corpus")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_rebuild = sub.add_parser("rebuild", help="Import papers/ and info/ into a fresh corpus file")
+    p_rebuild.add_argument("--papers", default="papers")
+    p_rebuild.add_argument("--info", default="info")
+    p_rebuild.add_argument("--out", default=CORPUS_PATH)
+    p_rebuild.add_argument("--blobs", default=BLOB_STORE_PATH, help="Blob store with PDFs and cached text")
+
+    p_stats = sub.add_parser("stats", help="Print corpus size")
+    p_stats.add_argument("--corpus", default=CORPUS_PATH)
+
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        count = rebuild(args.out, args.papers, args.info, BlobStore(args.blobs))
+        print(f"Wrote {count} papers to {args.out}")
+    else:
+        print(json.dumps(CorpusStore(args.corpus).stats(), indent=2))
@@ -0,0 +1,150 @@
+"""
+Persistent cache of arXiv search results.
+
+search_papers used to query arXiv on every call, although agents repeat the
+same literature queries across sessions. Results are cached in SQLite, keyed
+on the normalized topic (lowercase, single spaces), max_results and sort
+order, and each entry goes through three states:
+
+    fresh   younger than ttl                 served from the cache
+    stale   up to ttl + max_stale old        served from the cache, refreshed in the background
+    expired older than that, or missing      searched again before answering
+
+The database runs in WAL mode, so several server processes can share one
+cache file and between them hit arXiv once per query and TTL.
+
+    python query_cache.py stats
+    python query_cache.py prune     # drop expired entries
+    python query_cache.py clear
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+QUERY_CACHE_PATH = os.environ.get("QUERY_CACHE_PATH", "query_cache.db")
+QUERY_CACHE_TTL = float(os.environ.get("QUERY_CACHE_TTL", 24 * 3600))
+QUERY_CACHE_MAX_STALE = float(os.environ.get("QUERY_CACHE_MAX_STALE", 7 * 24 * 3600))
+
+FRESH, STALE, EXPIRED = "fresh", "stale", "expired"
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+def cache_key(topic: str, max_results: int, sort: str) -> str:
+    return f"{normalize_topic(topic)}\x1f{max_results}\x1f{sort}"
+
+
+class CachedQuery(NamedTuple):
+    paper_ids: List[str]
+    fetched_at: float
+    state: str
+
+
+class QueryCache:
+    """Search results by query, with a TTL and a stale-while-revalidate window."""
+
+    def __init__(self, path: str = QUERY_CACHE_PATH, ttl: float = QUERY_CACHE_TTL,
+                 max_stale: float = QUERY_CACHE_MAX_STALE):
+        """
+        Args:
+            path: SQLite file (":memory:" for a process-local cache)
+            ttl: Seconds an entry is served without refreshing it (0 disables the cache)
+            max_stale: Seconds past the ttl an entry is still served while it is refreshed
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS queries (
+                key TEXT PRIMARY KEY,
+                topic TEXT NOT NULL,
+                max_results INTEGER NOT NULL,
+                sort TEXT NOT NULL,
+                paper_ids TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def state(self, fetched_at: float, now: Optional[float] = None) -> str:
+        age = (time.time() if now is None else now) - fetched_at
+        if age < self.ttl:
+            return FRESH
+        if age < self.ttl + self.max_stale:
+            return STALE
+        return EXPIRED
+
+    def get(self, topic: str, max_results: int, sort: str) -> Optional[CachedQuery]:
+        """Cached result of a query with its state, or None if it was never stored."""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT paper_ids, fetched_at FROM queries WHERE key = ?",
+                (cache_key(topic, max_results, sort),)
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedQuery(json.loads(row[0]), row[1], self.state(row[1]))
+
+    def put(self, topic: str, max_results: int, sort: str, paper_ids: List[str]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO queries VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(topic, max_results, sort), normalize_topic(topic), max_results, sort,
+                 json.dumps(paper_ids), time.time())
+            )
+            self._db.commit()
+
+    def clear(self) -> int:
+        """Drop every entry; returns how many there were."""
+        with self._lock:
+            removed = self._db.execute("DELETE FROM queries").rowcount
+            self._db.commit()
+        return removed
+
+    def prune(self) -> int:
+        """Drop entries too old to be served; returns how many were dropped."""
+        cutoff = time.time() - self.ttl - self.max_stale
+        with self._lock:
+            removed = self._db.execute("DELETE FROM queries WHERE fetched_at < ?", (cutoff,)).rowcount
+            self._db.commit()
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Number of entries in each state."""
+        with self._lock:
+            times = [row[0] for row in self._db.execute("SELECT fetched_at FROM queries")]
+        now = time.time()
+        counts = {FRESH: 0, STALE: 0, EXPIRED: 0}
+        for fetched_at in times:
+            counts[self.state(fetched_at, now)] += 1
+        return counts
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="arXiv search result cache")
+    parser.add_argument("command", choices=["stats", "prune", "clear"])
+    parser.add_argument("--cache", default=QUERY_CACHE_PATH)
+    args = parser.parse_args()
+
+    cache = QueryCache(args.cache)
+    if args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    elif args.command == "prune":
+        print(f"Removed {cache.prune()} expired queries")
+    else:
+        print(f"Removed {cache.clear()} cached queries")
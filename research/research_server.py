@@ -1,106 +1,287 @@
+import argparse
+import asyncio
 import arxiv
 import json
 import os
-from typing import List
+import time
+from typing import Dict, List, Optional
 from mcp.server.fastmcp import FastMCP
-import urllib.request
 import anthropic
 import base64
 import httpx
+import sys
+
+# metrics.py is shared with the fold server and lives at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blob_store import BLOB_STORE_PATH, BlobStore
+from corpus_store import CORPUS_PATH, CorpusStore
+from query_cache import FRESH, QUERY_CACHE_PATH, STALE, QueryCache, cache_key
+from mcp_http import serve_http
+from metrics import Registry, ToolMetrics, instrument_tool, start_http_server
 
 PAPER_DIR = "papers"
 
 # Initialize FastMCP server
 mcp = FastMCP("research")
 
-@mcp.tool()
-def search_papers(topic: str, max_results: int = 5) -> List[str]:
+# Shared across requests so a long-running server reuses its arXiv client (and its rate limiting)
+_arxiv_client = arxiv.Client()
+
+ESMFOLD_URL = os.environ.get("ESMFOLD_API_URL", "https://api.esmatlas.com/foldSequence/v1/pdb/")
+CLAUDE_MODEL = "claude-3-7-sonnet-20250219"
+ANALYSIS_SYSTEM_PROMPT = "You are a the best data scientist and researcher in the world. Your exeprtise spans life sciences, AI and protein design. Your are searching for useful information in the development and discovery of new proteins. When provided with PDF you must extract all the relevant informations for the development of new proteins." # <-- role prompt
+
+# HTTP and Anthropic clients are created on first use inside the server's event loop and then shared
+_http_client: Optional[httpx.AsyncClient] = None
+_anthropic_client: Optional[anthropic.AsyncAnthropic] = None
+
+# Packed corpus (see corpus_store.py); tools read it first and fall back to the directories
+corpus = CorpusStore(CORPUS_PATH)
+
+# PDFs are stored once by content hash (see blob_store.py); topic directories only hold manifests
+blobs = BlobStore(BLOB_STORE_PATH)
+
+# arXiv results by query (see query_cache.py); stale entries are served while they are refreshed
+query_cache = QueryCache(QUERY_CACHE_PATH)
+
+SORT_CRITERIA = {
+    "relevance": arxiv.SortCriterion.Relevance,
+    "submitted": arxiv.SortCriterion.SubmittedDate,
+    "updated": arxiv.SortCriterion.LastUpdatedDate,
+}
+
+# Metrics, scraped via get_metrics or --metrics-port
+METRICS = Registry()
+TOOL_METRICS = ToolMetrics(METRICS, "research")
+UPSTREAM_RESPONSES = METRICS.counter("research_upstream_responses_total", "HTTP responses by upstream and status", ["upstream", "status"])
+ARXIV_LATENCY = METRICS.histogram("research_arxiv_query_seconds", "arXiv search latency")
+DOWNLOAD_BYTES = METRICS.counter("research_download_bytes_total", "PDF bytes downloaded")
+DOWNLOAD_SECONDS = METRICS.counter("research_download_seconds_total", "Time spent downloading PDFs")
+DOWNLOAD_LATENCY = METRICS.histogram("research_download_seconds", "PDF download latency")
+CACHE_LOOKUPS = METRICS.counter("research_cache_lookups_total", "Lookups by cache and outcome", ["cache", "result"])
+
+
+def _collect_ratios():
+    for cache in ("pdf", "corpus", "search"):
+        # A stale search result is still answered locally
+        hits = CACHE_LOOKUPS.value(cache=cache, result="hit") + CACHE_LOOKUPS.value(cache=cache, result="stale")
+        total = hits + CACHE_LOOKUPS.value(cache=cache, result="miss")
+        yield f"research_{cache}_cache_hit_ratio", "gauge", f"Share of {cache} lookups served locally", hits / total if total else 0.0
+    seconds = DOWNLOAD_SECONDS.value()
+    yield ("research_download_throughput_bytes_per_second", "gauge", "Mean PDF download throughput",
+           DOWNLOAD_BYTES.value() / seconds if seconds else 0.0)
+
+
+METRICS.collector(_collect_ratios)
+
+# Serializes read-modify-write of each papers_info.json between overlapping searches
+_info_locks: Dict[str, asyncio.Lock] = {}
+
+# One download per paper, even when overlapping searches (different topics) return it together
+_pending_downloads: Dict[str, asyncio.Task] = {}
+
+# One arXiv query per cache key, shared by callers that miss and by background refreshes
+_pending_searches: Dict[str, asyncio.Task] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=10.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def get_anthropic_client() -> anthropic.AsyncAnthropic:
+    global _anthropic_client
+    if _anthropic_client is None:
+        _anthropic_client = anthropic.AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    return _anthropic_client
+
+
+def _load_json(file_path: str) -> dict:
+    try:
+        with open(file_path, "r") as json_file:
+            return json.load(json_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_json(file_path: str, data: dict) -> None:
+    with open(file_path, "w") as json_file:
+        json.dump(data, json_file, indent=2)
+
+
+def _encode_pdf(pdf_path: str) -> str:
+    with open(pdf_path, "rb") as f:
+        return base64.standard_b64encode(f.read()).decode("utf-8")
+
+
+async def _download_pdf(paper_id: str, pdf_url: str) -> Optional[str]:
+    """Download one PDF into the blob store; returns its path, or None if the download failed."""
+    try:
+        print(f"Downloading PDF for {paper_id}...")
+        started = time.perf_counter()
+        resp = await get_http_client().get(pdf_url)
+        elapsed = time.perf_counter() - started
+        UPSTREAM_RESPONSES.inc(upstream="arxiv_pdf", status=str(resp.status_code))
+        resp.raise_for_status()
+        DOWNLOAD_BYTES.inc(len(resp.content))
+        DOWNLOAD_SECONDS.inc(elapsed)
+        DOWNLOAD_LATENCY.observe(elapsed)
+        pdf_path = await asyncio.to_thread(blobs.add, paper_id, resp.content)
+        print(f"PDF saved to {pdf_path}")
+        return pdf_path
+    except Exception as e:
+        print(f"Error downloading PDF for {paper_id}: {str(e)}")
+        return None
+
+
+async def _fetch_pdf(paper_id: str, pdf_url: str, legacy_path: str) -> Optional[str]:
     """
-    Search for papers on arXiv based on a topic and store their information.
-    
-    Args:
-        topic: The topic to search for
-        max_results: Maximum number of results to retrieve (default: 5)
-        
-    Returns:
-        List of paper IDs found in the search
+    Blob path of a paper's PDF, downloading it only if neither the blob store
+    nor the old per-topic layout has it.
     """
+    pdf_path = await asyncio.to_thread(blobs.path, paper_id)
+    if pdf_path is None and await asyncio.to_thread(os.path.exists, legacy_path):
+        # Written by an older server; adopt it instead of downloading again
+        pdf_path = await asyncio.to_thread(blobs.add_file, paper_id, legacy_path)
+    if pdf_path is not None:
+        CACHE_LOOKUPS.inc(cache="pdf", result="hit")
+        print(f"PDF already exists at {pdf_path}")
+        return pdf_path
     
-    # Use arxiv to find the papers 
-    client = arxiv.Client()
+    CACHE_LOOKUPS.inc(cache="pdf", result="miss")
+    task = _pending_downloads.get(paper_id)
+    if task is None:
+        task = _pending_downloads[paper_id] = asyncio.ensure_future(_download_pdf(paper_id, pdf_url))
+        task.add_done_callback(lambda _: _pending_downloads.pop(paper_id, None))
+    return await asyncio.shield(task)
+
 
+async def _search_arxiv(topic: str, max_results: int, sort: str) -> List[str]:
+    """Query arXiv, store paper info and PDFs, and cache the resulting IDs."""
     # Search for the most relevant articles matching the queried topic
     search = arxiv.Search(
         query = topic,
         max_results = max_results,
-        sort_by = arxiv.SortCriterion.Relevance
+        sort_by = SORT_CRITERIA[sort]
     )
 
-    papers = client.results(search)
+    # The arxiv client is synchronous (and paginates lazily), so drain it in a worker thread
+    started = time.perf_counter()
+    papers = await asyncio.to_thread(lambda: list(_arxiv_client.results(search)))
+    ARXIV_LATENCY.observe(time.perf_counter() - started)
     
     # Create directory for this topic
     path = os.path.join(PAPER_DIR, topic.lower().replace(" ", "_"))
-    os.makedirs(path, exist_ok=True)
+    await asyncio.to_thread(os.makedirs, path, exist_ok=True)
     
     file_path = os.path.join(path, "papers_info.json")
 
-    # Try to load existing papers info
-    try:
-        with open(file_path, "r") as json_file:
-            papers_info = json.load(json_file)
-    except (FileNotFoundError, json.JSONDecodeError):
-        papers_info = {}
-
-    # Process each paper and add to papers_info  
+    # Process each paper and fetch the PDFs concurrently
     paper_ids = []
+    new_info = {}
+    fetches = {}
     for paper in papers:
         paper_id = paper.get_short_id()
         paper_ids.append(paper_id)
-        paper_info = {
+        new_info[paper_id] = {
             'title': paper.title,
             'authors': [author.name for author in paper.authors],
             'summary': paper.summary,
             'pdf_url': paper.pdf_url,
             'published': str(paper.published.date())
         }
-        papers_info[paper_id] = paper_info
         
-        # Download and save the PDF file
-        pdf_filename = f"{paper_id}.pdf"
-        pdf_path = os.path.join(path, pdf_filename)
-        if not os.path.exists(pdf_path):
-            try:
-                print(f"Downloading PDF for {paper_id}...")
-                urllib.request.urlretrieve(paper.pdf_url, pdf_path)
-                paper_info['pdf_path'] = pdf_path
-                print(f"PDF saved to {pdf_path}")
-            except Exception as e:
-                print(f"Error downloading PDF for {paper_id}: {str(e)}")
-                paper_info['pdf_path'] = None
-        else:
-            paper_info['pdf_path'] = pdf_path
-            print(f"PDF already exists at {pdf_path}")
-    
-    # Save updated papers_info to json file
-    with open(file_path, "w") as json_file:
-        json.dump(papers_info, json_file, indent=2)
+        fetches[paper_id] = _fetch_pdf(paper_id, paper.pdf_url, os.path.join(path, f"{paper_id}.pdf"))
+    
+    results = await asyncio.gather(*fetches.values())
+    for paper_id, pdf_path in zip(fetches, results):
+        new_info[paper_id]['pdf_path'] = pdf_path
+        if pdf_path:
+            new_info[paper_id]['pdf_sha256'] = BlobStore.digest_of(pdf_path)
+    
+    # Merge into the saved papers_info (other searches may be updating the same topic)
+    lock = _info_locks.setdefault(file_path, asyncio.Lock())
+    async with lock:
+        papers_info = await asyncio.to_thread(_load_json, file_path)
+        papers_info.update(new_info)
+        await asyncio.to_thread(_save_json, file_path, papers_info)
+    
+    # Keep the packed corpus current; stored text and other topics are kept, text is added by rebuilds
+    topic_dir = os.path.basename(path)
+    await asyncio.to_thread(corpus.update, [
+        (paper_id, {**info, "topics": [topic_dir]}, "") for paper_id, info in new_info.items()
+    ])
     
     print(f"Results are saved in: {file_path}")
     
+    await asyncio.to_thread(query_cache.put, topic, max_results, sort, paper_ids)
     return paper_ids
 
+
+def _refresh_search(topic: str, max_results: int, sort: str) -> asyncio.Task:
+    """The in-flight arXiv query for this cache key, starting one if there is none."""
+    key = cache_key(topic, max_results, sort)
+    task = _pending_searches.get(key)
+    if task is None:
+        task = _pending_searches[key] = asyncio.ensure_future(_search_arxiv(topic, max_results, sort))
+        task.add_done_callback(lambda _: _pending_searches.pop(key, None))
+    return task
+
+
+def _log_refresh_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background refresh of a cached search failed: {task.exception()}")
+
+
 @mcp.tool()
-def extract_info(paper_id: str) -> str:
+@instrument_tool(TOOL_METRICS, "search_papers")
+async def search_papers(topic: str, max_results: int = 5, sort: str = "relevance") -> List[str]:
     """
-    Search for information about a specific paper across all topic directories.
+    Search for papers on arXiv based on a topic and store their information.
+    
+    Results are cached per topic, max_results and sort order. A recent result
+    is returned without contacting arXiv; an older one is returned at once and
+    refreshed in the background.
     
     Args:
-        paper_id: The ID of the paper to look for
+        topic: The topic to search for
+        max_results: Maximum number of results to retrieve (default: 5)
+        sort: "relevance" (default), "submitted" or "updated"
         
     Returns:
-        JSON string with paper information if found, error message if not found
+        List of paper IDs found in the search
     """
- 
+    if sort not in SORT_CRITERIA:
+        raise ValueError(f"Unknown sort {sort!r}; use one of {', '.join(SORT_CRITERIA)}")
+    
+    cached = await asyncio.to_thread(query_cache.get, topic, max_results, sort)
+    if cached is not None and cached.state == FRESH:
+        CACHE_LOOKUPS.inc(cache="search", result="hit")
+        return cached.paper_ids
+    if cached is not None and cached.state == STALE:
+        CACHE_LOOKUPS.inc(cache="search", result="stale")
+        _refresh_search(topic, max_results, sort).add_done_callback(_log_refresh_failure)
+        return cached.paper_ids
+    
+    CACHE_LOOKUPS.inc(cache="search", result="miss")
+    return await asyncio.shield(_refresh_search(topic, max_results, sort))
+
+
+def _find_paper_info(paper_id: str) -> Optional[dict]:
     for item in os.listdir(PAPER_DIR):
         item_path = os.path.join(PAPER_DIR, item)
         if os.path.isdir(item_path):
@@ -110,37 +291,72 @@ def extract_info(paper_id: str) -> str:
                     with open(file_path, "r") as json_file:
                         papers_info = json.load(json_file)
                         if paper_id in papers_info:
-                            return json.dumps(papers_info[paper_id], indent=2)
+                            return papers_info[paper_id]
                 except (FileNotFoundError, json.JSONDecodeError) as e:
                     print(f"Error reading {file_path}: {str(e)}")
                     continue
+    return None
+
+
+@mcp.tool()
+@instrument_tool(TOOL_METRICS, "extract_info")
+async def extract_info(paper_id: str) -> str:
+    """
+    Search for information about a specific paper across all topic directories.
+    
+    Args:
+        paper_id: The ID of the paper to look for
+        
+    Returns:
+        JSON string with paper information if found, error message if not found
+    """
+    info = corpus.metadata(paper_id)
+    CACHE_LOOKUPS.inc(cache="corpus", result="miss" if info is None else "hit")
+    if info is None:
+        info = await asyncio.to_thread(_find_paper_info, paper_id)
+    if info is not None:
+        return json.dumps(info, indent=2)
     
     return f"There's no saved information related to paper {paper_id}."
 
 
 @mcp.tool()
-def analyze_paper_with_claude(paper_id: str='2409.12922v1', question: str = "What are the key findings in this paper?") -> str:
+@instrument_tool(TOOL_METRICS, "read_paper_text")
+def read_paper_text(paper_id: str, chunk: Optional[int] = None) -> str:
     """
-    Analyze a paper using Claude AI. This function takes a paper ID, loads the PDF,
-    and asks Claude to analyze it based on the provided question.
+    Read a paper's extracted text from the packed corpus.
     
     Args:
-        paper_id: The ID of the paper to analyze
-        question: The question to ask Claude about the paper (default: "What are the key findings in this paper?")
+        paper_id: The ID of the paper to read
+        chunk: 0-based chunk number to return (default: the whole text)
         
     Returns:
-        Claude's analysis of the paper
+        The requested text, prefixed with the chunk position when chunk is given
     """
-    # Find the paper's PDF file
-    pdf_path = None
+    n_chunks = corpus.n_chunks(paper_id)
+    if n_chunks == 0:
+        return f"There's no stored text for paper {paper_id}."
+    if chunk is None:
+        return corpus.text(paper_id)
+    text = corpus.chunk(paper_id, chunk)
+    if text is None:
+        return f"Chunk {chunk} is out of range; paper {paper_id} has {n_chunks} chunks."
+    return f"[chunk {chunk % n_chunks + 1}/{n_chunks}]\n{text}"
+
+
+def _find_pdf_path(paper_id: str) -> Optional[str]:
+    pdf_path = blobs.path(paper_id)
+    if pdf_path is not None:
+        return pdf_path
+    
+    # Fall back to the old per-topic layout
     for item in os.listdir(PAPER_DIR):
         item_path = os.path.join(PAPER_DIR, item)
         if os.path.isdir(item_path):
             # Check if the PDF exists in this topic directory
             potential_pdf_path = os.path.join(item_path, f"{paper_id}.pdf")
             if os.path.isfile(potential_pdf_path):
-                pdf_path = potential_pdf_path
-                break
+                return potential_pdf_path
                 
             # Also check the papers_info.json to find the stored pdf_path
             file_path = os.path.join(item_path, "papers_info.json")
@@ -148,31 +364,45 @@ def analyze_paper_with_claude(paper_id: str='2409.12922v1', question: str = "Wha
                 try:
                     with open(file_path, "r") as json_file:
                         papers_info = json.load(json_file)
-                        if paper_id in papers_info and "pdf_path" in papers_info[paper_id]:
+                        if paper_id in papers_info and papers_info[paper_id].get("pdf_path"):
                             stored_pdf_path = papers_info[paper_id]["pdf_path"]
                             if os.path.isfile(stored_pdf_path):
-                                pdf_path = stored_pdf_path
-                                break
+                                return stored_pdf_path
                 except (FileNotFoundError, json.JSONDecodeError) as e:
                     print(f"Error reading {file_path}: {str(e)}")
                     continue
+    return None
+
+
+@mcp.tool()
+@instrument_tool(TOOL_METRICS, "analyze_paper_with_claude")
+async def analyze_paper_with_claude(paper_id: str='2409.12922v1', question: str = "What are the key findings in this paper?") -> str:
+    """
+    Analyze a paper using Claude AI. This function takes a paper ID, loads the PDF,
+    and asks Claude to analyze it based on the provided question.
+    
+    Args:
+        paper_id: The ID of the paper to analyze
+        question: The question to ask Claude about the paper (default: "What are the key findings in this paper?")
+        
+    Returns:
+        Claude's analysis of the paper
+    """
+    # Find the paper's PDF file
+    pdf_path = await asyncio.to_thread(_find_pdf_path, paper_id)
     
     if not pdf_path:
         return f"Could not find PDF file for paper {paper_id}. Please make sure the paper has been downloaded."
     
     try:
-        # Load and encode the PDF file
-        with open(pdf_path, "rb") as f:
-            pdf_data = base64.standard_b64encode(f.read()).decode("utf-8")
-
-        # Initialize Anthropic client and get API key from environment variable
-        client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        # Load and encode the PDF file off the event loop
+        pdf_data = await asyncio.to_thread(_encode_pdf, pdf_path)
         
         # Send the PDF to Claude for analysis
-        response = client.messages.create(
-            model="claude-3-7-sonnet-20250219",
+        response = await get_anthropic_client().messages.create(
+            model=CLAUDE_MODEL,
             max_tokens=512, # 8192,
-            system="You are a the best data scientist and researcher in the world. Your exeprtise spans life sciences, AI and protein design. Your are searching for useful information in the development and discovery of new proteins. When provided with PDF you must extract all the relevant informations for the development of new proteins.", # <-- role prompt
+            system=ANALYSIS_SYSTEM_PROMPT,
             messages=[
                 {
                     "role": "user",
@@ -193,23 +423,36 @@ def analyze_paper_with_claude(paper_id: str='2409.12922v1', question: str = "Wha
                 }
             ],
         )
-        return  response.content
+        UPSTREAM_RESPONSES.inc(upstream="anthropic", status="200")
+        return "".join(block.text for block in response.content if block.type == "text")
     except Exception as e:
+        if isinstance(e, anthropic.APIError):
+            UPSTREAM_RESPONSES.inc(upstream="anthropic", status=str(getattr(e, "status_code", None) or "error"))
         return f"Error analyzing paper: {str(e)}"
 
 @mcp.tool()
-def fold_sequence(sequence: str) -> str:
+@instrument_tool(TOOL_METRICS, "fold_sequence")
+async def fold_sequence(sequence: str) -> str:
     """
     Submits a raw amino-acid sequence to the ESMFold API and returns the PDB text.
     """
-    url = "https://api.esmatlas.com/foldSequence/v1/pdb/"
-    resp = requests.post(url, data=sequence, headers={"Content-Type":"text/plain"})
+    resp = await get_http_client().post(ESMFOLD_URL, content=sequence, headers={"Content-Type":"text/plain"})
+    UPSTREAM_RESPONSES.inc(upstream="esmfold", status=str(resp.status_code))
     if resp.status_code != 200:
         print("Status:", resp.status_code)
         print("Body:", resp.text)
     resp.raise_for_status()
     return resp.text
 
+@mcp.tool()
+def get_metrics() -> str:
+    """
+    Returns the server's metrics in Prometheus text format: per-tool request
+    counts, latency histograms and in-flight calls, upstream status codes,
+    PDF download volume and throughput, and cache hit ratios.
+    """
+    return METRICS.render()
+
 # Initialize Anthropic client with API key from .env if present
 try:
     from dotenv import load_dotenv
@@ -218,5 +461,26 @@ except ImportError:
     pass  # dotenv module not installed, will use environment variables directly
 
 if __name__ == "__main__":
-    # Initialize and run the server
-    mcp.run(transport='stdio')
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Research MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http", "sse"], default="stdio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent tool calls (HTTP transports)")
+    parser.add_argument("--drain-timeout", type=float, default=30.0,
+                        help="Seconds to let in-flight requests finish on shutdown")
+    parser.add_argument("--stateless", action="store_true",
+                        help="Stateless streamable HTTP (no per-client session state)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on http://127.0.0.1:<port>/metrics")
+    args = parser.parse_args()
+
+    if args.metrics_port:
+        start_http_server(METRICS, args.metrics_port)
+
+    if args.transport == "stdio":
+        # Initialize and run the server
+        mcp.run(transport='stdio')
+    else:
+        mcp.settings.stateless_http = args.stateless
+        serve_http(mcp, args.transport, args.host, args.port, args.workers, args.drain_timeout,
+                   "Research server", on_shutdown=close_http_client)
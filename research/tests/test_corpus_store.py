@@ -0,0 +1,100 @@
+import json
+import os
+
+from corpus_store import CorpusStore, rebuild
+
+PAPER_ID = "2405.01983v1"
+SEARCH_INFO = {"title": "Stapled peptides", "summary": "Short abstract.", "pdf_url": "https://arxiv.org/pdf/2405.01983v1"}
+
+
+def _write_layout(root, text):
+    for topic in ("stapled_peptides", "mdm2_binders"):
+        os.makedirs(os.path.join(root, "papers", topic))
+        with open(os.path.join(root, "papers", topic, "papers_info.json"), "w") as f:
+            json.dump({PAPER_ID: SEARCH_INFO}, f)
+    os.makedirs(os.path.join(root, "info", "stapled_peptides"))
+    with open(os.path.join(root, "info", "stapled_peptides", f"{PAPER_ID}.txt"), "w") as f:
+        f.write(text)
+
+
+def _search(store, topic):
+    # What search_papers records for every paper it returns
+    return store.update([(PAPER_ID, {**SEARCH_INFO, "topics": [topic]}, "")])
+
+
+def test_search_after_rebuild_keeps_text_chunks_and_topics(tmp_path):
+    text = "\n\n".join(f"Paragraph {i}. " + "helix " * 60 for i in range(10))
+    _write_layout(tmp_path, text)
+    path = str(tmp_path / "corpus.pack")
+    store = CorpusStore(path)
+
+    assert _search(store, "stapled_peptides") == 1
+    assert store.text(PAPER_ID) == ""
+
+    rebuild(path, str(tmp_path / "papers"), str(tmp_path / "info"))
+    n_chunks = store.n_chunks(PAPER_ID)
+    assert store.text(PAPER_ID) == text
+    assert n_chunks >= 2
+
+    size = os.path.getsize(path)
+    assert _search(store, "stapled_peptides") == 0
+    assert os.path.getsize(path) == size
+    assert store.text(PAPER_ID) == text
+    assert store.n_chunks(PAPER_ID) == n_chunks
+    assert sorted(store.metadata(PAPER_ID)["topics"]) == ["mdm2_binders", "stapled_peptides"]
+
+
+def test_update_merges_topics_and_metadata(tmp_path):
+    store = CorpusStore(str(tmp_path / "corpus.pack"))
+    store.update([("a", {"title": "A", "topics": ["x"]}, "some text")])
+    assert store.update([("a", {"title": "A2", "topics": ["y"]}, "")]) == 1
+    assert store.metadata("a") == {"title": "A2", "topics": ["x", "y"]}
+    assert store.text("a") == "some text"
+    assert store.stats()["records"] == 1
+
+
+def test_readers_keep_a_consistent_view_across_writes(tmp_path):
+    path = str(tmp_path / "corpus.pack")
+    writer, reader = CorpusStore(path), CorpusStore(path)
+    writer.update([("a", {"topics": ["x"]}, "first")])
+    view = reader.text_view("a")
+    writer.update([("b", {"topics": ["x"]}, "second")])
+    # The old mapping stays valid; the next read sees the new file
+    assert str(view, "utf-8") == "first"
+    view.release()
+    assert reader.text("b") == "second"
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_updates_append_without_rewriting_published_records(tmp_path):
+    path = str(tmp_path / "corpus.pack")
+    store = CorpusStore(path)
+    store.update([("a", {"topics": ["x"]}, "first " * 200)])
+    data_path = f"{path}.1.data"
+    with open(data_path, "rb") as f:
+        published = f.read()
+
+    assert store.update([("b", {"topics": ["x"]}, "second")]) == 1
+    with open(data_path, "rb") as f:
+        assert f.read().startswith(published)
+    assert store.stats()["generation"] == 1
+    assert store.ids() == ["a", "b"]
+    assert store.text("a") == "first " * 200
+
+
+def test_dead_records_are_compacted_into_a_new_generation(tmp_path):
+    path = str(tmp_path / "corpus.pack")
+    store = CorpusStore(path)
+    store.update([("a", {"topics": ["x"]}, "text " * 500), ("b", {"topics": ["x"]}, "other")])
+    store.update([("a", {"topics": ["y"]}, "")])
+    assert store.stats()["generation"] == 1
+    assert store.stats()["dead_bytes"] > 0
+
+    # Replacing the large text again leaves more than half of the data file dead
+    store.update([("a", {}, "new " * 500)])
+    stats = store.stats()
+    assert (stats["generation"], stats["dead_bytes"], stats["papers"]) == (2, 0, 2)
+    assert not os.path.exists(f"{path}.1.data")
+    assert store.metadata("a") == {"topics": ["x", "y"]}
+    assert store.text("a") == "new " * 500
+    assert store.text("b") == "other"
@@ -0,0 +1,222 @@
+"""
+Retrieval of local literature digests for the planning prompt.
+
+The research server leaves paper metadata in research/papers/<topic>/papers_info.json
+and curated design notes in research/info/<topic>/<paper_id>.txt. DigestIndex
+turns each paper into a short extractive digest (title plus the sentences
+closest to the paper's own term centroid, no LLM involved), caches digests
+and term counts in a JSON file keyed by a hash of the sources, and ranks
+papers against a prompt with BM25. Only papers whose sources changed are
+re-digested, so a session pays for a JSON load and a few dot products.
+
+pack() then fills a strict token budget with the best digests, so the
+planning prompt carries literature without extra tool round trips.
+"""
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PAPER_DIR = os.path.join(HERE, "research", "papers")
+DEFAULT_INFO_DIR = os.path.join(HERE, "research", "info")
+DEFAULT_CACHE_PATH = os.path.join(HERE, "research", "digests.json")
+
+DIGEST_TOKENS = 160
+CHARS_PER_TOKEN = 4
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9\-]+")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n{2,}|\n(?=[#*\-\d])")
+_STOPWORDS = frozenset("""
+    a an and are as at be been by can for from has have in into is it its of on or our that the their
+    these this to was we were which with will would i you your not but also more most than such using
+    used use based between each other both well may one two three new all any only over via
+""".split())
+
+
+def estimate_tokens(text: str) -> int:
+    """Conservative token estimate (about four characters per token)."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def extract_digest(title: str, text: str, max_tokens: int = DIGEST_TOKENS) -> str:
+    """
+    Extractive digest: the sentences whose terms are most typical of the whole
+    text, kept in their original order, within max_tokens.
+    """
+    sentences = []
+    for raw in _SENTENCE.split(text):
+        sentence = " ".join(raw.replace("*", "").replace("#", "").split())
+        if len(sentence) >= 40 and not sentence.startswith("```"):
+            sentences.append(sentence)
+    if not sentences:
+        return title
+    centroid = Counter(tokenize(text))
+    norm = math.sqrt(sum(v * v for v in centroid.values())) or 1.0
+
+    def salience(sentence: str) -> float:
+        terms = Counter(tokenize(sentence))
+        length = math.sqrt(sum(v * v for v in terms.values())) or 1.0
+        return sum(centroid[t] * n for t, n in terms.items()) / (norm * length)
+
+    ranked = sorted(range(len(sentences)), key=lambda i: -salience(sentences[i]))
+    budget = max_tokens - estimate_tokens(title) - 2
+    chosen = []
+    for i in ranked:
+        cost = estimate_tokens(sentences[i]) + 1
+        if cost <= budget:
+            chosen.append(i)
+            budget -= cost
+    body = " ".join(sentences[i] for i in sorted(chosen))
+    return f"{title}: {body}" if title else body
+
+
+def _read_sources(paper_dir: str, info_dir: str) -> Dict[str, Dict[str, str]]:
+    """paper_id -> {"title", "text"} from the topic manifests and note files."""
+    papers: Dict[str, Dict[str, str]] = {}
+    if os.path.isdir(paper_dir):
+        for topic in sorted(os.listdir(paper_dir)):
+            manifest = os.path.join(paper_dir, topic, "papers_info.json")
+            if not os.path.isfile(manifest):
+                continue
+            try:
+                with open(manifest, "r") as f:
+                    info = json.load(f)
+            except json.JSONDecodeError:
+                continue
+            for paper_id, meta in info.items():
+                entry = papers.setdefault(paper_id, {"title": "", "text": ""})
+                entry["title"] = entry["title"] or " ".join(meta.get("title", "").split())
+                if meta.get("summary") and meta["summary"] not in entry["text"]:
+                    entry["text"] += meta["summary"] + "\n\n"
+    if os.path.isdir(info_dir):
+        for topic in sorted(os.listdir(info_dir)):
+            topic_path = os.path.join(info_dir, topic)
+            if not os.path.isdir(topic_path):
+                continue
+            for name in sorted(os.listdir(topic_path)):
+                if not name.endswith(".txt"):
+                    continue
+                with open(os.path.join(topic_path, name), "r", encoding="utf-8", errors="replace") as f:
+                    note = f.read()
+                entry = papers.setdefault(name[:-len(".txt")], {"title": "", "text": ""})
+                entry["text"] += note + "\n\n"
+    return papers
+
+
+class DigestIndex:
+    """Cached per-paper digests ranked against a query with BM25."""
+
+    def __init__(
+        self,
+        paper_dir: str = DEFAULT_PAPER_DIR,
+        info_dir: str = DEFAULT_INFO_DIR,
+        cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+        digest_tokens: int = DIGEST_TOKENS
+    ):
+        """
+        Args:
+            paper_dir: Topic directories with papers_info.json manifests
+            info_dir: Topic directories with <paper_id>.txt notes
+            cache_path: JSON file digests are cached in (None = no cache)
+            digest_tokens: Token budget of one digest
+        """
+        self.paper_dir = paper_dir
+        self.info_dir = info_dir
+        self.cache_path = cache_path
+        self.digest_tokens = digest_tokens
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = {}
+        self._idf: Dict[str, float] = {}
+        self._avg_length = 1.0
+        self.refresh()
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, "r") as f:
+                cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return cache.get("papers", {}) if cache.get("digest_tokens") == self.digest_tokens else {}
+
+    def refresh(self) -> int:
+        """Digest new or changed papers and drop removed ones; returns how many were (re)digested."""
+        sources = _read_sources(self.paper_dir, self.info_dir)
+        cached = self._load_cache()
+        entries, computed = {}, 0
+        for paper_id, source in sources.items():
+            key = hashlib.sha1((source["title"] + "\0" + source["text"]).encode("utf-8")).hexdigest()
+            entry = cached.get(paper_id)
+            if not entry or entry.get("source_key") != key:
+                terms = Counter(tokenize(source["title"] + " " + source["text"]))
+                entry = {
+                    "source_key": key,
+                    "title": source["title"],
+                    "digest": extract_digest(source["title"], source["text"], self.digest_tokens),
+                    "terms": dict(terms),
+                    "length": sum(terms.values()),
+                }
+                computed += 1
+            entries[paper_id] = entry
+
+        with self._lock:
+            self.entries = entries
+            n = max(len(entries), 1)
+            df = Counter(term for entry in entries.values() for term in entry["terms"])
+            self._idf = {t: math.log(1.0 + (n - d + 0.5) / (d + 0.5)) for t, d in df.items()}
+            self._avg_length = sum(e["length"] for e in entries.values()) / n or 1.0
+
+        if self.cache_path and (computed or len(entries) != len(cached)):
+            tmp = self.cache_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"digest_tokens": self.digest_tokens, "papers": entries}, f)
+            os.replace(tmp, self.cache_path)
+        return computed
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top-k (paper_id, BM25 score) for the query, best first; zero scores are dropped."""
+        terms = set(tokenize(query))
+        scores = []
+        with self._lock:
+            for paper_id, entry in self.entries.items():
+                tf, length = entry["terms"], entry["length"]
+                score = 0.0
+                for term in terms:
+                    f = tf.get(term)
+                    if f:
+                        score += self._idf[term] * f * (BM25_K1 + 1) / (
+                            f + BM25_K1 * (1 - BM25_B + BM25_B * length / self._avg_length))
+                if score > 0:
+                    scores.append((paper_id, score))
+        scores.sort(key=lambda item: -item[1])
+        return scores[:k]
+
+    def pack(self, query: str, token_budget: int, header: str = "Relevant notes from the local literature corpus:") -> str:
+        """
+        The most relevant digests, formatted as one prompt block of at most
+        token_budget tokens (estimated). Digests that do not fit are skipped in
+        favour of shorter, lower-ranked ones. Returns "" if nothing fits.
+        """
+        budget = token_budget - estimate_tokens(header) - 1
+        lines = []
+        for paper_id, _ in self.search(query, k=len(self.entries)):
+            line = f"- [{paper_id}] {self.entries[paper_id]['digest']}"
+            cost = estimate_tokens(line) + 1
+            if cost <= budget:
+                lines.append(line)
+                budget -= cost
+            if budget < 16:
+                break
+        return "\n".join([header] + lines) if lines else ""
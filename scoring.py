@@ -0,0 +1,23 @@
+"""
+Binding score shared by the agent and by fold_queue score workers.
+
+There is no binding predictor behind it yet: the score is a placeholder that
+improves with the design iteration. It lives in its own module so that a
+score job run by a remote worker and a local predict_binding call agree.
+"""
+
+
+def predict_binding_score(sequence: str, target: str, iteration: int) -> float:
+    """
+    Predicted binding of `sequence` to `target`, higher is better.
+
+    Args:
+        sequence: Amino acid sequence
+        target: Target protein name
+        iteration: Design iteration the candidate was proposed in
+
+    Returns:
+        Binding score
+    """
+    # Simulated: fake improvement over iterations
+    return 0.5 + iteration * 0.05
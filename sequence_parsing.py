@@ -0,0 +1,196 @@
+"""
+Candidate sequence extraction from LLM output.
+
+The planning call normally returns candidates through the propose_sequences
+tool (a JSON schema), so no parsing is needed. When the model answers in free
+text instead, extract_sequences recovers sequences from FASTA records, code
+blocks, or inline "Sequence 1: ..." style lines in a single pass, and
+StreamingSequenceParser does the same incrementally over a token stream.
+"""
+import re
+from typing import Any, Dict, Iterable, List
+
+VALID_AA = "ACDEFGHIKLMNPQRSTVWY"
+MIN_SEQUENCE_LENGTH = 10
+
+# Tool definition the planning call offers so candidates come back as JSON
+PROPOSE_SEQUENCES_TOOL = {
+    "name": "propose_sequences",
+    "description": (
+        "Submit candidate protein sequences for folding and scoring. Use standard "
+        "one-letter amino-acid codes (ACDEFGHIKLMNPQRSTVWY) only."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "sequences": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "sequence": {"type": "string", "description": "Amino acid sequence"},
+                        "rationale": {"type": "string", "description": "Short design rationale"}
+                    },
+                    "required": ["sequence"]
+                }
+            }
+        },
+        "required": ["sequences"]
+    }
+}
+
+# A run of residue letters; X (staple / non-natural placeholder) is tolerated and dropped later
+_RUN = re.compile(r"[ACDEFGHIKLMNPQRSTVWYX]+")
+_STRIP = str.maketrans("", "", "X")
+# A line that is only a sequence, optionally after a list marker ("2.", "- ") and/or a
+# short label ending in ":", " -" or " –" ("**Sequence 1:**", "Sequence 1 - "). The
+# label and the sequence may be wrapped in markdown emphasis or inline code, and the
+# sequence may be split into space-separated blocks.
+_SEQUENCE_LINE = re.compile(
+    r"(?:[-*+]\s+|\d+[.)]\s*)?"
+    r"(?:[*_]*[^:*_`]{1,40}?[*_]*\s*(?::|\s[-–]|–)[*_]*\s*)?"
+    r"[*_`]*([ACDEFGHIKLMNPQRSTVWYX]+(?:\s+[ACDEFGHIKLMNPQRSTVWYX]+)*)[*_`]*[.,;]?"
+)
+# Space-separated blocks are joined only when every block but the last is this long,
+# so all-caps words ("A CAT") never combine into a sequence
+MIN_BLOCK_LENGTH = 5
+# The one-letter alphabet itself (echoed from the prompt), never a candidate
+ALPHABET = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def clean_sequence(raw: str) -> str:
+    """Upper-case a sequence and drop every character that is not a standard residue."""
+    return "".join(c for c in raw.upper() if c in VALID_AA)
+
+
+def _dedupe(sequences: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(sequences))
+
+
+class StreamingSequenceParser:
+    """
+    Incremental version of extract_sequences for token streams.
+
+    Feed text chunks as they arrive; each call returns the sequences that
+    became complete with that chunk. A bare sequence is complete at the end
+    of its line, a FASTA record when the next header or a non-sequence line
+    starts. Call close() at the end of the stream to flush the last record.
+    """
+
+    def __init__(self, min_length: int = MIN_SEQUENCE_LENGTH):
+        self.min_length = min_length
+        self._buffer = ""
+        self._fasta_parts: List[str] = []
+        self._in_fasta = False
+        self._in_code = False
+        self._seen = set()
+
+    def _emit(self, seq: str, out: List[str]) -> None:
+        seq = seq.translate(_STRIP)
+        if len(seq) >= self.min_length and seq != ALPHABET and seq not in self._seen:
+            self._seen.add(seq)
+            out.append(seq)
+
+    def _flush_fasta(self, out: List[str]) -> None:
+        if self._fasta_parts:
+            self._emit("".join(self._fasta_parts), out)
+        self._fasta_parts = []
+
+    def _line(self, raw_line: str, out: List[str]) -> None:
+        line = raw_line.strip()
+        if line.startswith("```"):
+            self._flush_fasta(out)
+            self._in_fasta = False
+            self._in_code = not self._in_code
+            return
+        if line.startswith(">"):
+            self._flush_fasta(out)
+            self._in_fasta = True
+            return
+        if self._in_fasta:
+            compact = line.replace(" ", "")
+            if compact and _RUN.fullmatch(compact):
+                self._fasta_parts.append(compact)
+                return
+            self._flush_fasta(out)
+            self._in_fasta = False
+        if not self._in_code:
+            # In prose, only a line that is nothing but a sequence counts
+            match = _SEQUENCE_LINE.fullmatch(line)
+            if match:
+                blocks = match.group(1).split()
+                if all(len(block) >= MIN_BLOCK_LENGTH for block in blocks[:-1]):
+                    self._emit("".join(blocks), out)
+            return
+        for match in _RUN.finditer(line):
+            start, end = match.span()
+            # Skip runs glued to other letters: they are parts of words
+            if (start > 0 and line[start - 1].isalpha()) or (end < len(line) and line[end].isalpha()):
+                continue
+            self._emit(match.group(), out)
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Consume a chunk of streamed text.
+
+        Returns:
+            Sequences completed by this chunk, in order of appearance
+        """
+        out: List[str] = []
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            self._line(line, out)
+        return out
+
+    def close(self) -> List[str]:
+        """Flush whatever is left at the end of the stream."""
+        out: List[str] = []
+        if self._buffer:
+            self._line(self._buffer, out)
+            self._buffer = ""
+        self._flush_fasta(out)
+        self._in_fasta = False
+        self._in_code = False
+        return out
+
+
+def extract_sequences(text: str, min_length: int = MIN_SEQUENCE_LENGTH) -> List[str]:
+    """
+    Recover candidate sequences from free-text LLM output.
+
+    FASTA records (">" header followed by one or more sequence lines) are
+    joined across line breaks. Inside ``` code blocks, every standalone run
+    of residue letters of at least min_length is a sequence. Elsewhere a
+    line must be nothing but the sequence (possibly in space-separated
+    blocks), optionally after a short label ("Sequence 1: ...",
+    "**Sequence 1:** ...", "Sequence 1 - ...", "2. ...", "- ..."); runs
+    inside ordinary prose, such
+    as the residue alphabet quoted back from the prompt, are ignored, and
+    the bare alphabet ACDEFGHIKLMNPQRSTVWY is never a candidate.
+
+    Args:
+        text: LLM response text
+        min_length: Shortest accepted sequence
+
+    Returns:
+        Unique sequences in order of appearance
+    """
+    parser = StreamingSequenceParser(min_length)
+    return parser.feed(text) + parser.close()
+
+
+def sequences_from_tool_input(tool_input: Dict[str, Any], min_length: int = MIN_SEQUENCE_LENGTH) -> List[str]:
+    """
+    Read sequences from a propose_sequences tool call.
+
+    Accepts both the schema form ({"sequences": [{"sequence": ...}]}) and a
+    bare list of strings, which models occasionally send.
+    """
+    sequences = []
+    for item in tool_input.get("sequences", []) or []:
+        raw = item.get("sequence", "") if isinstance(item, dict) else str(item)
+        seq = clean_sequence(raw)
+        if len(seq) >= min_length:
+            sequences.append(seq)
+    return _dedupe(sequences)
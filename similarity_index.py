@@ -0,0 +1,218 @@
+"""
+MinHash / LSH index of already-folded sequences.
+
+Each sequence is reduced to the set of its overlapping k-mers, and a MinHash
+signature of `num_perm` 32-bit values estimates the Jaccard similarity
+between two such sets. Signatures are split into `bands` bands; sequences
+sharing any band land in the same bucket, so a query only looks at a handful
+of candidates instead of every folded sequence.
+
+With k = 3, a single substitution in a 50-mer changes 3 of 48 k-mers
+(Jaccard ~0.88), which the default 16 x 4 banding finds with probability
+~1, while unrelated sequences (Jaccard < 0.2) almost never collide.
+
+The index can be persisted to SQLite next to the fold results it points to,
+so a new session starts with every previous fold already indexed.
+"""
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from mutagenesis import AMINO_ACIDS, BYTE_TO_INDEX
+
+DEFAULT_K = 3
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_ALPHABET = len(AMINO_ACIDS) + 1
+
+
+def kmer_codes(sequence: str, k: int = DEFAULT_K) -> np.ndarray:
+    """Integer code of every overlapping k-mer (non-standard residues share one code)."""
+    codes = BYTE_TO_INDEX[np.frombuffer(sequence.encode("ascii", "replace"), dtype=np.uint8)].astype(np.uint64)
+    codes[codes == 255] = len(AMINO_ACIDS)
+    if len(codes) < k:
+        # Short sequences hash as a single padded shingle
+        codes = np.concatenate([codes, np.full(k - len(codes), len(AMINO_ACIDS), dtype=np.uint64)])
+    windows = np.lib.stride_tricks.sliding_window_view(codes, k)
+    weights = np.uint64(_ALPHABET) ** np.arange(k, dtype=np.uint64)
+    return np.unique(windows @ weights)
+
+
+class MinHasher:
+    """Universal-hash family shared by every signature of an index."""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, k: int = DEFAULT_K, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.k = k
+        self.num_perm = num_perm
+        # Keep a, b below 2^30 so a * x + b stays inside uint64 for x < 2^32
+        self._a = rng.integers(1, 1 << 30, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 30, size=num_perm, dtype=np.uint64)
+
+    def signature(self, sequence: str) -> np.ndarray:
+        """MinHash signature, uint32 of shape (num_perm,)."""
+        x = kmer_codes(sequence, self.k)
+        hashed = ((self._a[:, None] * x[None, :] + self._b[:, None]) % _MERSENNE) & _MAX_HASH
+        return hashed.min(axis=1).astype(np.uint32)
+
+
+class SimilarityIndex:
+    """
+    Nearest already-folded sequences by estimated k-mer Jaccard similarity.
+
+    Every indexed sequence can carry a payload (the folded PDB and its mean
+    pLDDT), which is what the provisional-fold mode hands back for a near
+    neighbour. Persisted indexes keep payloads in SQLite only, so memory holds
+    just the signatures.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        k: int = DEFAULT_K,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int = DEFAULT_BANDS,
+        seed: int = 1
+    ):
+        """
+        Args:
+            path: SQLite file to persist signatures and structures in (None = memory only)
+            k: k-mer length
+            num_perm: MinHash signature length
+            bands: LSH bands; num_perm must be divisible by bands
+            seed: Seed of the hash family (must match across sessions sharing a file)
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+        self.path = path
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = MinHasher(num_perm, k, seed)
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}
+        self._sequences: List[str] = []
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._count = 0
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+        self._payloads: Dict[str, Dict[str, Any]] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS folds (
+                    sequence TEXT PRIMARY KEY,
+                    signature BLOB NOT NULL,
+                    pdb_text TEXT,
+                    plddt REAL
+                )
+            """)
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            params = f"{k}:{num_perm}:{seed}"
+            stored = self._db.execute("SELECT value FROM meta WHERE key = 'params'").fetchone()
+            if stored and stored[0] != params:
+                # Signatures from another hash family are meaningless here; recompute them
+                rows = self._db.execute("SELECT sequence, pdb_text, plddt FROM folds").fetchall()
+                self._db.execute("DELETE FROM folds")
+                self._db.commit()
+                for sequence, pdb_text, plddt in rows:
+                    self.add(sequence, pdb_text, plddt)
+            else:
+                # Structures stay on disk and are read back by structure() on demand
+                for sequence, blob in self._db.execute("SELECT sequence, signature FROM folds"):
+                    self._insert(sequence, np.frombuffer(blob, dtype=np.uint32), None)
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('params', ?)", (params,))
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, sequence: str) -> bool:
+        return sequence in self._ids
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+    def _insert(self, sequence: str, signature: np.ndarray, payload: Optional[Dict[str, Any]]) -> None:
+        if sequence in self._ids:
+            if payload:
+                self._payloads[sequence] = payload
+            return
+        if self._count == len(self._signatures):
+            grown = np.zeros((max(2 * self._count, 256), self._signatures.shape[1]), dtype=np.uint32)
+            grown[:self._count] = self._signatures[:self._count]
+            self._signatures = grown
+        idx = self._count
+        self._signatures[idx] = signature
+        self._sequences.append(sequence)
+        self._ids[sequence] = idx
+        self._count += 1
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band][key].append(idx)
+        if payload:
+            self._payloads[sequence] = payload
+
+    def add(self, sequence: str, pdb_text: Optional[str] = None, plddt: Optional[float] = None) -> None:
+        """Index a folded sequence, optionally with its structure."""
+        signature = self.hasher.signature(sequence)
+        payload = {"pdb_text": pdb_text, "plddt": plddt} if pdb_text else None
+        with self._lock:
+            self._insert(sequence, signature, payload if self._db is None else None)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT INTO folds VALUES (?, ?, ?, ?) ON CONFLICT(sequence) DO UPDATE SET "
+                    "pdb_text = COALESCE(excluded.pdb_text, pdb_text), plddt = COALESCE(excluded.plddt, plddt)",
+                    (sequence, signature.tobytes(), pdb_text, plddt)
+                )
+                self._db.commit()
+
+    def nearest(self, sequence: str, n: int = 5, min_similarity: float = 0.0) -> List[Tuple[str, float]]:
+        """
+        Closest indexed sequences.
+
+        Args:
+            sequence: Query sequence
+            n: Maximum number of neighbours
+            min_similarity: Drop neighbours below this estimated Jaccard similarity
+
+        Returns:
+            (sequence, similarity) pairs, most similar first; an exact match has similarity 1.0
+        """
+        signature = self.hasher.signature(sequence)
+        with self._lock:
+            candidates = set()
+            for band, key in enumerate(self._band_keys(signature)):
+                candidates.update(self._buckets[band].get(key, ()))
+            if not candidates:
+                return []
+            idx = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarity = (self._signatures[idx] == signature).mean(axis=1)
+            sequences = [self._sequences[i] for i in idx]
+        order = np.argsort(-similarity, kind="stable")
+        results = []
+        for i in order[:n]:
+            score = 1.0 if sequences[i] == sequence else float(similarity[i])
+            if score >= min_similarity:
+                results.append((sequences[i], score))
+        return results
+
+    def structure(self, sequence: str) -> Optional[Dict[str, Any]]:
+        """Stored structure payload ({"pdb_text", "plddt"}) of an indexed sequence."""
+        if self._db is None:
+            return self._payloads.get(sequence)
+        with self._lock:
+            row = self._db.execute("SELECT pdb_text, plddt FROM folds WHERE sequence = ?", (sequence,)).fetchone()
+        if not row or not row[0]:
+            return None
+        return {"pdb_text": row[0], "plddt": row[1]}
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,521 @@
+"""
+Soak test: thousands of folds and LLM turns against local stubs, watching the
+process for leaks and slow degradation.
+
+Every fold opens a fresh MCP connection and, over stdio, spawns and reaps its
+own fold_server process, so a leaked pipe, an unreaped child or a thread pool
+that is never shut down only shows up after hours of traffic. This harness
+produces that traffic in minutes. It starts a local ESMFold stub and a local
+Anthropic Messages stub on one HTTP port (ESMFOLD_API_URL and
+ANTHROPIC_BASE_URL point at it, so nothing leaves the machine), then runs a
+mix of
+
+    fold      fold_with_fresh_connection on the harness event loop
+    llm       query_llm_for_candidates (propose_sequences tool call) on a worker thread
+    session   a complete agent.run with a fresh ProteinDesignAgent on a worker thread
+
+with `concurrency` operations in flight. A sampler records, every
+--sample-interval seconds and after a full garbage collection:
+
+    rss_mb        resident memory of the harness process
+    fds           open file descriptors
+    children      descendant processes, zombies included
+    threads       live Python threads
+    loop_lag_ms   how late a 50 ms heartbeat on the harness loop woke up (p95 and max)
+    fold_ms       median latency of the folds finished since the previous sample
+
+After a warm-up, the first and last tenth of the samples are compared and the
+run fails (exit code 1) on RSS, fd, loop lag or fold latency growth beyond the
+thresholds, on too many children at any time, on children left behind at the
+end, or on too many failed operations. Runs shorter than the warm-up are
+measured from the first finished operation instead, so import and start-up
+costs do not count as growth. Linux only for fds and children; they are
+skipped where /proc is missing.
+
+    python soak.py --folds 2000 --llm-turns 2000 --sessions 20
+    python soak.py --duration 3600 --shared-server --report soak.json
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from batch_cli import FOLD_SERVER_PATH, start_fold_server, stop_process
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+HEARTBEAT_SECONDS = 0.05
+# Fewest post-warm-up samples whose first and last tenth give comparable loop lags
+MIN_LAG_SAMPLES = 4
+SOAK_PROMPT = "Design a 20-residue alpha-helix that binds MDM2"
+
+
+def stub_pdb(sequence: str) -> str:
+    """Ideal-ish helix PDB (four backbone atoms per residue, varying pLDDT) for a sequence."""
+    lines = ["HEADER    SOAK STUB"]
+    for i in range(len(sequence)):
+        angle = math.radians(100.0 * i)
+        plddt = 0.6 + 0.15 * (i % 3)
+        for name, dx in (("N", -0.5), ("CA", 0.0), ("C", 0.5), ("O", 0.9)):
+            lines.append(
+                f"ATOM  {len(lines):5d}  {name:<3s} ALA A{i + 1:4d}    "
+                f"{2.3 * math.cos(angle) + dx:8.3f}{2.3 * math.sin(angle):8.3f}{1.5 * i:8.3f}"
+                f"  1.00{plddt:6.2f}           {name[0]}"
+            )
+    lines.append("END")
+    return "\n".join(lines) + "\n"
+
+
+def random_sequence(rng: random.Random, low: int = 20, high: int = 60) -> str:
+    return "".join(rng.choice(AMINO_ACIDS) for _ in range(rng.randint(low, high)))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """POST /v1/messages answers like the Anthropic Messages API; any other POST folds."""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.latency:
+            time.sleep(self.latency)
+        if self.path.rstrip("/").endswith("/v1/messages"):
+            rng = random.Random(body)
+            sequences = [random_sequence(rng) for _ in range(3)]
+            payload = json.dumps({
+                "id": f"msg_soak_{rng.getrandbits(32):08x}",
+                "type": "message",
+                "role": "assistant",
+                "model": json.loads(body or b"{}").get("model", "soak-stub"),
+                "content": [
+                    {"type": "text", "text": "Candidates:\n" + "\n".join(f">c{i}\n{s}" for i, s in enumerate(sequences))},
+                    {"type": "tool_use", "id": f"toolu_soak_{rng.getrandbits(32):08x}", "name": "propose_sequences",
+                     "input": {"sequences": [{"sequence": s} for s in sequences]}},
+                ],
+                "stop_reason": "tool_use",
+                "stop_sequence": None,
+                "usage": {"input_tokens": len(body) // 4, "output_tokens": 64},
+            }).encode()
+            content_type = "application/json"
+        else:
+            payload = stub_pdb(body.decode("ascii", errors="replace").strip()).encode()
+            content_type = "text/plain"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stubs(latency: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Serve the ESMFold and Anthropic stubs on a free local port; returns (server, base URL)."""
+    handler = type("SoakStubHandler", (StubHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="soak-stubs", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (peak RSS where /proc is missing)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def open_fds() -> Optional[int]:
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return None
+
+
+def descendant_count(root: Optional[int] = None) -> Optional[int]:
+    """Processes below root (default: this process), zombies included; None without /proc."""
+    root = os.getpid() if root is None else root
+    try:
+        pids = [int(name) for name in os.listdir("/proc") if name.isdigit()]
+    except OSError:
+        return None
+    children: Dict[int, List[int]] = {}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name can contain spaces and parentheses; fields resume after the last ")"
+        ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        children.setdefault(ppid, []).append(pid)
+    count, stack = 0, list(children.get(root, []))
+    while stack:
+        pid = stack.pop()
+        count += 1
+        stack.extend(children.get(pid, []))
+    return count
+
+
+@contextlib.contextmanager
+def quiet_output() -> Iterator[TextIO]:
+    """
+    Send stdout and stderr to /dev/null at the descriptor level, so the agent's
+    log and the stderr of child fold servers are silenced too.
+
+    Yields:
+        A stream to the original stderr, for progress lines
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    progress = os.fdopen(os.dup(saved[1]), "w", buffering=1)
+    try:
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        yield progress
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for fd in (*saved, devnull):
+            os.close(fd)
+        progress.close()
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+
+class ResourceSampler:
+    """Samples process resources on a thread; the harness loop feeds it heartbeat lags and op results."""
+
+    def __init__(self, interval: float, out: TextIO = sys.stderr):
+        self.interval = interval
+        self.out = out
+        self.samples: List[Dict[str, Any]] = []
+        self.counts = {"fold": 0, "llm": 0, "session": 0, "errors": 0}
+        self._lags: List[float] = []
+        self._fold_latencies: List[float] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="soak-sampler", daemon=True)
+        self._baseline_due = False
+        self._baseline_taken = False
+        self.started = time.monotonic()
+
+    def record_lag(self, lag: float) -> None:
+        with self._lock:
+            self._lags.append(lag)
+
+    def record_op(self, kind: str, ok: bool, seconds: float) -> None:
+        with self._lock:
+            self.counts[kind] += 1
+            if not ok:
+                self.counts["errors"] += 1
+            elif kind == "fold":
+                self._fold_latencies.append(seconds)
+            if not self._baseline_taken:
+                # One-time costs (lazy imports, caches, pools) are paid by the first
+                # operation; short runs without a full warm-up measure growth from here
+                self._baseline_taken = self._baseline_due = True
+                self._wake.set()
+
+    def sample(self, baseline: bool = False) -> Dict[str, Any]:
+        # Finished agents hold sockets and SQLite handles until the cycle
+        # collector runs; only what is still reachable afterwards is growth
+        gc.collect()
+        with self._lock:
+            lags, self._lags = self._lags, []
+            latencies, self._fold_latencies = self._fold_latencies, []
+            counts = dict(self.counts)
+        record = {
+            "t": round(time.monotonic() - self.started, 2),
+            "rss_mb": round(rss_mb(), 2),
+            "fds": open_fds(),
+            "children": descendant_count(),
+            "threads": threading.active_count(),
+            "loop_lag_p95_ms": round(1000 * percentile(lags, 95), 2),
+            "loop_lag_max_ms": round(1000 * max(lags, default=0.0), 2),
+            "fold_ms": round(1000 * statistics.median(latencies), 1) if latencies else None,
+            **counts,
+        }
+        if baseline:
+            record["baseline"] = True
+        with self._lock:
+            self.samples.append(record)
+        return record
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            with self._lock:
+                baseline, self._baseline_due = self._baseline_due, False
+            record = self.sample(baseline)
+            print(f"[{record['t']:7.1f}s] rss {record['rss_mb']:7.1f} MB  fds {record['fds']}  "
+                  f"children {record['children']}  threads {record['threads']}  "
+                  f"lag p95 {record['loop_lag_p95_ms']:.0f} ms  folds {record['fold']}  "
+                  f"llm {record['llm']}  sessions {record['session']}  errors {record['errors']}",
+                  file=self.out, flush=True)
+
+    def start(self) -> None:
+        """Take the first sample and begin sampling; call once the agent modules are imported."""
+        self.started = time.monotonic()
+        self.sample()
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and take a final sample, so operations that just finished are counted."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread.ident is not None:
+            self._thread.join()
+            with self._lock:
+                baseline, self._baseline_due = self._baseline_due, False
+            self.sample(baseline)
+
+
+def operations(args: argparse.Namespace) -> Iterator[str]:
+    """
+    Interleaved operation kinds in proportion to the requested counts; with a
+    duration, the same mix repeats until time is up.
+    """
+    totals = {"fold": args.folds, "llm": args.llm_turns, "session": args.sessions}
+    totals = {kind: n for kind, n in totals.items() if n > 0}
+    if not totals:
+        return
+    deadline = time.monotonic() + args.duration if args.duration else None
+    while True:
+        done = dict.fromkeys(totals, 0)
+        for _ in range(sum(totals.values())):
+            # Whichever kind is furthest behind its share goes next
+            kind = min(totals, key=lambda k: (done[k] + 1) / totals[k])
+            done[kind] += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            yield kind
+        if deadline is None:
+            return
+
+
+async def heartbeat(sampler: ResourceSampler, stop: asyncio.Event) -> None:
+    """Measure how late the loop runs a timer callback, continuously."""
+    while not stop.is_set():
+        expected = time.monotonic() + HEARTBEAT_SECONDS
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        sampler.record_lag(max(0.0, time.monotonic() - expected))
+
+
+async def drive(args: argparse.Namespace, agent_kwargs: Dict[str, Any], sampler: ResourceSampler) -> None:
+    from agent import ProteinDesignAgent
+
+    rng = random.Random(args.seed)
+    agent = ProteinDesignAgent(**agent_kwargs)
+    # Importing the agent and its dependencies is a one-time cost, not growth
+    sampler.start()
+    ops = operations(args)
+    stop = asyncio.Event()
+
+    def run_session() -> bool:
+        session_agent = ProteinDesignAgent(**{**agent_kwargs, "fold_concurrency": 2})
+        results = session_agent.run(SOAK_PROMPT)
+        return results.get("final_sequence") is not None
+
+    async def worker() -> None:
+        for kind in ops:
+            started = time.monotonic()
+            try:
+                if kind == "fold":
+                    ok = await agent.fold_with_fresh_connection(random_sequence(rng)) is not None
+                elif kind == "llm":
+                    _, sequences = await asyncio.to_thread(
+                        agent.query_llm_for_candidates, f"Propose binders for MDM2 (turn {sampler.counts['llm']})")
+                    ok = bool(sequences)
+                else:
+                    ok = await asyncio.to_thread(run_session)
+            except Exception as e:
+                print(f"{kind} failed: {type(e).__name__}: {e}", file=sampler.out)
+                ok = False
+            sampler.record_op(kind, ok, time.monotonic() - started)
+
+    # A fixed pool: every worker thread keeps its own agent event loop, so a
+    # growing pool would look like an fd and thread leak
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(args.concurrency, "soak-worker"))
+    beat = asyncio.create_task(heartbeat(sampler, stop))
+    try:
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    finally:
+        stop.set()
+        await beat
+        agent.stop_mcp_server()
+
+
+def _window(samples: List[Dict[str, Any]], key: str) -> Tuple[Optional[float], Optional[float]]:
+    """Medians of a metric over the first and last tenth of the samples."""
+    values = [s[key] for s in samples if s.get(key) is not None]
+    if len(values) < 2:
+        return None, None
+    k = max(1, len(values) // 10)
+    return statistics.median(values[:k]), statistics.median(values[-k:])
+
+
+def evaluate(
+    samples: List[Dict[str, Any]],
+    args: argparse.Namespace,
+    baseline_children: Optional[int],
+    resident_children: Optional[int],
+    leftover_children: Optional[int]
+) -> Dict[str, Any]:
+    """
+    Growth of each metric after warm-up and the thresholds it was held to.
+
+    Child processes are counted above resident_children while the soak runs
+    and above baseline_children (before any server was started) at the end.
+    """
+    baseline = next((i for i, s in enumerate(samples) if s.get("baseline")), max(len(samples) - 2, 0))
+    steady = [s for s in samples if s["t"] >= args.warmup] or samples[baseline:]
+    checks = []
+
+    def check(name: str, value: Optional[float], limit: float, unit: str = "") -> None:
+        if value is None:
+            checks.append({"check": name, "value": None, "limit": limit, "ok": True, "skipped": True})
+        else:
+            checks.append({"check": name, "value": round(value, 2), "limit": limit, "unit": unit, "ok": value <= limit})
+
+    first, last = _window(steady, "rss_mb")
+    check("rss_growth", None if first is None else last - first, args.max_rss_growth_mb, "MB")
+    first, last = _window(steady, "fds")
+    check("fd_growth", None if first is None else last - first, args.max_fd_growth)
+    # A window of one or two heartbeats says nothing about lag growth
+    first, last = _window(steady, "loop_lag_p95_ms") if len(steady) >= MIN_LAG_SAMPLES else (None, None)
+    check("loop_lag_growth", None if first is None else last - first, args.max_lag_growth_ms, "ms")
+    check("loop_lag_p95", max((s["loop_lag_p95_ms"] for s in steady), default=0.0), args.max_loop_lag_ms, "ms")
+    first, last = _window(steady, "fold_ms")
+    check("fold_latency_ratio", None if not first else last / first, args.max_latency_ratio, "x")
+
+    peak = max((s["children"] for s in samples if s["children"] is not None), default=None)
+    check("peak_children", None if peak is None else peak - (resident_children or 0), args.max_children)
+    check("leftover_children",
+          None if leftover_children is None else leftover_children - (baseline_children or 0), 0)
+    final = samples[-1] if samples else {"fold": 0, "llm": 0, "session": 0, "errors": 0}
+    total = final["fold"] + final["llm"] + final["session"]
+    check("error_rate", final["errors"] / total if total else 0.0, args.max_error_rate)
+    return {"ok": all(c["ok"] for c in checks), "checks": checks}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Soak the agent's fold and LLM paths against local stubs")
+    parser.add_argument("--folds", type=int, default=2000, help="MCP folds to run")
+    parser.add_argument("--llm-turns", type=int, default=2000, help="LLM turns to run")
+    parser.add_argument("--sessions", type=int, default=20, help="Complete agent sessions to run")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="Repeat the operation mix for this many seconds instead of running the counts once")
+    parser.add_argument("--concurrency", type=int, default=4, help="Operations in flight")
+    parser.add_argument("--shared-server", action="store_true",
+                        help="Fold through one streamable-http fold_server instead of a stdio server per fold")
+    parser.add_argument("--fold-server-port", type=int, default=8765)
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="Seconds each stub response is delayed")
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="Seconds between resource samples")
+    parser.add_argument("--warmup", type=float, default=30.0, help="Seconds of samples ignored when measuring growth")
+    parser.add_argument("--max-rss-growth-mb", type=float, default=64.0)
+    parser.add_argument("--max-fd-growth", type=float, default=16.0)
+    parser.add_argument("--max-loop-lag-ms", type=float, default=250.0, help="Limit on the p95 heartbeat lag of any sample")
+    parser.add_argument("--max-lag-growth-ms", type=float, default=50.0)
+    parser.add_argument("--max-latency-ratio", type=float, default=2.0,
+                        help="Limit on median fold latency at the end over the start")
+    parser.add_argument("--max-children", type=int, default=None,
+                        help="Limit on concurrent child processes (default: 2 x concurrency)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default=None, help="Write the samples and verdict to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the agent's log output")
+    args = parser.parse_args(argv)
+    args.concurrency = max(args.concurrency, 1)
+    if args.max_children is None:
+        args.max_children = 2 * args.concurrency
+
+    stubs, stub_url = start_stubs(args.stub_latency)
+    # Set before any fold_server or Anthropic client is created so both inherit the stubs
+    os.environ["ESMFOLD_API_URL"] = f"{stub_url}/fold"
+    os.environ["ANTHROPIC_BASE_URL"] = stub_url
+    workdir = tempfile.mkdtemp(prefix="soak-")
+
+    quiet = contextlib.nullcontext(sys.stderr) if args.verbose else quiet_output()
+    with quiet as progress:
+        fold_server = None
+        baseline_children = descendant_count()
+        if args.shared_server:
+            fold_server = start_fold_server(args.fold_server_port, workers=max(16, 2 * args.concurrency))
+        # Processes that run for the whole soak (the shared fold server) do not count against the limit
+        resident_children = descendant_count()
+        agent_kwargs = {
+            "esmfold_mcp_path": FOLD_SERVER_PATH,
+            "llm_api_key": "soak-test",
+            "verbose": args.verbose,
+            "interactive": False,
+            "hedge_folds": False,
+            "fold_server_url": f"http://127.0.0.1:{args.fold_server_port}/mcp" if fold_server else None,
+            "refine_with_llm": True,
+            "max_iterations": 2,
+            "folds_per_iteration": 2,
+            "artifact_dir": workdir,
+        }
+
+        sampler = ResourceSampler(args.sample_interval, progress)
+        try:
+            asyncio.run(drive(args, agent_kwargs, sampler))
+        finally:
+            # Samples end with the workload; teardown would read as shrinkage
+            sampler.stop()
+            stop_process(fold_server)
+            stubs.shutdown()
+            shutil.rmtree(workdir, ignore_errors=True)
+        # Children still running or unreaped once everything is closed are leaks
+        deadline = time.monotonic() + 10.0
+        leftover = descendant_count()
+        while (leftover or 0) > (baseline_children or 0) and time.monotonic() < deadline:
+            time.sleep(0.5)
+            leftover = descendant_count()
+
+    verdict = evaluate(sampler.samples, args, baseline_children, resident_children, leftover)
+    for c in verdict["checks"]:
+        status = "skip" if c.get("skipped") else ("ok" if c["ok"] else "FAIL")
+        print(f"{status:4s} {c['check']:20s} {c['value']} {c.get('unit', '')} (limit {c['limit']})", file=sys.stderr)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"args": vars(args), "verdict": verdict, "samples": sampler.samples}, f, indent=2)
+    print("Soak passed" if verdict["ok"] else "Soak FAILED", file=sys.stderr)
+    return 0 if verdict["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
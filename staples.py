@@ -0,0 +1,231 @@
+"""
+Combinatorial enumeration of hydrocarbon-staple placements on a helix.
+
+A staple links residues i and i+4 (one helical turn) or i and i+7 (two
+turns); both anchors of either kind sit on the same face of the helix. A
+placement is one or more staples that do not share or crowd residues, and
+it is valid when neither anchor of any staple is a hotspot or sits on the
+binding face defined by the hotspots on the helical wheel.
+
+Every valid placement is scored with vectorized helical-wheel geometry:
+
+    face     anchors should point away from the binding face (1 - cos of the
+             wheel angle to the face direction, averaged over anchors)
+    coverage staples should brace the whole helix, not one end of it
+             (fraction of residues inside a staple span, spread evenly)
+    cost     replacing a residue with a staple anchor loses its side chain;
+             losing large hydrophobics costs more than losing Ala or Glu
+
+Folding backends only understand standard residues, so every placement also
+comes with a proxy sequence in which the anchors are Ala (the closest
+natural stand-in for the alpha-methylated anchor residues); the stapled
+sequence with X at the anchors is kept alongside for reporting.
+"""
+from itertools import combinations
+from math import comb
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from mutagenesis import AMINO_ACIDS, HELIX_TURN_DEGREES, encode, find_hotspots
+
+STAPLE_SPANS = {"i,i+4": 4, "i,i+7": 7}
+PROXY_RESIDUE = "A"
+STAPLE_MARK = "X"
+
+# Side-chain loss when a residue becomes a staple anchor
+ANCHOR_COST = {
+    "A": 0.0, "S": 0.1, "E": 0.15, "K": 0.15, "Q": 0.15, "R": 0.2, "D": 0.2, "N": 0.2, "T": 0.2, "H": 0.3,
+    "G": 0.4, "P": 0.4, "C": 0.4, "M": 0.7, "V": 0.7, "I": 0.8, "L": 0.8, "Y": 0.9, "F": 1.0, "W": 1.0,
+}
+_COST_TABLE = np.array([ANCHOR_COST[aa] for aa in AMINO_ACIDS])
+
+DEFAULT_WEIGHTS = {"face": 1.0, "coverage": 0.6, "cost": 0.4}
+
+
+def wheel_angles(length: int) -> np.ndarray:
+    """Helical-wheel angle of each residue, in radians."""
+    return np.deg2rad(np.arange(length) * HELIX_TURN_DEGREES % 360.0)
+
+
+def binding_face(hotspots: Sequence[int], margin_degrees: float = 50.0) -> Tuple[Optional[float], float]:
+    """
+    Direction and half-width of the binding face on the helical wheel.
+
+    The face points at the circular mean of the hotspot angles and extends
+    margin_degrees beyond the hotspot furthest from that direction.
+
+    Returns:
+        (direction in radians or None without hotspots, half-width in radians)
+    """
+    if not len(hotspots):
+        return None, 0.0
+    angles = wheel_angles(max(hotspots) + 1)[list(hotspots)]
+    direction = float(np.arctan2(np.sin(angles).mean(), np.cos(angles).mean()))
+    spread = np.abs(np.angle(np.exp(1j * (angles - direction)))).max()
+    return direction, float(spread + np.deg2rad(margin_degrees))
+
+
+def single_staples(
+    length: int,
+    hotspots: Sequence[int] = (),
+    spans: Iterable[str] = STAPLE_SPANS,
+    terminal_margin: int = 1,
+    face_margin_degrees: float = 50.0
+) -> Dict[str, np.ndarray]:
+    """
+    Every single staple whose anchors avoid hotspots, termini and the binding face.
+
+    Returns:
+        Dict of arrays "start", "end", "span" (index into list(spans)) and
+        "clearance" ((1 - cos(angle to the face)) / 2 summed over both anchors, 0..2)
+    """
+    spans = list(spans)
+    angles = wheel_angles(length)
+    direction, half_width = binding_face(hotspots, face_margin_degrees)
+    if direction is None:
+        delta = np.full(length, np.pi / 2)
+    else:
+        delta = np.abs(np.angle(np.exp(1j * (angles - direction))))
+    allowed = delta > half_width
+    allowed[list(hotspots)] = False
+    allowed[:terminal_margin] = False
+    allowed[length - terminal_margin:] = False
+
+    starts, ends, kinds = [], [], []
+    for k, name in enumerate(spans):
+        start = np.arange(length - STAPLE_SPANS[name])
+        end = start + STAPLE_SPANS[name]
+        ok = allowed[start] & allowed[end]
+        starts.append(start[ok])
+        ends.append(end[ok])
+        kinds.append(np.full(int(ok.sum()), k))
+    start, end = np.concatenate(starts), np.concatenate(ends)
+    order = np.lexsort((end, start))
+    start, end, span = start[order], end[order], np.concatenate(kinds)[order]
+    clearance = (1.0 - np.cos(delta[start])) / 2 + (1.0 - np.cos(delta[end])) / 2
+    return {"start": start, "end": end, "span": span, "clearance": clearance}
+
+
+def enumerate_placements(
+    sequence: str,
+    hotspots: Optional[Sequence[int]] = None,
+    n_staples: Iterable[int] = (1, 2),
+    spans: Iterable[str] = STAPLE_SPANS,
+    min_gap: int = 1,
+    weights: Optional[Dict[str, float]] = None,
+    top_n: Optional[int] = 50,
+    terminal_margin: int = 1
+) -> List[Dict[str, Any]]:
+    """
+    All valid staple placements on a helix, best first.
+
+    Args:
+        sequence: Helix sequence (standard residues)
+        hotspots: 0-based binding residues; found with the p53-like motif if omitted
+        n_staples: Numbers of staples per placement to enumerate
+        spans: Staple types to use ("i,i+4", "i,i+7")
+        min_gap: Residues required between the spans of consecutive staples
+        weights: Weights of the face, coverage and cost terms
+        top_n: Placements to return (None = all)
+        terminal_margin: Residues at each terminus that cannot be anchors
+
+    Returns:
+        Dicts with staples [(i, j, type)], score and its terms, the Ala proxy
+        sequence to fold and the stapled sequence with X at the anchors
+    """
+    encoded = encode(sequence)
+    if (encoded == 255).any():
+        raise ValueError(f"Sequence contains non-standard residues: {sequence}")
+    length = len(sequence)
+    if hotspots is None:
+        hotspots = find_hotspots(sequence)
+    hotspots = [p for p in hotspots if 0 <= p < length]
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    span_names = list(spans)
+
+    singles = single_staples(length, hotspots, span_names, terminal_margin)
+    start, end = singles["start"], singles["end"]
+    cost = _COST_TABLE[encoded[start]] + _COST_TABLE[encoded[end]]
+    n_singles = len(start)
+
+    blocks = []
+    for k in n_staples:
+        if k < 1 or k > n_singles:
+            continue
+        # Singles are sorted by start, so combinations come out in sequence order
+        combos = np.fromiter(
+            (i for combo in combinations(range(n_singles), k) for i in combo),
+            dtype=np.int64, count=comb(n_singles, k) * k
+        ).reshape(-1, k)
+        if k > 1:
+            ok = (start[combos[:, 1:]] > end[combos[:, :-1]] + min_gap).all(axis=1)
+            combos = combos[ok]
+        if not len(combos):
+            continue
+        face = singles["clearance"][combos].mean(axis=1) / 2
+        covered = (end[combos] - start[combos] + 1).sum(axis=1) / length
+        # Even spread: the longest stretch of helix left unbraced, as a fraction of the helix
+        edges = np.concatenate([np.zeros((len(combos), 1)), start[combos], end[combos],
+                                np.full((len(combos), 1), length - 1)], axis=1)
+        edges.sort(axis=1)
+        longest_gap = np.diff(edges, axis=1)[:, ::2].max(axis=1) / length
+        coverage = covered * (1.0 - longest_gap)
+        anchor_cost = cost[combos].mean(axis=1) / 2
+        score = weights["face"] * face + weights["coverage"] * coverage - weights["cost"] * anchor_cost
+        blocks.append((combos, np.stack([score, face, coverage, anchor_cost], axis=1)))
+    if not blocks:
+        return []
+
+    # Rank all placements together; only the returned ones are turned into dicts
+    terms = np.concatenate([t for _, t in blocks])
+    block_of = np.concatenate([np.full(len(t), b) for b, (_, t) in enumerate(blocks)])
+    row_of = np.concatenate([np.arange(len(t)) for _, t in blocks])
+    order = np.argsort(-terms[:, 0], kind="stable")
+    if top_n is not None:
+        order = order[:top_n]
+
+    placements = []
+    for idx in order:
+        combo = blocks[block_of[idx]][0][row_of[idx]]
+        score, face, coverage, anchor_cost = terms[idx].tolist()
+        staples = [(int(start[i]), int(end[i]), span_names[singles["span"][i]]) for i in combo]
+        anchors = [p for i, j, _ in staples for p in (i, j)]
+        proxy, stapled = list(sequence), list(sequence)
+        for p in anchors:
+            proxy[p] = PROXY_RESIDUE
+            stapled[p] = STAPLE_MARK
+        placements.append({
+            "staples": staples,
+            "score": score,
+            "face_clearance": face,
+            "coverage": coverage,
+            "anchor_cost": anchor_cost,
+            "sequence": "".join(proxy),
+            "stapled_sequence": "".join(stapled),
+        })
+    return placements
+
+
+def staple_candidates(
+    sequence: str,
+    n: int,
+    hotspots: Optional[Sequence[int]] = None,
+    exclude: Iterable[str] = (),
+    **kwargs
+) -> List[Dict[str, Any]]:
+    """
+    Best placements whose Ala proxy sequences are distinct and not excluded,
+    ready to go into the fold queue.
+    """
+    seen = set(exclude)
+    seen.add(sequence)
+    picked = []
+    for placement in enumerate_placements(sequence, hotspots, top_n=max(4 * n, 50), **kwargs):
+        if placement["sequence"] in seen:
+            continue
+        seen.add(placement["sequence"])
+        picked.append(placement)
+        if len(picked) >= n:
+            break
+    return picked
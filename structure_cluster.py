@@ -0,0 +1,251 @@
+"""
+Vectorized structural comparison and clustering of folded candidates.
+
+CA coordinates are parsed from the predicted PDBs and stacked into a padded
+(N, L, 3) array with a residue mask. Pairs are superposed with a batched
+Kabsch fit (one SVD per pair, all pairs of a chunk at once) and compared by
+RMSD and a TM-like score:
+
+    TM = (1 / L) * sum_i 1 / (1 + (d_i / d0)^2),  d0 = 1.24 * (L - 15)^(1/3) - 1.8
+
+Residues are matched by position, which is what we want for designs of the
+same target that differ by point mutations. The TM-like score is evaluated
+on the RMSD-optimal superposition, so it is a (slight) underestimate of the
+true TM-score.
+
+All pairwise work is done in chunks of at most `chunk_pairs` pairs, so peak
+memory is O(chunk_pairs * L) on top of the inputs regardless of N. Greedy
+clustering only compares each new cluster leader against the unassigned
+structures, so thousands of structures never need a full N x N matrix.
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_TM_THRESHOLD = 0.5
+CHUNK_PAIRS = 4096
+
+
+def parse_ca_coords(pdb_text: str) -> np.ndarray:
+    """
+    CA coordinates of the first model in a PDB.
+
+    Returns:
+        float32 array of shape (L, 3); empty if the PDB has no CA atoms
+    """
+    coords = []
+    for line in pdb_text.splitlines():
+        if line.startswith("ENDMDL"):
+            break
+        if line.startswith("ATOM") and line[12:16].strip() == "CA":
+            try:
+                coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+            except ValueError:
+                continue
+    return np.array(coords, dtype=np.float32).reshape(-1, 3)
+
+
+def stack_coords(coords: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pad per-structure coordinates into one batch.
+
+    Returns:
+        (coords, mask) of shapes (N, L_max, 3) and (N, L_max)
+    """
+    n = len(coords)
+    max_len = max((len(c) for c in coords), default=0)
+    stacked = np.zeros((n, max_len, 3), dtype=np.float32)
+    mask = np.zeros((n, max_len), dtype=bool)
+    for i, c in enumerate(coords):
+        stacked[i, :len(c)] = c
+        mask[i, :len(c)] = True
+    return stacked, mask
+
+
+def tm_d0(length: np.ndarray) -> np.ndarray:
+    """TM-score distance scale for the given reference length(s)."""
+    length = np.asarray(length, dtype=np.float32)
+    return np.maximum(1.24 * np.cbrt(np.maximum(length - 15.0, 0.0)) - 1.8, 0.5)
+
+
+def kabsch_compare(p: np.ndarray, q: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Superpose batches of paired structures and score them.
+
+    Args:
+        p: (B, L, 3) coordinates to move
+        q: (B, L, 3) reference coordinates
+        mask: (B, L) residues present in both structures
+
+    Returns:
+        (rmsd, tm) arrays of shape (B,); pairs with fewer than 3 shared
+        residues get rmsd = inf and tm = 0
+    """
+    w = mask.astype(np.float32)[..., None]
+    counts = w.sum(axis=1)  # (B, 1)
+    safe = np.maximum(counts, 1.0)
+    p_c = (p - (p * w).sum(axis=1, keepdims=True) / safe[:, None]) * w
+    q_c = (q - (q * w).sum(axis=1, keepdims=True) / safe[:, None]) * w
+
+    h = p_c.transpose(0, 2, 1) @ q_c
+    u, _, vt = np.linalg.svd(h)
+    # Reflection correction: flip the last singular vector when det < 0
+    d = np.sign(np.linalg.det(u @ vt))
+    d[d == 0] = 1.0
+    u[:, :, -1] *= d[:, None]
+    rotation = u @ vt
+
+    diff = p_c @ rotation - q_c
+    sq = (diff * diff).sum(axis=2) * w[..., 0]
+    n = counts[:, 0]
+    rmsd = np.sqrt(sq.sum(axis=1) / np.maximum(n, 1.0))
+    d0 = tm_d0(n)
+    tm = ((1.0 / (1.0 + sq / (d0[:, None] ** 2))) * w[..., 0]).sum(axis=1) / np.maximum(n, 1.0)
+
+    too_short = n < 3
+    rmsd[too_short] = np.inf
+    tm[too_short] = 0.0
+    return rmsd.astype(np.float32), tm.astype(np.float32)
+
+
+def compare_one_to_many(
+    coords: np.ndarray,
+    mask: np.ndarray,
+    ref: int,
+    others: np.ndarray,
+    chunk_pairs: int = CHUNK_PAIRS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """RMSD and TM-like score of structure `ref` against each index in `others`."""
+    rmsd = np.empty(len(others), dtype=np.float32)
+    tm = np.empty(len(others), dtype=np.float32)
+    for start in range(0, len(others), chunk_pairs):
+        idx = others[start:start + chunk_pairs]
+        pair_mask = mask[idx] & mask[ref][None, :]
+        q = np.broadcast_to(coords[ref], coords[idx].shape)
+        rmsd[start:start + len(idx)], tm[start:start + len(idx)] = kabsch_compare(coords[idx], q, pair_mask)
+    return rmsd, tm
+
+
+def similarity_matrices(
+    coords: np.ndarray,
+    mask: np.ndarray,
+    chunk_pairs: int = CHUNK_PAIRS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Full pairwise RMSD and TM-like matrices.
+
+    Pairs are processed in chunks of chunk_pairs, so only the two N x N
+    float32 outputs grow with N^2.
+
+    Returns:
+        (rmsd, tm) symmetric (N, N) float32 matrices
+    """
+    n = len(coords)
+    rmsd = np.zeros((n, n), dtype=np.float32)
+    tm = np.eye(n, dtype=np.float32)
+    rows, cols = np.triu_indices(n, k=1)
+    for start in range(0, len(rows), chunk_pairs):
+        i = rows[start:start + chunk_pairs]
+        j = cols[start:start + chunk_pairs]
+        r, t = kabsch_compare(coords[i], coords[j], mask[i] & mask[j])
+        rmsd[i, j] = rmsd[j, i] = r
+        tm[i, j] = tm[j, i] = t
+    return rmsd, tm
+
+
+def greedy_cluster(
+    coords: np.ndarray,
+    mask: np.ndarray,
+    scores: Optional[np.ndarray] = None,
+    tm_threshold: float = DEFAULT_TM_THRESHOLD,
+    chunk_pairs: int = CHUNK_PAIRS
+) -> np.ndarray:
+    """
+    Leader clustering: the best unassigned structure starts a cluster and
+    absorbs every unassigned structure with TM-like score >= tm_threshold.
+
+    Args:
+        coords, mask: Stacked structures from stack_coords
+        scores: Per-structure quality (higher first); input order if omitted
+        tm_threshold: Similarity at which two structures count as redundant
+
+    Returns:
+        (N,) cluster label per structure; label k is the index of the k-th
+        leader in leader order
+    """
+    n = len(coords)
+    order = np.arange(n) if scores is None else np.argsort(-np.asarray(scores, dtype=np.float64), kind="stable")
+    labels = np.full(n, -1, dtype=np.int64)
+    unassigned = order
+    label = 0
+    while len(unassigned):
+        leader = unassigned[0]
+        rest = unassigned[1:]
+        labels[leader] = label
+        if len(rest):
+            _, tm = compare_one_to_many(coords, mask, leader, rest, chunk_pairs)
+            members = tm >= tm_threshold
+            labels[rest[members]] = label
+            rest = rest[~members]
+        unassigned = rest
+        label += 1
+    return labels
+
+
+def select_diverse(
+    pdb_texts: Sequence[str],
+    scores: Sequence[Optional[float]],
+    tm_threshold: float = DEFAULT_TM_THRESHOLD,
+    reference_coords: Sequence[np.ndarray] = (),
+    chunk_pairs: int = CHUNK_PAIRS
+) -> Dict[str, object]:
+    """
+    Keep one representative per structural cluster.
+
+    Structures that are redundant with any reference structure (e.g.
+    representatives kept in earlier iterations) are dropped first; the rest
+    are clustered and the best-scoring member of each cluster is kept.
+
+    Args:
+        pdb_texts: Folded structures
+        scores: Quality per structure (e.g. mean pLDDT); None sorts last
+        tm_threshold: TM-like score at which two structures are redundant
+        reference_coords: CA coordinates of structures already kept
+
+    Returns:
+        Dict with:
+            representatives: indices of kept structures, best first
+            labels: cluster label per structure (-1 = redundant with a reference)
+            coords: parsed CA coordinates per structure
+    """
+    parsed = [parse_ca_coords(text) for text in pdb_texts]
+    n = len(parsed)
+    quality = np.array([-np.inf if s is None else s for s in scores], dtype=np.float64)
+    # Structures without coordinates (failed folds) cannot be compared; keep them as singletons
+    valid = np.array([len(c) >= 3 for c in parsed], dtype=bool)
+    labels = np.full(n, -1, dtype=np.int64)
+
+    refs = [np.asarray(c, dtype=np.float32) for c in reference_coords if len(c) >= 3]
+    coords, mask = stack_coords(parsed + refs)
+    candidates = np.flatnonzero(valid)
+    for r in range(len(refs)):
+        if not len(candidates):
+            break
+        _, tm = compare_one_to_many(coords, mask, n + r, candidates, chunk_pairs)
+        candidates = candidates[tm < tm_threshold]
+
+    next_label = 0
+    if len(candidates):
+        sub = greedy_cluster(coords[candidates], mask[candidates], quality[candidates], tm_threshold, chunk_pairs)
+        labels[candidates] = sub
+        next_label = int(sub.max()) + 1
+    for i in np.flatnonzero(~valid):
+        labels[i] = next_label
+        next_label += 1
+
+    representatives = []
+    for label in range(next_label):
+        members = np.flatnonzero(labels == label)
+        representatives.append(int(members[np.argmax(quality[members])]))
+    representatives.sort(key=lambda i: -quality[i])
+    return {"representatives": representatives, "labels": labels, "coords": parsed}
@@ -0,0 +1,92 @@
+"""
+Compact feature records of predicted structures.
+
+Most consumers of a fold only need a handful of numbers, not the PDB. The
+fold server computes this record next to the fold (fold_and_featurize) and
+keeps the PDB on its side, so a candidate costs a few hundred bytes on the
+wire instead of tens of kilobytes. Everything is derived from CA atoms, so it
+works for any predictor's output:
+
+    n_residues            CA atoms in the first model
+    plddt_mean/min        per-residue confidence (B-factor column), scaled to 0-1
+    confident_fraction    residues with pLDDT >= 0.7
+    helix_fraction        residues i whose CA(i)-CA(i+3) distance is helical (4.5-5.6 A)
+    radius_of_gyration    compactness of the CA trace, in A
+    end_to_end            N- to C-terminal CA distance, in A
+
+plus the sequence descriptors of the pre-screen and, against a reference
+structure, a position-matched TM-like score and RMSD.
+"""
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from prescreen import compute_descriptors
+from structure_cluster import kabsch_compare, parse_ca_coords
+
+CONFIDENT_PLDDT = 0.7
+HELIX_CA_I3 = (4.5, 5.6)
+
+
+def parse_ca_plddt(pdb_text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """CA coordinates (L, 3) and per-residue pLDDT (L,) of the first model, in one pass."""
+    coords, plddt = [], []
+    for line in pdb_text.splitlines():
+        if line.startswith("ENDMDL"):
+            break
+        if line.startswith("ATOM") and line[12:16].strip() == "CA":
+            try:
+                coords.append((float(line[30:38]), float(line[38:46]), float(line[46:54])))
+                plddt.append(float(line[60:66]))
+            except ValueError:
+                continue
+    plddt = np.array(plddt, dtype=np.float64)
+    # ESMFold reports pLDDT as 0-1, other predictors as 0-100
+    if len(plddt) and plddt.mean() > 1.0:
+        plddt /= 100.0
+    return np.array(coords, dtype=np.float32).reshape(-1, 3), plddt
+
+
+def featurize(sequence: str, pdb_text: str, reference_pdb: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Feature record of one predicted structure.
+
+    Args:
+        sequence: The folded sequence
+        pdb_text: Its predicted structure
+        reference_pdb: Optional structure to compare against (residues matched by position)
+
+    Returns:
+        JSON-serializable dict of the features listed in the module docstring
+    """
+    coords, plddt = parse_ca_plddt(pdb_text)
+    n = len(coords)
+    record: Dict[str, Any] = {"sequence": sequence, "n_residues": n}
+    if n:
+        centered = coords - coords.mean(axis=0)
+        record.update(
+            plddt_mean=round(float(plddt.mean()), 4),
+            plddt_min=round(float(plddt.min()), 4),
+            confident_fraction=round(float((plddt >= CONFIDENT_PLDDT).mean()), 4),
+            radius_of_gyration=round(float(np.sqrt((centered ** 2).sum(axis=1).mean())), 3),
+            end_to_end=round(float(np.linalg.norm(coords[-1] - coords[0])), 3),
+        )
+    if n > 3:
+        d13 = np.linalg.norm(coords[3:] - coords[:-3], axis=1)
+        low, high = HELIX_CA_I3
+        record["helix_fraction"] = round(float(((d13 >= low) & (d13 <= high)).mean()), 4)
+    descriptors = compute_descriptors([sequence])
+    record.update({name: round(float(values[0]), 4) for name, values in descriptors.items() if name != "length"})
+
+    if reference_pdb is not None:
+        ref = parse_ca_coords(reference_pdb)
+        length = max(n, len(ref))
+        p = np.zeros((1, length, 3), dtype=np.float32)
+        q = np.zeros((1, length, 3), dtype=np.float32)
+        p[0, :n], q[0, :len(ref)] = coords, ref
+        mask = np.zeros((1, length), dtype=bool)
+        mask[0, :min(n, len(ref))] = True
+        rmsd, tm = kabsch_compare(p, q, mask)
+        record["tm_to_reference"] = round(float(tm[0]), 4)
+        record["rmsd_to_reference"] = round(float(rmsd[0]), 3) if np.isfinite(rmsd[0]) else None
+    return record
@@ -0,0 +1,195 @@
+"""
+Active-learning surrogate for choosing which candidates to fold.
+
+A Bayesian ridge regression over k-mer features (amino-acid composition,
+dipeptide composition and a few pre-screen descriptors) is trained
+incrementally on every observed outcome of one kind (binding score, fold
+confidence). Only the sufficient
+statistics X^T X and X^T y are kept, together with the posterior covariance
+(X^T X + alpha I)^-1, which each observation updates with a Sherman-Morrison
+rank-1 correction. An update therefore costs O(batch * D^2) and never
+inverts the D x D matrix (D = 426).
+
+Predictions carry a posterior standard deviation, which the UCB selection
+policy uses to trade off exploiting good regions against exploring
+uncertain ones. One model is kept per objective; combine_predictions merges
+them into a single weighted objective for selection.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from prescreen import PAD, compute_descriptors, encode_batch
+
+N_AA = PAD  # 20 standard residues; PAD is the 21st code
+_PAIR_SPACE = (N_AA + 1) * (N_AA + 1)
+N_FEATURES = 2 + N_AA + N_AA * N_AA + 4
+
+# Rows per chunk during inference, to keep memory bounded on large batches
+PREDICT_CHUNK = 8192
+
+
+def featurize(sequences: Sequence[str]) -> np.ndarray:
+    """
+    Map sequences to fixed-size feature vectors.
+
+    Features: bias, length / 100, 20 residue frequencies, 400 dipeptide
+    frequencies, and helix penalty, hydrophobic moment, net charge / 10 and
+    aggregation motif count from the pre-screen.
+
+    Args:
+        sequences: Amino acid sequences (any lengths)
+
+    Returns:
+        float32 array of shape (N, 426)
+    """
+    n = len(sequences)
+    codes = encode_batch(sequences).astype(np.int64)
+    lengths = np.array([len(seq) for seq in sequences], dtype=np.float64)
+    safe_len = np.maximum(lengths, 1.0)
+    row_offsets = np.arange(n)[:, None]
+
+    features = np.zeros((n, N_FEATURES), dtype=np.float32)
+    features[:, 0] = 1.0
+    features[:, 1] = lengths / 100.0
+
+    if codes.size:
+        mono = np.bincount((row_offsets * (N_AA + 1) + codes).ravel(), minlength=n * (N_AA + 1))
+        features[:, 2:2 + N_AA] = mono.reshape(n, N_AA + 1)[:, :N_AA]
+        features[:, 2:2 + N_AA] /= safe_len[:, None]
+
+    if codes.shape[1] > 1:
+        pairs = codes[:, :-1] * (N_AA + 1) + codes[:, 1:]
+        di = np.bincount((row_offsets * _PAIR_SPACE + pairs).ravel(), minlength=n * _PAIR_SPACE)
+        # Drop every pair that involves padding
+        block = features[:, 2 + N_AA:2 + N_AA + N_AA * N_AA].reshape(n, N_AA, N_AA)
+        block[:] = di.reshape(n, N_AA + 1, N_AA + 1)[:, :N_AA, :N_AA]
+        block /= np.maximum(safe_len - 1, 1.0)[:, None, None]
+
+    desc = compute_descriptors(sequences)
+    features[:, -4] = desc["helix_penalty"]
+    features[:, -3] = desc["hydrophobic_moment"]
+    features[:, -2] = desc["net_charge"] / 10.0
+    features[:, -1] = desc["aggregation_motifs"]
+    return features
+
+
+class SurrogateModel:
+    """
+    Incrementally trained Bayesian ridge regression with predictive uncertainty.
+    """
+
+    def __init__(self, alpha: float = 1.0):
+        """
+        Args:
+            alpha: Prior precision on the weights (ridge strength)
+        """
+        self.alpha = alpha
+        self.xtx = np.zeros((N_FEATURES, N_FEATURES))
+        self.xty = np.zeros(N_FEATURES)
+        self.yty = 0.0
+        self.n_observations = 0
+        self._weights: Optional[np.ndarray] = None
+        # (X^T X + alpha I)^-1, starting from the prior
+        self._cov = np.eye(N_FEATURES) / alpha
+        self._noise_var = 1.0
+
+    def update(self, sequences: Sequence[str], scores: Sequence[float]) -> None:
+        """
+        Add observations and refit.
+
+        Args:
+            sequences: Observed sequences
+            scores: Observed score for each sequence
+        """
+        y = np.asarray(scores, dtype=np.float64)
+        keep = np.isfinite(y)
+        if not keep.any():
+            return
+        x = featurize([seq for seq, k in zip(sequences, keep) if k]).astype(np.float64)
+        y = y[keep]
+        self.xtx += x.T @ x
+        self.xty += x.T @ y
+        self.yty += float(y @ y)
+        self.n_observations += len(y)
+        for row in x:
+            # Sherman-Morrison: (A + x x^T)^-1 = A^-1 - (A^-1 x)(A^-1 x)^T / (1 + x^T A^-1 x)
+            cov_x = self._cov @ row
+            self._cov -= np.outer(cov_x, cov_x) / (1.0 + row @ cov_x)
+        self._fit()
+
+    def _fit(self) -> None:
+        self._weights = self._cov @ self.xty
+        # Residual variance from the sufficient statistics
+        w = self._weights
+        sse = self.yty - 2.0 * w @ self.xty + w @ self.xtx @ w
+        self._noise_var = max(sse / max(self.n_observations - 1, 1), 1e-6)
+
+    def predict(self, sequences: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict score mean and standard deviation.
+
+        Args:
+            sequences: Candidate sequences
+
+        Returns:
+            (mean, std) arrays of shape (N,). Before any observation the mean is
+            0 and the std is the prior scale, so every candidate looks equally uncertain.
+        """
+        n = len(sequences)
+        if self._weights is None:
+            return np.zeros(n), np.full(n, np.sqrt(1.0 / self.alpha))
+        # Inference runs in float32; the fit itself stays in float64
+        weights = self._weights.astype(np.float32)
+        cov = self._cov.astype(np.float32)
+        means = np.empty(n)
+        stds = np.empty(n)
+        for start in range(0, n, PREDICT_CHUNK):
+            x = featurize(sequences[start:start + PREDICT_CHUNK])
+            means[start:start + len(x)] = x @ weights
+            # Posterior variance: noise * (1 + x^T (X^T X + alpha I)^-1 x)
+            spread = np.maximum(((x @ cov) * x).sum(axis=1), 0.0)
+            stds[start:start + len(x)] = np.sqrt(self._noise_var * (1.0 + spread))
+        return means, stds
+
+
+def combine_predictions(
+    predictions: Sequence[Tuple[np.ndarray, np.ndarray]],
+    weights: Sequence[float]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted sum of several surrogates' predictions, for a UCB over one combined objective.
+
+    The models are treated as independent, so variances add with squared weights.
+
+    Args:
+        predictions: (mean, std) per model, all over the same candidates
+        weights: Weight per model
+
+    Returns:
+        (mean, std) of the weighted sum
+    """
+    mean = sum(w * m for (m, _), w in zip(predictions, weights))
+    var = sum((w * s) ** 2 for (_, s), w in zip(predictions, weights))
+    return np.asarray(mean, dtype=np.float64), np.sqrt(var)
+
+
+def select_ucb(mean: np.ndarray, std: np.ndarray, k: int, beta: float = 2.0) -> List[int]:
+    """
+    Pick the k candidates with the highest upper confidence bound.
+
+    Args:
+        mean: Predicted scores
+        std: Predicted standard deviations
+        k: Number of candidates to select
+        beta: Exploration weight (0 = pure exploitation)
+
+    Returns:
+        Indices of the selected candidates, best first
+    """
+    ucb = mean + beta * std
+    k = min(k, len(ucb))
+    if k <= 0:
+        return []
+    top = np.argpartition(-ucb, k - 1)[:k]
+    return top[np.argsort(-ucb[top], kind="stable")].tolist()
@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+import fold_server
+from fold_queue import DONE, FAILED, LEASED, QUEUED, Broker, FoldQueue, FoldWorker, SQLiteBroker
+from scoring import predict_binding_score
+
+PDB = "\n".join(
+    f"ATOM  {i:5d}  CA  ALA A{i:4d}    {i * 3.8:8.3f}   0.000   0.000  1.00 80.00           C"
+    for i in range(1, 5)
+)
+
+
+@pytest.fixture
+def broker(tmp_path):
+    broker = SQLiteBroker(str(tmp_path / "queue.db"))
+    yield broker
+    broker.close()
+
+
+def _expire(broker, job_id):
+    # Backdate the lease instead of sleeping through it
+    broker._conn().execute("UPDATE jobs SET lease_expires = ? WHERE id = ?", (time.time() - 1.0, job_id))
+
+
+def test_expired_lease_is_handed_to_another_worker(broker):
+    job_id = broker.enqueue("fold", {"sequence": "ACDE"})
+    assert broker.lease("node-a/1")["id"] == job_id
+    assert broker.lease("node-b/1") is None
+
+    _expire(broker, job_id)
+    job = broker.lease("node-b/1")
+    assert job["id"] == job_id
+    assert job["worker_id"] == "node-b/1"
+    assert job["attempts"] == 2
+
+    # The worker that lost the lease can no longer finish or renew the job
+    assert not broker.complete(job_id, "node-a/1", {"pdb_text": "stale"})
+    assert not broker.heartbeat(job_id, "node-a/1")
+    assert broker.complete(job_id, "node-b/1", {"pdb_text": "ATOM"})
+    assert broker.get(job_id)["status"] == DONE
+
+
+def test_failed_attempt_is_retried_until_dead_lettered(broker):
+    job_id = broker.enqueue("fold", {"sequence": "ACDE"}, max_attempts=2)
+
+    broker.lease("node-a/1")
+    assert broker.fail(job_id, "node-a/1", "upstream 503")
+    job = broker.get(job_id)
+    assert (job["status"], job["error"], job["worker_id"]) == (QUEUED, "upstream 503", None)
+
+    assert broker.lease("node-b/1")["attempts"] == 2
+    assert broker.fail(job_id, "node-b/1", "upstream 503 again")
+    job = broker.get(job_id)
+    assert (job["status"], job["error"]) == (FAILED, "upstream 503 again")
+    assert broker.lease("node-c/1") is None
+
+
+def test_expired_final_attempts_are_dead_lettered_without_recursion(broker):
+    stuck = [broker.enqueue("fold", {"sequence": f"SEQ{i}"}, max_attempts=1) for i in range(2000)]
+    fresh = broker.enqueue("fold", {"sequence": "ACDE"})
+    for _ in stuck:
+        broker.lease("node-a/1")
+    broker._conn().execute("UPDATE jobs SET lease_expires = ? WHERE status = ?", (time.time() - 1.0, LEASED))
+
+    # More expired jobs than the interpreter's recursion limit sit in front of the live one
+    assert broker.lease("node-b/1")["id"] == fresh
+    jobs = broker.get_many(stuck)
+    assert {job["status"] for job in jobs} == {FAILED}
+    assert jobs[0]["error"] == "lease expired on attempt 1"
+
+
+def test_worker_fails_unknown_job_kinds(broker):
+    job_id = broker.enqueue("bogus", {"sequence": "ACDE"}, max_attempts=1)
+    assert FoldWorker(broker, worker_id="node-a/1", verbose=False).run_one()
+    job = broker.get(job_id)
+    assert job["status"] == FAILED
+    assert "No handler" in job["error"]
+
+
+def test_score_job_returns_plddt_and_binding_score(broker, monkeypatch):
+    monkeypatch.setattr(fold_server, "fold_pdb", lambda sequence: PDB)
+    queue = FoldQueue(broker, poll_interval=0.01)
+    with_pdb = queue.enqueue_score("ACDE", "MDM2", iteration=2)
+    without_pdb = queue.enqueue_score("ACDE", "MDM2", iteration=2, return_pdb=False)
+    worker = FoldWorker(broker, worker_id="node-a/1", verbose=False)
+    assert worker.run(exit_when_idle=True) == 2
+
+    finished = queue.wait([with_pdb, without_pdb], timeout=1.0)
+    result = finished[with_pdb]["result"]
+    assert finished[with_pdb]["status"] == DONE
+    assert result["pdb_text"] == PDB
+    assert result["plddt"] == pytest.approx(0.8)
+    assert result["binding_score"] == predict_binding_score("ACDE", "MDM2", 2)
+    assert "pdb_text" not in finished[without_pdb]["result"]
+
+
+def test_broker_interface_is_abstract():
+    with pytest.raises(TypeError):
+        Broker()
@@ -0,0 +1,60 @@
+import pytest
+
+from fold_scheduler import FoldScheduler
+
+
+def _linear(scheduler, length):
+    return min(scheduler.base_timeout + scheduler.per_residue_timeout * length, scheduler.max_timeout)
+
+
+def test_timeout_is_linear_without_history():
+    scheduler = FoldScheduler(base_timeout=15.0, per_residue_timeout=0.15)
+    assert scheduler.timeout(100) == pytest.approx(30.0)
+    assert scheduler.timeout(2000) == scheduler.max_timeout
+
+
+@pytest.mark.parametrize("length", [10, 60, 150, 390])
+def test_fast_history_never_lowers_the_linear_floor(length):
+    scheduler = FoldScheduler()
+    # Memo hits and coalesced requests answer almost instantly
+    for _ in range(50):
+        scheduler.record(length, 0.01)
+    assert scheduler.timeout(length) == pytest.approx(_linear(scheduler, length))
+    assert scheduler.timeout(length) >= _linear(scheduler, length)
+
+
+def test_slow_history_raises_the_timeout_up_to_a_cap():
+    scheduler = FoldScheduler(max_timeout=60.0)
+    for seconds in [40.0] * 10:
+        scheduler.record(100, seconds)
+    assert scheduler.timeout(100) == pytest.approx(40.0 * scheduler.margin)
+
+    for _ in range(200):
+        scheduler.record(100, 500.0)
+    assert scheduler.timeout(100) == 2 * scheduler.max_timeout
+
+
+def test_thin_buckets_borrow_rescaled_neighbours():
+    scheduler = FoldScheduler(min_samples=5)
+    for _ in range(5):
+        scheduler.record(50, 40.0)
+    # Bucket of 75 is empty; samples from 50 residues are scaled by 75 / 50
+    assert scheduler.expected(75) == pytest.approx(60.0)
+    assert scheduler.timeout(75) >= 60.0
+
+
+def test_longest_expected_fold_goes_first():
+    scheduler = FoldScheduler()
+    sequences = ["A" * 20, "A" * 300, "A" * 120]
+    assert scheduler.order(sequences) == [1, 2, 0]
+    assert scheduler.makespan(sequences, workers=3) == pytest.approx(scheduler.expected(300))
+
+
+def test_over_long_sequences_split_into_overlapping_windows():
+    scheduler = FoldScheduler(max_length=100)
+    sequence = "".join("ACDEFGHIKL"[i % 10] for i in range(250))
+    windows = scheduler.split(sequence, overlap=10)
+    assert all(len(window) <= 100 for window in windows)
+    assert windows[0] == sequence[:len(windows[0])]
+    assert windows[1].startswith(windows[0][-10:])
+    assert scheduler.split("ACDE") == ["ACDE"]
@@ -0,0 +1,53 @@
+import pytest
+
+from mutagenesis import MutagenesisEngine, find_hotspots
+
+PARENT = "SQETFSDLWKLLPENNVLSP"
+
+
+def _changed(parent, variant):
+    return {i for i, (a, b) in enumerate(zip(parent, variant)) if a != b}
+
+
+def test_hotspots_follow_the_motif():
+    assert find_hotspots(PARENT) == [4, 8, 11]
+    assert find_hotspots("AAAAAAAAAA") == []
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_hotspot_positions_are_never_mutated(seed):
+    hotspots = find_hotspots(PARENT)
+    engine = MutagenesisEngine(fixed_positions=hotspots, seed=seed)
+    top = ["SQETFADLWKLLAENNVLSP", "AQETFSDLWELLPENKVLSA"]
+    variants = engine.generate(PARENT, 300, top_candidates=top)
+    assert len(variants) == 300
+    for variant in variants:
+        assert not _changed(PARENT, variant) & set(hotspots)
+    for variant in engine.face_swaps(PARENT) + engine.residue_scan(PARENT) + engine.point_mutants(PARENT, 200, 5):
+        assert not _changed(PARENT, variant) & set(hotspots)
+
+
+def test_generate_mixes_alanine_and_other_single_substitutions():
+    engine = MutagenesisEngine(fixed_positions=find_hotspots(PARENT), seed=0)
+    variants = engine.generate(PARENT, 40)
+    singles = [v for v in variants if len(_changed(PARENT, v)) == 1]
+    substituted = {v[next(iter(_changed(PARENT, v)))] for v in singles}
+    assert "A" in substituted
+    assert substituted - {"A"}
+
+
+def test_generate_returns_unique_new_sequences():
+    engine = MutagenesisEngine(seed=1)
+    exclude = set(engine.alanine_scan(PARENT)[:5])
+    variants = engine.generate(PARENT, 100, exclude=exclude)
+    assert len(set(variants)) == len(variants) == 100
+    assert PARENT not in variants
+    assert not exclude & set(variants)
+
+
+def test_residue_scan_covers_every_mutable_position():
+    engine = MutagenesisEngine(fixed_positions=[0, 1])
+    scan = engine.residue_scan("ACDE")
+    # 19 substitutions at each of the two mutable positions
+    assert len(scan) == 38
+    assert {min(_changed("ACDE", v)) for v in scan} == {2, 3}
@@ -0,0 +1,67 @@
+import time
+
+import numpy as np
+import pytest
+
+from pareto import crowding_distance, non_dominated_sort, rank_candidates
+
+
+def _brute_force_ranks(costs):
+    # Peel fronts off one at a time with an all-pairs dominance check
+    dominates = np.all(costs[:, None, :] <= costs[None, :, :], axis=2) & np.any(costs[:, None, :] < costs[None, :, :], axis=2)
+    ranks = np.full(len(costs), -1)
+    rank = 0
+    while (ranks < 0).any():
+        left = ranks < 0
+        front = left & ~(dominates & left[:, None]).any(axis=0)
+        ranks[front] = rank
+        rank += 1
+    return ranks
+
+
+@pytest.mark.parametrize("n, m, levels, seed", [
+    (300, 2, None, 0),
+    (400, 3, 6, 1),
+    (600, 6, None, 2),
+    (500, 4, 3, 3),
+    (50, 1, 10, 4),
+])
+def test_ranks_match_brute_force(n, m, levels, seed):
+    rng = np.random.default_rng(seed)
+    costs = rng.random((n, m)) if levels is None else rng.integers(0, levels, (n, m)).astype(float)
+    # Duplicate rows must share a rank
+    costs = np.concatenate([costs, costs[: n // 10]])
+    assert non_dominated_sort(costs).tolist() == _brute_force_ranks(costs).tolist()
+
+
+def test_small_blocks_and_chunks_give_the_same_ranks():
+    costs = np.random.default_rng(5).random((2000, 5))
+    assert np.array_equal(non_dominated_sort(costs, block=7), non_dominated_sort(costs))
+    assert np.array_equal(non_dominated_sort(costs), _brute_force_ranks(costs))
+
+
+def test_large_population_ranks_quickly():
+    costs = np.random.default_rng(6).random((20000, 6))
+    started = time.perf_counter()
+    ranks = non_dominated_sort(costs)
+    assert time.perf_counter() - started < 3.0
+    assert ranks.shape == (20000,)
+    # Spot-check against the definition: a row is off the front iff a front member dominates it
+    front = costs[ranks == 0]
+    for i in np.random.default_rng(7).choice(len(costs), 200, replace=False):
+        dominated = np.any(np.all(front <= costs[i], axis=1) & np.any(front < costs[i], axis=1))
+        assert dominated == (ranks[i] > 0)
+
+def test_boundaries_of_a_front_are_infinitely_crowded():
+    costs = np.array([[0.0, 3.0], [1.0, 2.0], [2.0, 1.0], [3.0, 0.0], [3.0, 3.0]])
+    ranks = non_dominated_sort(costs)
+    assert ranks.tolist() == [0, 0, 0, 0, 1]
+    crowding = crowding_distance(costs, ranks)
+    assert np.isinf(crowding[[0, 3]]).all() and np.isfinite(crowding[[1, 2]]).all()
+
+
+def test_candidates_on_the_front_come_first():
+    records = rank_candidates(["AAAAAAAAAA", "KKKKKKKKKK", "LLLLLLLLLL"], [0.9, 0.2, 0.1], [0.9, 0.9, 0.1])
+    assert records[0]["sequence"] == "AAAAAAAAAA"
+    assert records[0]["pareto_rank"] == 0
+    assert records[-1]["pareto_rank"] > 0
@@ -0,0 +1,51 @@
+import pytest
+
+from prescreen import PreScreen, compute_descriptors, parse_constraints
+
+HELIX = "EELLKKAEELLKKAEELLKKA"
+
+
+def test_parses_a_length_range():
+    constraints = parse_constraints("Design a binder between 40 and 60 residues long")
+    assert (constraints["min_length"], constraints["max_length"], constraints["target_length"]) == (40, 60, 50)
+
+
+@pytest.mark.parametrize("prompt", ["a 50-aa helix", "a 50‑aa stapled α‑helix", "50 residues, helical"])
+def test_parses_a_single_length_and_helicity(prompt):
+    constraints = parse_constraints(prompt)
+    assert constraints["target_length"] == 50
+    assert constraints["min_length"] is None
+    assert constraints["helical"]
+
+
+@pytest.mark.parametrize("prompt, forbidden", [
+    ("20 residues, no cysteine", "C"),
+    ("without Cys, no methionine", "CM"),
+    ("avoid tryptophans", "W"),
+    ("a helical peptide", ""),
+])
+def test_parses_forbidden_residues(prompt, forbidden):
+    assert parse_constraints(prompt)["forbidden"] == forbidden
+
+
+def test_screen_rejects_forbidden_residues_and_wrong_lengths():
+    screen = PreScreen.from_prompt("between 20 and 22 residues, no cysteine", keep_fraction=1.0)
+    with_cys = "C" + HELIX[1:]
+    result = screen.screen([HELIX, with_cys, HELIX[:10], HELIX + "EELLKK"])
+    assert result["kept"] == [HELIX]
+    assert (result["screened"], result["passed"], result["pruned"]) == (4, 1, 3)
+    assert screen.passes(HELIX) and not screen.passes(with_cys)
+
+
+def test_screen_keeps_a_fraction_best_first():
+    aggregating = "AAVVVVVAAIIIIIAAKKEE"
+    candidates = [HELIX, aggregating, "EELLKKAEELLKKAEELLKKE", "KKLLEEAKKLLEEAKKLLEEA"]
+    result = PreScreen(keep_fraction=0.5, max_aggregation_motifs=10).screen(candidates)
+    assert len(result["kept"]) == 2
+    assert aggregating not in result["kept"]
+
+
+def test_descriptors_are_vectorized_per_sequence():
+    descriptors = compute_descriptors(["KKKK", "DDDDEE", HELIX])
+    assert descriptors["length"].tolist() == [4, 6, len(HELIX)]
+    assert descriptors["net_charge"][0] > 3.5 and descriptors["net_charge"][1] < -5.5
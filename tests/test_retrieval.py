@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+from retrieval import DigestIndex, estimate_tokens, extract_digest
+
+PAPERS = {
+    "stapling": ("Hydrocarbon stapling of alpha helices",
+                 "Hydrocarbon staples between i and i+4 or i+7 residues lock alpha helices. "
+                 "Stapled peptides resist proteolysis and enter cells. "),
+    "mdm2": ("p53 peptides that bind MDM2",
+             "The p53 helix binds MDM2 through Phe19, Trp23 and Leu26. "
+             "Stapled p53 peptides restore p53 signalling in cancer cells. "),
+    "folding": ("Fast structure prediction",
+                "Language-model structure prediction folds sequences in seconds. "
+                "Confidence is reported as pLDDT per residue. "),
+}
+
+
+@pytest.fixture
+def layout(tmp_path):
+    papers, info = tmp_path / "papers", tmp_path / "info"
+    os.makedirs(papers / "design")
+    os.makedirs(info / "design")
+    manifest = {pid: {"title": title, "summary": text * 3} for pid, (title, text) in PAPERS.items()}
+    (papers / "design" / "papers_info.json").write_text(json.dumps(manifest))
+    (info / "design" / "mdm2.txt").write_text("Design notes. " + PAPERS["mdm2"][1] * 10)
+    return str(papers), str(info), str(tmp_path / "digests.json")
+
+
+def test_search_ranks_matching_papers_first(layout):
+    index = DigestIndex(*layout)
+    ranked = [paper_id for paper_id, _ in index.search("stapled helix binding MDM2 p53")]
+    assert ranked[0] == "mdm2"
+    assert "folding" not in ranked[:2]
+    assert index.search("unrelated zebra") == []
+
+
+@pytest.mark.parametrize("budget", [24, 60, 120, 400, 5000])
+def test_pack_stays_within_its_token_budget(layout, budget):
+    index = DigestIndex(*layout, digest_tokens=80)
+    packed = index.pack("stapled p53 helix", budget)
+    assert estimate_tokens(packed) <= budget
+    if packed:
+        assert packed.startswith("Relevant notes")
+
+
+def test_pack_is_empty_when_nothing_fits(layout):
+    assert DigestIndex(*layout).pack("stapled p53 helix", 5) == ""
+
+
+def test_digests_are_cached_until_sources_change(layout):
+    paper_dir, info_dir, cache_path = layout
+    assert DigestIndex(*layout).refresh() == 0
+    index = DigestIndex(*layout)
+    assert os.path.exists(cache_path)
+    with open(os.path.join(info_dir, "design", "folding.txt"), "w") as f:
+        f.write("New notes on folding speed and accuracy for long sequences.")
+    assert index.refresh() == 1
+
+
+def test_extract_digest_respects_its_budget():
+    text = " ".join(f"Sentence number {i} talks about stapled helices and MDM2 binding." for i in range(50))
+    digest = extract_digest("Title", text, max_tokens=60)
+    assert digest.startswith("Title: ")
+    assert estimate_tokens(digest) <= 60
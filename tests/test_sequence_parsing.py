@@ -0,0 +1,59 @@
+import pytest
+
+from sequence_parsing import StreamingSequenceParser, extract_sequences, sequences_from_tool_input
+
+SEQ = "MKLLEELLKKLLEELLKKAA"
+
+
+def test_fasta_records_join_across_lines():
+    text = f">cand1 helix\n{SEQ[:10]}\n{SEQ[10:]}\n>cand2\nWWWWLLLLKKKKEE\n"
+    assert extract_sequences(text) == [SEQ, "WWWWLLLLKKKKEE"]
+
+
+def test_plain_sequence_lines():
+    assert extract_sequences(f"{SEQ}\n2. WWWWLLLLKKKKEE\n- GGGGLLLLKKKKEE") == [SEQ, "WWWWLLLLKKKKEE", "GGGGLLLLKKKKEE"]
+
+
+@pytest.mark.parametrize("line", [
+    f"Sequence 1: {SEQ}",
+    f"**Sequence 1:** {SEQ}",
+    f"**Sequence 1**: {SEQ}",
+    f"__Sequence 1:__ `{SEQ}`",
+    f"Sequence 1 - {SEQ}",
+    f"Sequence 1 – {SEQ}",
+    f"1. **Design A:** {SEQ}",
+    f"Sequence 1: {SEQ[:10]} {SEQ[10:]}",
+    f"**Sequence 1:** {SEQ[:5]} {SEQ[5:10]} {SEQ[10:15]} {SEQ[15:]}",
+])
+def test_markdown_labelled_lines(line):
+    assert extract_sequences(line) == [SEQ]
+
+
+@pytest.mark.parametrize("text", [
+    "Use only the letters ACDEFGHIKLMNPQRSTVWY in every candidate.",
+    "ACDEFGHIKLMNPQRSTVWY",
+    "Note: I AM A CAT WITH A HAT AND A DEEP",
+    "The motif FSDLWKLL anchors the helix into the MDM2 cleft.",
+])
+def test_prose_and_alphabet_are_ignored(text):
+    assert extract_sequences(text) == []
+
+
+def test_code_blocks_accept_runs_inside_lines():
+    text = f"```\nhelix = {SEQ}  # best\n```"
+    assert extract_sequences(text) == [SEQ]
+
+
+def test_streaming_matches_batch_parse():
+    text = f"Plan:\n**Sequence 1:** {SEQ}\nSequence 2 - {SEQ[:10]} {SEQ[10:]}K\n>c3\nWWWWLLLL\nKKKKEE\n"
+    parser = StreamingSequenceParser()
+    streamed = []
+    for i in range(0, len(text), 7):
+        streamed += parser.feed(text[i:i + 7])
+    streamed += parser.close()
+    assert streamed == extract_sequences(text) == [SEQ, SEQ + "K", "WWWWLLLLKKKKEE"]
+
+
+def test_tool_input_is_cleaned_and_deduplicated():
+    tool_input = {"sequences": [{"sequence": SEQ.lower()}, {"sequence": SEQ}, "short", f"{SEQ[:10]}-{SEQ[10:]}"]}
+    assert sequences_from_tool_input(tool_input) == [SEQ]
@@ -0,0 +1,76 @@
+import random
+
+import numpy as np
+import pytest
+
+from similarity_index import MinHasher, SimilarityIndex, kmer_codes
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def _random_sequence(rng, length=50):
+    return "".join(rng.choice(AMINO_ACIDS) for _ in range(length))
+
+
+def _mutate(rng, sequence):
+    i = rng.randrange(len(sequence))
+    return sequence[:i] + rng.choice([aa for aa in AMINO_ACIDS if aa != sequence[i]]) + sequence[i + 1:]
+
+
+def _jaccard(a, b):
+    a, b = set(kmer_codes(a).tolist()), set(kmer_codes(b).tolist())
+    return len(a & b) / len(a | b)
+
+
+def test_signature_estimates_jaccard_similarity():
+    rng = random.Random(0)
+    hasher = MinHasher(num_perm=256)
+    parent = _random_sequence(rng)
+    for other in (_mutate(rng, parent), _mutate(rng, _mutate(rng, parent)), _random_sequence(rng)):
+        estimate = (hasher.signature(parent) == hasher.signature(other)).mean()
+        assert estimate == pytest.approx(_jaccard(parent, other), abs=0.1)
+
+
+def test_near_duplicates_are_recalled():
+    rng = random.Random(1)
+    index = SimilarityIndex()
+    parents = [_random_sequence(rng) for _ in range(200)]
+    for sequence in parents:
+        index.add(sequence)
+    queries = [_mutate(rng, parent) for parent in parents]
+    recalled = sum([match for match, _ in index.nearest(query, n=1)] == [parent]
+                   for parent, query in zip(parents, queries))
+    assert recalled / len(parents) >= 0.95
+
+
+def test_unrelated_sequences_are_rarely_candidates():
+    rng = random.Random(2)
+    index = SimilarityIndex()
+    for _ in range(200):
+        index.add(_random_sequence(rng))
+    hits = sum(bool(index.nearest(_random_sequence(rng), min_similarity=0.5)) for _ in range(100))
+    assert hits <= 2
+
+
+def test_exact_match_and_payload_survive_a_reopen(tmp_path):
+    path = str(tmp_path / "index.db")
+    sequence = _random_sequence(random.Random(3))
+    index = SimilarityIndex(path)
+    index.add(sequence, pdb_text="ATOM", plddt=0.8)
+    index.close()
+
+    reopened = SimilarityIndex(path)
+    assert sequence in reopened and len(reopened) == 1
+    assert reopened.nearest(sequence) == [(sequence, 1.0)]
+    assert reopened.structure(sequence) == {"pdb_text": "ATOM", "plddt": 0.8}
+    reopened.close()
+
+
+def test_bands_must_divide_the_signature():
+    with pytest.raises(ValueError):
+        SimilarityIndex(num_perm=64, bands=10)
+
+
+def test_short_sequences_hash_as_one_shingle():
+    assert len(kmer_codes("AC")) == 1
+    assert np.array_equal(MinHasher().signature("AC"), MinHasher().signature("AC"))
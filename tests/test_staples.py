@@ -0,0 +1,61 @@
+import pytest
+
+from staples import STAPLE_MARK, STAPLE_SPANS, binding_face, enumerate_placements, single_staples, staple_candidates
+
+P53_HELIX = "SQETFSDLWKLLPENNVLSPLPSQ"
+HOTSPOTS = [4, 8, 11]
+
+
+def test_single_staples_span_one_or_two_turns():
+    singles = single_staples(30, HOTSPOTS)
+    spans = (singles["end"] - singles["start"]).tolist()
+    assert spans and set(spans) <= {4, 7}
+    names = list(STAPLE_SPANS)
+    for start, end, kind in zip(singles["start"], singles["end"], singles["span"]):
+        assert end - start == STAPLE_SPANS[names[kind]]
+
+
+def test_only_requested_spans_are_used():
+    singles = single_staples(30, spans=["i,i+7"])
+    assert set((singles["end"] - singles["start"]).tolist()) == {7}
+
+
+def test_anchors_avoid_hotspots_termini_and_the_binding_face():
+    placements = enumerate_placements(P53_HELIX, HOTSPOTS, top_n=None)
+    assert placements
+    direction, half_width = binding_face(HOTSPOTS)
+    anchors = {p for placement in placements for i, j, _ in placement["staples"] for p in (i, j)}
+    assert not anchors & set(HOTSPOTS)
+    assert 0 not in anchors and len(P53_HELIX) - 1 not in anchors
+    assert half_width > 0 and direction is not None
+
+
+@pytest.mark.parametrize("n_staples", [1, 2])
+def test_placements_have_valid_spacing_and_sequences(n_staples):
+    placements = enumerate_placements(P53_HELIX, HOTSPOTS, n_staples=[n_staples], top_n=None)
+    assert placements
+    for placement in placements:
+        staples = placement["staples"]
+        assert len(staples) == n_staples
+        for i, j, kind in staples:
+            assert j - i == STAPLE_SPANS[kind]
+            assert placement["stapled_sequence"][i] == placement["stapled_sequence"][j] == STAPLE_MARK
+            assert placement["sequence"][i] == placement["sequence"][j] == "A"
+        # Consecutive staples neither share nor crowd residues
+        for (_, end, _), (start, _, _) in zip(staples, staples[1:]):
+            assert start > end + 1
+    scores = [placement["score"] for placement in placements]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_candidates_are_distinct_and_skip_excluded_sequences():
+    best = enumerate_placements(P53_HELIX, HOTSPOTS, top_n=1)[0]["sequence"]
+    picked = staple_candidates(P53_HELIX, 5, HOTSPOTS, exclude=[best])
+    sequences = [placement["sequence"] for placement in picked]
+    assert len(sequences) == len(set(sequences)) == 5
+    assert best not in sequences and P53_HELIX not in sequences
+
+
+def test_non_standard_residues_are_rejected():
+    with pytest.raises(ValueError):
+        enumerate_placements("SQETFSDLWKXLPENN")
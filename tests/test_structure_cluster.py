@@ -0,0 +1,71 @@
+import numpy as np
+
+from structure_cluster import greedy_cluster, kabsch_compare, parse_ca_coords, select_diverse, stack_coords
+
+
+def _helix(n, rise=1.5, radius=2.3):
+    t = np.radians(100.0) * np.arange(n)
+    return np.stack([radius * np.cos(t), radius * np.sin(t), rise * np.arange(n)], axis=1).astype(np.float32)
+
+
+def _rotation(seed):
+    q, r = np.linalg.qr(np.random.default_rng(seed).normal(size=(3, 3)))
+    q *= np.sign(np.diag(r))
+    if np.linalg.det(q) < 0:
+        q[:, 0] *= -1
+    return q.astype(np.float32)
+
+
+def _pdb(coords):
+    return "\n".join(
+        f"ATOM  {i + 1:5d}  CA  ALA A{i + 1:4d}    {x:8.3f}{y:8.3f}{z:8.3f}  1.00 80.00           C"
+        for i, (x, y, z) in enumerate(coords)
+    )
+
+
+def test_rotated_and_translated_copy_has_zero_rmsd():
+    helix = _helix(30)
+    moved = helix @ _rotation(0).T + np.array([5.0, -3.0, 12.0], dtype=np.float32)
+    mask = np.ones((1, 30), dtype=bool)
+    rmsd, tm = kabsch_compare(moved[None], helix[None], mask)
+    assert rmsd[0] < 1e-3
+    assert tm[0] > 0.999
+
+
+def test_mirror_image_is_not_superposed():
+    helix = _helix(30)
+    mirrored = helix * np.array([1.0, 1.0, -1.0], dtype=np.float32)
+    rmsd, _ = kabsch_compare(mirrored[None], helix[None], np.ones((1, 30), dtype=bool))
+    assert rmsd[0] > 0.5
+
+
+def test_too_few_shared_residues_are_not_compared():
+    coords, mask = stack_coords([_helix(10), _helix(2)])
+    rmsd, tm = kabsch_compare(coords[:1], coords[1:], mask[:1] & mask[1:])
+    assert np.isinf(rmsd[0]) and tm[0] == 0.0
+
+
+def test_pdb_round_trip():
+    helix = _helix(12)
+    assert np.allclose(parse_ca_coords(_pdb(helix)), helix, atol=1e-3)
+
+
+def test_near_copies_share_a_cluster_and_the_best_represents_it():
+    helix = _helix(30)
+    noise = np.random.default_rng(1).normal(scale=0.1, size=helix.shape).astype(np.float32)
+    straight = np.stack([np.zeros(30), np.zeros(30), 3.8 * np.arange(30)], axis=1).astype(np.float32)
+    pdbs = [_pdb(helix), _pdb(helix @ _rotation(2).T + noise), _pdb(straight), ""]
+    result = select_diverse(pdbs, [0.7, 0.9, 0.5, None])
+    labels = result["labels"]
+    assert labels[0] == labels[1] != labels[2]
+    assert labels[3] not in labels[:3]
+    assert result["representatives"][:2] == [1, 2]
+
+    # A structure already kept as a reference removes its copies
+    again = select_diverse([_pdb(helix), _pdb(straight)], [0.8, 0.8], reference_coords=[helix])
+    assert again["labels"][0] == -1 and again["representatives"] == [1]
+
+
+def test_greedy_cluster_starts_from_the_best_score():
+    coords, mask = stack_coords([_helix(20), _helix(20)])
+    assert greedy_cluster(coords, mask, scores=np.array([0.1, 0.9])).tolist() == [0, 0]
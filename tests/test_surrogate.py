@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+
+from surrogate import N_FEATURES, SurrogateModel, combine_predictions, select_ucb
+
+ALA_RICH = ["AAAAKAAAALAAAAEAAAA", "AAKAAAAAAEAAALAAAAA", "AAAALAAAAAKAAAAEAAA"]
+GLY_RICH = ["GGGGKGGGGLGGGGEGGGG", "GGKGGGGGGEGGGLGGGGG", "GGGGLGGGGGKGGGGEGGG"]
+
+
+def _random_sequences(n, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice("ACDEFGHIKLMNPQRSTVWY") for _ in range(rng.randint(15, 40))) for _ in range(n)]
+
+
+def test_predictions_follow_observations():
+    model = SurrogateModel()
+    pool = ALA_RICH + GLY_RICH
+    mean, std = model.predict(pool)
+    assert np.all(mean == 0.0) and np.allclose(std, std[0])
+
+    model.update(ALA_RICH * 3, [0.9] * 9)
+    model.update(GLY_RICH * 3, [0.2] * 9)
+    mean, std = model.predict(["AAAAAAAKAAAALAAEAAA", "GGGGGGGKGGGGLGGEGGG"])
+    assert mean[0] > 0.7 and mean[1] < 0.4
+    # Observed regions are less uncertain than unseen ones
+    assert model.predict(ALA_RICH[:1])[1][0] < model.predict(["WWWWPWWWWPWWWW"])[1][0]
+
+
+def test_selected_subset_changes_with_observations():
+    pool = GLY_RICH + ALA_RICH
+    model = SurrogateModel()
+    before = select_ucb(*model.predict(pool), k=3, beta=0.0)
+    assert before == [0, 1, 2]
+
+    model.update(ALA_RICH + GLY_RICH, [1.0, 1.0, 1.0, 0.0, 0.0, 0.0])
+    after = select_ucb(*model.predict(pool), k=3, beta=0.0)
+    assert sorted(after) == [3, 4, 5]
+
+
+def test_rank_one_updates_match_direct_inverse():
+    sequences = _random_sequences(120)
+    scores = np.random.default_rng(0).normal(size=len(sequences))
+    model = SurrogateModel(alpha=2.0)
+    for start in range(0, len(sequences), 7):
+        model.update(sequences[start:start + 7], scores[start:start + 7])
+    expected = np.linalg.inv(model.xtx + 2.0 * np.eye(N_FEATURES))
+    assert np.allclose(model._cov, expected, atol=1e-10)
+    assert np.allclose(model._weights, expected @ model.xty, atol=1e-10)
+
+
+def test_combined_objective_trades_off_models():
+    binding = (np.array([1.0, 0.0]), np.array([0.1, 0.1]))
+    plddt = (np.array([0.0, 2.0]), np.array([0.2, 0.2]))
+    mean, std = combine_predictions([binding, plddt], [1.0, 1.0])
+    assert mean.tolist() == [1.0, 2.0]
+    assert np.allclose(std, np.sqrt(0.1 ** 2 + 0.2 ** 2))
+    assert select_ucb(*combine_predictions([binding, plddt], [1.0, 0.25]), k=1, beta=0.0) == [0]